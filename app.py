@@ -1,13 +1,20 @@
 from __future__ import annotations
-import pandas as pd
+import os
 from pathlib import Path
 import streamlit as st
 
-from utils.load_data import load_broker_data, fill_missing_business_days, preprocess_custody, preprocess_buyers_sellers
+from utils.load_data import data_version, load_tables
 from components.layout import set_global_styles, render_sidebar_brand
+from components.instrumentation import render_instrumentation_panel
 from utils.periods_sidebar import render_period_sidebar
-from utils.filter_data import filter_data
-from components.metrics import compute_metrics
+from utils.result_cache import cached
+from utils.disk_cache import get_disk_cache
+from utils.panel import PANEL_ENABLED, build_panel
+from utils.rolling import rolling_analytics
+from utils.snapshot import SNAPSHOT_DIR
+from utils.query_service import get_query_client
+from utils.prefetch import PrefetchContext, schedule_prefetch
+from utils.section_tasks import TOP_N, SectionInputs, section_result
 from components.cards import render_metric_cards
 from components.short_interest import render_short_interest
 from components.general_profile import render_general_profile
@@ -15,6 +22,12 @@ from components.top_buyers_sellers import render_top_buyers_sellers
 from components.weekly_top5_interleaved import render_weekly_trading
 from components.custody import render_custody
 from components.buyeres_sellers import render_buyers_sellers
+from components.rolling_flow import render_rolling_flow
+from components.broker_correlation import render_broker_correlation
+
+# CSV diário ou diretório do store particionado (python -m utils.ingest)
+DATA_PATH = os.environ.get("BAROMETER_DATA", "data/Broker_Daily_Data.csv")
+
 
 def main():
     # 1) Page + global CSS
@@ -26,22 +39,16 @@ def main():
     logo_path = str(win_logo) if win_logo.exists() else "assets/logo.png"
     render_sidebar_brand(title="Broker Trading Barometer", logo_path=logo_path)
 
-    # 3) Load bases
-    df = load_broker_data()
-    if "date" in df.columns:
-        df["date"] = pd.to_datetime(df["date"], errors="coerce")
-
-    # 👉 versão preenchida (pra calendário/filtros)
-    df_fill = fill_missing_business_days(df, date_col="date")
-
-    # Preprocess custody table (usa o df cru → só dias reais)
-    df_custody = preprocess_custody(df)
-
-    # Preprocess buyers/sellers table (idem)
-    df_bs = preprocess_buyers_sellers(df)
+    # 3) Load bases (uma vez por versão do arquivo, compartilhado entre sessões)
+    version = data_version(DATA_PATH)
+    disk = get_disk_cache()  # cache persistente (BAROMETER_DISK_CACHE_DIR), se configurado
+    if disk is not None:
+        disk.register_version(version, DATA_PATH)  # chaves em disco pelo conteúdo, não pelo mtime
+    df, df_fill, df_custody, df_bs, catalog = cached(("base_tables", version),
+                                                     lambda: load_tables(DATA_PATH, version, SNAPSHOT_DIR))
 
     # 4) Sidebar → seção + períodos
-    section, preset, start_date, end_date, cur_df, prev_df, period_label = render_period_sidebar(
+    section, preset, start_date, end_date, cur_df, prev_df, period_label, view_key = render_period_sidebar(
         df_fill,  # 👉 usa df_fill aqui, pq a sidebar depende do calendário completo
         date_col="date",
         sections=[
@@ -49,49 +56,77 @@ def main():
             "Short Interest",
             "General Profile",
             "Top Buyers & Sellers",
-            # "Weekly Trading (demo)",
+            "Weekly Trading",
             "Custody",
-            "Buyers & Sellers"
+            "Buyers & Sellers",
+            "Rolling Flow",
+            "Broker Correlation",
         ],
         show_filters_title=False,
+        data_version=version,
+        catalog=catalog,
     )
+    render_instrumentation_panel()
 
     # 5) Conteúdo principal
     title_prefix = f"{section} – {period_label}"
+    date_bounds = catalog.clip_bounds(start_date, end_date)  # limites dos date pickers
+    client = get_query_client()  # serviço de consultas (BAROMETER_QUERY_URL), se configurado
+    # painel denso broker × dia × campo (uma vez por versão; None → groupbys no frame longo)
+    panel = cached(("broker_panel", version), lambda: build_panel(df_fill)) if PANEL_ENABLED else None
+    # resultados por seção pelo registro de utils.section_tasks (mesma chave que o prefetch aquece)
+    inputs = SectionInputs(df=df_fill, panel=panel, client=client)
 
     if section == "Company View":
         st.subheader(f" {title_prefix}")
-        metrics = compute_metrics(cur_df, prev_df)
+        # séries de tendência (sparklines) a partir do rollup diário pré-agregado
+        metrics = section_result("Company View", cur_df, prev_df, view_key, inputs)
         render_metric_cards(metrics, cols_per_row=4)
 
     elif section == "Short Interest":
         st.subheader(f" {title_prefix}")
-        render_short_interest(cur_df)
+        render_short_interest(cur_df, cache_key=view_key, inputs=inputs)
 
     elif section == "General Profile":
         st.subheader(f" {title_prefix}")
-        render_general_profile(cur_df, prev_df)
+        render_general_profile(cur_df, prev_df, cache_key=view_key)
 
     elif section == "Top Buyers & Sellers":
         st.subheader(f" {title_prefix}")
-        render_top_buyers_sellers(cur_df, top_n=5)
+        render_top_buyers_sellers(cur_df, top_n=TOP_N, cache_key=view_key, inputs=inputs)
 
-    # você comentou o Weekly Trading, então pode apagar ou deixar só comentado
-    # elif section == "Weekly Trading (demo)":
-    #     st.subheader(f" {title_prefix}")
-    #     render_weekly_trading(cur_df, 5)
+    elif section == "Weekly Trading":
+        st.subheader(f" {title_prefix}")
+        render_weekly_trading(cur_df, top_n=TOP_N, cache_key=view_key, inputs=inputs)
 
     elif section == "Custody":
         st.subheader(f" {title_prefix}")
-        render_custody(cur_df)
+        render_custody(cur_df, cache_key=view_key, date_bounds=date_bounds, inputs=inputs)
 
     elif section == "Buyers & Sellers":
         st.subheader(f" {title_prefix}")
-        render_buyers_sellers(cur_df)
+        render_buyers_sellers(cur_df, cache_key=view_key, date_bounds=date_bounds, inputs=inputs)
+
+    elif section == "Rolling Flow":
+        st.subheader(f" {title_prefix}")
+        # estado incremental por broker (df cru: só pregões reais), uma vez por versão dos dados
+        rolling = cached(("rolling", version), lambda: rolling_analytics(df))
+        render_rolling_flow(rolling, start_date, end_date, broker=view_key.broker, cache_key=view_key)
+
+    elif section == "Broker Correlation":
+        st.subheader(f" {title_prefix}")
+        render_broker_correlation(cur_df, cache_key=view_key, inputs=inputs)
 
     else:
         st.info("Select a section in the sidebar.")
 
+    # 6) Pré-aquece em segundo plano as visões prováveis seguintes (período anterior, outros presets)
+    pickers = {k: st.session_state[k] for k in ("custody_start", "custody_end", "bs_start", "bs_end", "si_threshold")
+               if k in st.session_state}
+    schedule_prefetch(section, preset, view_key,
+                      PrefetchContext(df_fill, catalog, panel=panel, client=client, pickers=pickers),
+                      back=int(st.session_state.get("periods_back", 0)))
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,62 @@
+import pandas as pd
+import streamlit as st
+import plotly.graph_objects as go
+
+from components.layout import section_fragment
+from components.payloads import display_table, payload_key, plotly_chart
+from utils.correlation import MIN_ACTIVE_DAYS, BrokerCorrelation
+from utils.section_tasks import SectionInputs, section_result
+
+SHOWN_OPTIONS = {"Top 30": 30, "Top 60": 60, "Top 100": 100, "All": None}  # por dias ativos
+TOP_PAIRS = 10
+
+
+def correlation_figure(result: BrokerCorrelation) -> go.Figure:
+    """Heatmap da matriz (ordem espectral: blocos de quem negocia junto na diagonal)."""
+    names = result.matrix.index.tolist()
+    fig = go.Figure(go.Heatmap(
+        z=result.matrix.to_numpy(), x=names, y=names,
+        colorscale="RdBu", zmid=0, zmin=-1, zmax=1,
+        colorbar=dict(title="ρ"),
+        hovertemplate="%{y} × %{x}<br>ρ = %{z:.2f}<extra></extra>",
+    ))
+    size = min(1200, max(420, 14 * len(names)))
+    fig.update_layout(height=size, margin=dict(l=10, r=10, t=30, b=10),
+                      yaxis=dict(autorange="reversed"), xaxis=dict(tickangle=-60))
+    return fig
+
+
+@section_fragment
+def render_broker_correlation(cur_df: pd.DataFrame, cache_key: tuple | None = None,
+                              inputs: SectionInputs | None = None) -> None:
+    """Correlação do net volume diário entre brokers no período (matriz em bloco + pares extremos)."""
+    if cur_df is None or cur_df.empty:
+        st.info("No data in the selected period.")
+        return
+
+    # matriz inteira uma vez por visão (período + brokers); o recorte exibido é barato
+    result = section_result("Broker Correlation", cur_df, None, cache_key, inputs or SectionInputs())
+    if result.brokers < 2:
+        st.info(f"Need at least two brokers with {MIN_ACTIVE_DAYS}+ active days in the period.")
+        return
+
+    st.markdown("## Broker Net-Flow Correlation")
+    shown = st.radio("Brokers shown (most active days):", list(SHOWN_OPTIONS), horizontal=True)
+    limit = SHOWN_OPTIONS[shown]
+    st.caption(f"Daily net volume (buy − sell) over {result.days} trading days · "
+               f"{min(limit or result.brokers, result.brokers)} of {result.brokers} brokers · "
+               "clustered by spectral ordering")
+    plotly_chart(payload_key("broker_correlation", cache_key, shown),
+                 lambda: correlation_figure(result.most_active(limit)), use_container_width=True)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("### Trade Together")
+        st.dataframe(display_table(payload_key("correlation_pairs", cache_key, True),
+                                   lambda: result.pairs(TOP_PAIRS, positive=True)),
+                     use_container_width=True, hide_index=True)
+    with col2:
+        st.markdown("### Trade Against")
+        st.dataframe(display_table(payload_key("correlation_pairs", cache_key, False),
+                                   lambda: result.pairs(TOP_PAIRS, positive=False)),
+                     use_container_width=True, hide_index=True)
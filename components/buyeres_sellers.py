@@ -1,14 +1,21 @@
 import streamlit as st
 import datetime
-from itables.streamlit import interactive_table
 
+from components.layout import section_fragment
+from components.payloads import interactive_table, payload_key
+from utils.section_tasks import SectionInputs, section_result
 
-def render_buyers_sellers(df_bs):
+
+@section_fragment
+def render_buyers_sellers(df_bs, cache_key=None, date_bounds=None, inputs: SectionInputs | None = None):
     st.header("Buyers & Sellers")
 
-    # === Define available date range ===
-    min_date = df_bs["date"].min().date()
-    max_date = df_bs["date"].max().date()
+    # === Define available date range (catálogo do dataset quando disponível) ===
+    if date_bounds is not None and date_bounds[0] is not None:
+        min_date, max_date = date_bounds
+    else:
+        min_date = df_bs["date"].min().date()
+        max_date = df_bs["date"].max().date()
 
     # === Session state initialization ===
     if "bs_start" not in st.session_state:
@@ -16,6 +23,10 @@ def render_buyers_sellers(df_bs):
     if "bs_end" not in st.session_state:
         st.session_state.bs_end = max_date
 
+    # período/broker mudou → mantém as datas salvas dentro dos novos limites
+    st.session_state.bs_start = min(max(st.session_state.bs_start, min_date), max_date)
+    st.session_state.bs_end = min(max(st.session_state.bs_end, min_date), max_date)
+
     # === Two separate date pickers ===
     col1, col2 = st.columns(2)
     with col1:
@@ -50,26 +61,12 @@ def render_buyers_sellers(df_bs):
     start_date = st.session_state.bs_start
     end_date = st.session_state.bs_end
 
-    # === Filter by selected period ===
-    bs_period = df_bs[
-        (df_bs["date"].dt.date >= start_date) &
-        (df_bs["date"].dt.date <= end_date)
-    ].copy()
-
-    if not bs_period.empty:
-        # === Consolidate by broker ===
-        bs_summary = (
-            bs_period.groupby("broker").agg(
-                start_balance=("start_balance", "first"),
-                end_balance=("end_balance", "last")
-            ).reset_index()
-        )
-        bs_summary["total_change"] = bs_summary["end_balance"] - bs_summary["start_balance"]
-        bs_summary["variation_pct"] = (bs_summary["total_change"] / bs_summary["start_balance"]) * 100
-        bs_summary["Category"] = bs_summary["total_change"].apply(
-            lambda x: "Buyer" if x > 0 else ("Seller" if x < 0 else "Neutral")
-        )
+    # === Filter + consolidate by broker (cached per view + period) ===
+    # com o serviço de consultas (client), o resumo vem dele: mesma visão + recorte dos date pickers
+    bs_summary = section_result("Buyers & Sellers", df_bs, None, cache_key, inputs or SectionInputs(),
+                                start_date, end_date)
 
+    if bs_summary is not None:
         # === Quick summary ===
         num_brokers = bs_summary["broker"].nunique()
         avg_var = bs_summary["variation_pct"].mean()
@@ -88,17 +85,19 @@ def render_buyers_sellers(df_bs):
         options = ["All brokers"] + bs_summary["broker"].unique().tolist()
         selected_broker = st.selectbox("Select broker (Buyers & Sellers):", options, index=0)
 
-        if selected_broker == "All brokers":
-            bs_filtered = bs_summary.copy()
-        else:
-            bs_filtered = bs_summary[bs_summary["broker"] == selected_broker]
+        def build_table():
+            if selected_broker == "All brokers":
+                bs_filtered = bs_summary.copy()
+            else:
+                bs_filtered = bs_summary[bs_summary["broker"] == selected_broker].copy()
 
-        # === Format numbers ===
-        if not bs_filtered.empty:
-            bs_filtered["start_balance"] = bs_filtered["start_balance"].map("{:,.0f}".format)
-            bs_filtered["end_balance"] = bs_filtered["end_balance"].map("{:,.0f}".format)
-            bs_filtered["total_change"] = bs_filtered["total_change"].map("{:,.0f}".format)
-            bs_filtered["variation_pct"] = bs_filtered["variation_pct"].map("{:.2f}%".format)
+            # === Format numbers ===
+            if not bs_filtered.empty:
+                bs_filtered["start_balance"] = bs_filtered["start_balance"].map("{:,.0f}".format)
+                bs_filtered["end_balance"] = bs_filtered["end_balance"].map("{:,.0f}".format)
+                bs_filtered["total_change"] = bs_filtered["total_change"].map("{:,.0f}".format)
+                bs_filtered["variation_pct"] = bs_filtered["variation_pct"].map("{:.2f}%".format)
+            return bs_filtered
 
         # === CSS fix for footer ===
         st.markdown(
@@ -119,8 +118,10 @@ def render_buyers_sellers(df_bs):
         )
 
         # === Show interactive table ===
+        # argumentos do itables (tabela já codificada) reaproveitados por visão + recorte + broker
         interactive_table(
-            bs_filtered,
+            payload_key("buyers_sellers", cache_key, start_date, end_date, selected_broker),
+            build_table,
             classes="display nowrap",
             paging=True,
             pageLength=20,
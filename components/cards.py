@@ -62,18 +62,27 @@ def render_metric_cards(
             fmt = m.get("fmt", "raw")
             delta_color = m.get("delta_color", "normal")
             help_text = m.get("help")
+            trend = m.get("trend")
+            chart_data = trend.dropna().tolist() if trend is not None else None
 
             # formatando valor e variação
             value_str = _format_value(fmt, cur)
             delta_str = _format_delta(cur, prev, "pct")
 
+            kwargs = dict(
+                label=label,
+                value=value_str,
+                delta=(delta_str if delta_str is not None else "—"),
+                delta_color=delta_color,
+                help=help_text if help_text else None
+            )
             with c:
-                st.metric(
-                    label=label,
-                    value=value_str,
-                    delta=(delta_str if delta_str is not None else "—"),
-                    delta_color=delta_color,
-                    help=help_text if help_text else None
-                )
+                if chart_data and len(chart_data) > 1:
+                    try:
+                        st.metric(**kwargs, chart_data=chart_data, chart_type="area")  # sparkline
+                    except TypeError:
+                        st.metric(**kwargs)  # Streamlit sem suporte a chart_data
+                else:
+                    st.metric(**kwargs)
 
             idx += 1
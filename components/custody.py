@@ -1,14 +1,21 @@
 import streamlit as st
 import datetime
-from itables.streamlit import interactive_table
 
+from components.layout import section_fragment
+from components.payloads import interactive_table, payload_key
+from utils.section_tasks import SectionInputs, section_result
 
-def render_custody(df_custody):
+
+@section_fragment
+def render_custody(df_custody, cache_key=None, date_bounds=None, inputs: SectionInputs | None = None):
     st.header("Custody")
 
-    # === Define available date range ===
-    min_date = df_custody["date"].min().date()
-    max_date = df_custody["date"].max().date()
+    # === Define available date range (catálogo do dataset quando disponível) ===
+    if date_bounds is not None and date_bounds[0] is not None:
+        min_date, max_date = date_bounds
+    else:
+        min_date = df_custody["date"].min().date()
+        max_date = df_custody["date"].max().date()
 
     # === Session state initialization ===
     if "custody_start" not in st.session_state:
@@ -16,6 +23,10 @@ def render_custody(df_custody):
     if "custody_end" not in st.session_state:
         st.session_state.custody_end = max_date
 
+    # período/broker mudou → mantém as datas salvas dentro dos novos limites
+    st.session_state.custody_start = min(max(st.session_state.custody_start, min_date), max_date)
+    st.session_state.custody_end = min(max(st.session_state.custody_end, min_date), max_date)
+
     # === Two separate date pickers ===
     col1, col2 = st.columns(2)
     with col1:
@@ -50,25 +61,12 @@ def render_custody(df_custody):
     start_date = st.session_state.custody_start
     end_date = st.session_state.custody_end
 
-    # === Filter custody by selected period ===
-    custody_period = df_custody[
-        (df_custody["date"].dt.date >= start_date) &
-        (df_custody["date"].dt.date <= end_date)
-    ].copy()
-
-    if not custody_period.empty:
-        # === Consolidate custody by broker for the whole period ===
-        custody_summary = (
-            custody_period.groupby("broker").agg(
-                start_balance=("start_balance", "first"),
-                end_balance=("end_balance", "last")
-            ).reset_index()
-        )
-        custody_summary["total_change"] = custody_summary["end_balance"] - custody_summary["start_balance"]
-        custody_summary["variation_pct"] = (
-            custody_summary["total_change"] / custody_summary["start_balance"]
-        ) * 100
+    # === Filter + consolidate custody (cached per view + period) ===
+    # com o serviço de consultas (client), o resumo vem dele: mesma visão + recorte dos date pickers
+    custody_summary = section_result("Custody", df_custody, None, cache_key, inputs or SectionInputs(),
+                                     start_date, end_date)
 
+    if custody_summary is not None:
         # === Quick summary ===
         num_brokers = custody_summary["broker"].nunique()
         avg_var = custody_summary["variation_pct"].mean()
@@ -87,17 +85,19 @@ def render_custody(df_custody):
         options = ["All brokers"] + custody_summary["broker"].unique().tolist()
         selected_broker = st.selectbox("Select broker:", options, index=0)
 
-        if selected_broker == "All brokers":
-            custody_filtered = custody_summary.copy()
-        else:
-            custody_filtered = custody_summary[custody_summary["broker"] == selected_broker]
+        def build_table():
+            if selected_broker == "All brokers":
+                custody_filtered = custody_summary.copy()
+            else:
+                custody_filtered = custody_summary[custody_summary["broker"] == selected_broker].copy()
 
-        # === Format numbers for display ===
-        if not custody_filtered.empty:
-            custody_filtered["start_balance"] = custody_filtered["start_balance"].map("{:,.0f}".format)
-            custody_filtered["end_balance"] = custody_filtered["end_balance"].map("{:,.0f}".format)
-            custody_filtered["total_change"] = custody_filtered["total_change"].map("{:,.0f}".format)
-            custody_filtered["variation_pct"] = custody_filtered["variation_pct"].map("{:.2f}%".format)
+            # === Format numbers for display ===
+            if not custody_filtered.empty:
+                custody_filtered["start_balance"] = custody_filtered["start_balance"].map("{:,.0f}".format)
+                custody_filtered["end_balance"] = custody_filtered["end_balance"].map("{:,.0f}".format)
+                custody_filtered["total_change"] = custody_filtered["total_change"].map("{:,.0f}".format)
+                custody_filtered["variation_pct"] = custody_filtered["variation_pct"].map("{:.2f}%".format)
+            return custody_filtered
 
         # === CSS reforçado para o rodapé já no primeiro render ===
         st.markdown(
@@ -120,8 +120,10 @@ def render_custody(df_custody):
         )
 
         # === Show interactive table ===
+        # argumentos do itables (tabela já codificada) reaproveitados por visão + recorte + broker
         interactive_table(
-            custody_filtered,
+            payload_key("custody", cache_key, start_date, end_date, selected_broker),
+            build_table,
             classes="display nowrap",
             paging=True,
             pageLength=20,
@@ -0,0 +1,34 @@
+from __future__ import annotations
+import streamlit as st
+
+from utils.result_cache import get_result_cache
+from utils.prefetch import get_prefetcher
+from utils.disk_cache import get_disk_cache
+
+
+def render_instrumentation_panel(expanded: bool = False) -> None:
+    """Painel de instrumentação na sidebar (estado do cache de resultados do processo)."""
+    stats = get_result_cache().stats()
+    with st.sidebar.expander("⚙️ Instrumentation", expanded=expanded):
+        st.caption("Result cache (shared by all sessions)")
+        st.markdown(
+            f"- Hit ratio: **{stats['hit_ratio'] * 100:.1f}%** "
+            f"({stats['hits']:,} hits / {stats['misses']:,} misses)  \n"
+            f"- Entries: **{stats['entries']:,}**  \n"
+            f"- Memory: **{stats['bytes'] / 1024**2:,.1f} MB** of {stats['max_bytes'] / 1024**2:,.0f} MB"
+        )
+        disk = get_disk_cache()
+        if disk is not None:
+            d = disk.stats()
+            st.caption("Disk cache (survives restarts)")
+            st.markdown(
+                f"- Hits: **{d['hits']:,}** · misses: **{d['misses']:,}** · writes: **{d['writes']:,}**  \n"
+                f"- Disk: **{d['bytes'] / 1024**2:,.1f} MB** of {d['max_bytes'] / 1024**2:,.0f} MB "
+                f"({d['entries']:,} entries)"
+            )
+        prefetch = get_prefetcher().stats()
+        st.caption("Background prefetch (likely next views)")
+        st.markdown(
+            f"- Workers: **{prefetch['workers']}** · pending: **{prefetch['pending']}**  \n"
+            f"- Views submitted: **{prefetch['submitted']:,}** · errors: **{prefetch['errors']:,}**"
+        )
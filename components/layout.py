@@ -113,6 +113,16 @@ def sidebar_divider():
     )
 
 
+def section_fragment(func):
+    """
+    Seção como fragmento independente (st.fragment): widgets dentro da seção
+    reexecutam só a própria seção, não o app.main() inteiro.
+    Em versões do Streamlit sem fragmentos, a função é usada como está.
+    """
+    fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+    return fragment(func) if fragment else func
+
+
 def section_title(text: str):
     """Título de seção padronizado no corpo da página."""
     st.markdown(f"<div class='section-title'>{text}</div>", unsafe_allow_html=True)
@@ -0,0 +1,82 @@
+"""
+Payloads de render (figuras plotly, argumentos do itables) reaproveitados entre reruns.
+
+A chave é a impressão digital do conteúdo da seção (ViewKey.fingerprint: dados + filtro)
+mais os parâmetros do próprio render (modo, broker da tabela, ...). Mesma impressão
+digital → o mesmo objeto sai do cache de resultados, sem reconstruir a figura nem
+recodificar a tabela; como o payload enviado fica byte a byte igual, o Streamlit também
+não reenvia a mensagem para um navegador que já a tem (ForwardMsgCache).
+"""
+from __future__ import annotations
+import warnings
+from dataclasses import dataclass
+from typing import Any, Callable
+
+import pandas as pd
+import plotly.io
+import streamlit as st
+from itables.javascript import get_itables_extension_arguments
+
+from utils.result_cache import cached, content_fingerprint
+
+# componente do itables.streamlit (interactive_table sem recodificar o DataFrame). É interno
+# ao itables, por isso a versão fica fixada na minor em requirements.txt (itables~=2.9.1).
+try:
+    from itables.streamlit import _streamlit_component_func
+except ImportError:  # outra versão do itables: usa a função pública, sem reaproveitar o payload
+    _streamlit_component_func = None
+    warnings.warn("itables.streamlit._streamlit_component_func not found; itables payloads are not reused "
+                  "(requirements.txt pins itables~=2.9.1)", RuntimeWarning, stacklevel=1)
+
+
+def payload_key(section: str, cache_key: tuple | None, *params) -> tuple | None:
+    """(seção, impressão digital das entradas, parâmetros do render); None sem chave da visão."""
+    if not cache_key:
+        return None
+    fingerprint = getattr(cache_key, "fingerprint", None) or content_fingerprint(*cache_key)
+    return (section, fingerprint) + params
+
+
+@dataclass(frozen=True)
+class Payload:
+    """Objeto pronto para o render + tamanho aproximado (orçamento do cache)."""
+    value: Any
+    nbytes: int
+
+
+def _figure_payload(build: Callable[[], Any]) -> Payload:
+    fig = build()
+    return Payload(fig, len(plotly.io.to_json(fig, validate=False)))
+
+
+def plotly_chart(key: tuple | None, build: Callable[[], Any], **kwargs) -> None:
+    """st.plotly_chart com a figura construída uma vez por chave (None → sempre constrói)."""
+    payload = cached(("figure",) + key if key else None, lambda: _figure_payload(build))
+    st.plotly_chart(payload.value, **kwargs)
+
+
+def display_table(key: tuple | None, build: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+    """Tabela de exibição (ordenada/formatada) montada uma vez por chave, para st.dataframe."""
+    return cached(("table",) + key if key else None, build)
+
+
+def _table_payload(build: Callable[[], pd.DataFrame], caption, options) -> Payload:
+    df = build()
+    dt_args, other_args = get_itables_extension_arguments(df, caption, **options)
+    return Payload((dt_args, other_args), int(df.memory_usage(deep=True).sum()))
+
+
+def interactive_table(key: tuple | None, build: Callable[[], pd.DataFrame], caption: str | None = None,
+                      **options) -> None:
+    """itables interactive_table com os argumentos (dados já codificados) guardados por chave."""
+    if _streamlit_component_func is None:
+        from itables.streamlit import interactive_table as render
+        render(build(), caption=caption, **options)
+        return
+    payload = cached(("itables",) + key if key else None, lambda: _table_payload(build, caption, options))
+    dt_args, other_args = payload.value
+    _streamlit_component_func(
+        data={"dt_args": dt_args, "other_args": other_args},
+        on_selected_rows_change=lambda: None,
+        default={"selected_rows": []},
+    )
@@ -0,0 +1,59 @@
+import pandas as pd
+import streamlit as st
+import plotly.graph_objects as go
+
+from components.layout import section_fragment
+from components.payloads import display_table, payload_key, plotly_chart
+from utils.result_cache import cached
+from utils.rolling import METRICS, RollingAnalytics
+
+
+@section_fragment
+def render_rolling_flow(rolling: RollingAnalytics, start_date, end_date, broker: str = "All",
+                        cache_key: tuple | None = None) -> None:
+    """Net flow, VWAP ponderado e eficiência em janelas móveis de 5/20/60 pregões por broker."""
+    # data de referência: último pregão até o fim do período (precisa cair dentro dele)
+    i = rolling.days.searchsorted(pd.Timestamp(end_date), side="right") - 1
+    if i < 0 or rolling.days[i] < pd.Timestamp(start_date):
+        st.info("No data in the selected period.")
+        return
+    as_of = rolling.days[i]
+    windows = [f"{w}d" for w in rolling.state.windows]
+
+    table = cached(
+        ("rolling_flow",) + cache_key if cache_key else None,
+        lambda: rolling.frame(as_of=as_of, broker=broker),
+    )
+    if table.empty:
+        st.info("No data for the selected broker.")
+        return
+
+    # === Net flow ao longo do período ===
+    def build_figure():
+        series = rolling.series("net_flow", start_date, end_date, broker=broker)
+        fig = go.Figure()
+        for w in windows:
+            fig.add_trace(go.Scatter(x=series.index, y=series[w], mode="lines", name=f"Net flow {w}"))
+        fig.add_hline(y=0, line=dict(width=1, color="#999"))
+        fig.update_layout(height=320, margin=dict(l=10, r=10, t=30, b=30),
+                          xaxis_title="Date", yaxis_title="Net Volume (Buy − Sell)")
+        return fig
+
+    st.markdown("## Rolling Net Flow")
+    plotly_chart(payload_key("rolling_flow", cache_key), build_figure, use_container_width=True)
+
+    # === Tabela por broker na data de referência ===
+    metric = st.radio("Sort by:", [f"net_flow_{w}" for w in windows], index=1, horizontal=True)
+    st.markdown(f"### Brokers as of {as_of:%Y/%m/%d}")
+
+    def build_view():
+        view = table.sort_values(metric, ascending=False).reset_index(drop=True)
+        for m in METRICS:
+            fmt = "{:,.0f}" if m == "net_flow" else "{:.4f}"
+            for w in windows:
+                view[f"{m}_{w}"] = view[f"{m}_{w}"].map(lambda x, f=fmt: "–" if pd.isna(x) else f.format(x))
+        return view
+
+    # tabela já formatada por métrica de ordenação: trocar o radio de volta não reformata
+    st.dataframe(display_table(payload_key("rolling_flow_view", cache_key, metric), build_view),
+                 use_container_width=True, hide_index=True)
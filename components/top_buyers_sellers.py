@@ -4,25 +4,9 @@ import pandas as pd
 import streamlit as st
 import plotly.graph_objects as go
 
-
-def _to_num(s: pd.Series) -> pd.Series:
-    """Converte série em numérica, tratando erros."""
-    return pd.to_numeric(s, errors="coerce")
-
-
-def _normalize(df: pd.DataFrame) -> pd.DataFrame:
-    """Normaliza colunas e garante consistência de tipos."""
-    data = df.copy()
-    if "date" in data.columns:
-        data["date"] = pd.to_datetime(data["date"], errors="coerce")
-    for c in ["buy_volume", "sell_volume"]:
-        data[c] = _to_num(data[c]) if c in data.columns else 0
-    if "broker" not in data.columns:
-        if "investor" in data.columns:
-            data = data.rename(columns={"investor": "broker"})
-        else:
-            data["broker"] = "Unknown"
-    return data
+from components.layout import section_fragment
+from components.payloads import payload_key, plotly_chart
+from utils.section_tasks import SectionInputs, section_result
 
 
 def _format_number(x: float) -> str:
@@ -56,37 +40,25 @@ def _bar_h(df: pd.DataFrame, x_col: str, y_col: str, title: str, color: str) ->
     return fig
 
 
-def render_top_buyers_sellers(cur_df: pd.DataFrame, top_n: int = 5, show_tables: bool = False) -> None:
+@section_fragment
+def render_top_buyers_sellers(cur_df: pd.DataFrame, top_n: int = 5, show_tables: bool = False,
+                              cache_key: tuple | None = None, inputs: SectionInputs | None = None) -> None:
     """Renderiza gráficos Top Buyers & Sellers (Gross ou Net) em linhas separadas."""
     if cur_df is None or cur_df.empty:
         st.info("No data in the selected period.")
         return
 
-    data = _normalize(cur_df)
-
     # Altern mode
     mode = st.radio("Calculation Mode:", ["Gross (Total Volumes)", "Net (Buy - Sell)"], horizontal=True)
 
-    if mode.startswith("Gross"):
-        buyers = (data.groupby("broker", as_index=False)["buy_volume"].sum()
-                  .sort_values("buy_volume", ascending=False).head(top_n))
-
-        sellers = (data.groupby("broker", as_index=False)["sell_volume"].sum()
-                   .assign(sell_volume=lambda d: -d["sell_volume"])  # deixa negativo para sellers
-                   .sort_values("sell_volume").head(top_n))
+    # as quatro rankings (Gross/Net) saem juntas → trocar o modo não recalcula
+    rankings = section_result("Top Buyers & Sellers", cur_df, None, cache_key, inputs or SectionInputs(), top_n)
+    buyers, sellers = rankings.for_mode(mode)
 
+    if mode.startswith("Gross"):
         buyers_title = f"Top {top_n} Buyers – Gross Volume"
         sellers_title = f"Top {top_n} Sellers – Gross Volume"
-
-    else:  # Net
-        net = (data.groupby("broker", as_index=False)
-               .agg(buy_volume=("buy_volume", "sum"),
-                    sell_volume=("sell_volume", "sum")))
-        net["net_volume"] = net["buy_volume"] - net["sell_volume"]
-
-        buyers = net[net["net_volume"] > 0].sort_values("net_volume", ascending=False).head(top_n)
-        sellers = net[net["net_volume"] < 0].sort_values("net_volume", ascending=True).head(top_n)
-
+    else:
         buyers_title = f"Top {top_n} Buyers – Net Volume"
         sellers_title = f"Top {top_n} Sellers – Net Volume"
 
@@ -94,15 +66,17 @@ def render_top_buyers_sellers(cur_df: pd.DataFrame, top_n: int = 5, show_tables:
   
     # Buyers
     st.markdown(f"### Top {top_n} Buyers")
-    st.plotly_chart(
-        _bar_h(buyers, buyers.columns[-1], "broker", buyers_title, "#2ecc71"),
+    plotly_chart(
+        payload_key("top_buyers", cache_key, top_n, mode),
+        lambda: _bar_h(buyers, buyers.columns[-1], "broker", buyers_title, "#2ecc71"),
         use_container_width=True
     )
 
     # Sellers
     st.markdown(f"### Top {top_n} Sellers")
-    st.plotly_chart(
-        _bar_h(sellers, sellers.columns[-1], "broker", sellers_title, "#e74c3c"),
+    plotly_chart(
+        payload_key("top_sellers", cache_key, top_n, mode),
+        lambda: _bar_h(sellers, sellers.columns[-1], "broker", sellers_title, "#e74c3c"),
         use_container_width=True
     )
 
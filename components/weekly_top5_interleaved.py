@@ -1,83 +1,77 @@
 # components/weekly_trading.py
+import math
+
+import numpy as np
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
-from utils.periods import _last_closed_week_data  # já existente
-
-def render_weekly_trading(df: pd.DataFrame, top_n: int = 5) -> None:
-    st.subheader("🔎 Weekly Trading Activity – Top Buyers and Sellers (Net Volume)")
+from plotly.subplots import make_subplots
 
-    if df.empty:
-        st.info("No trading data available for this period.")
-        return
+from components.payloads import payload_key, plotly_chart
+from utils.section_tasks import SectionInputs, section_result
 
-    # Última semana fechada (pelos dados)
-    start, end = _last_closed_week_data(df, "date")
-    if start is None:
-        st.warning("Dataset vazio ou sem semanas completas.")
-        return
+COLS = 2             # gráficos por linha
+ROW_HEIGHT = 320     # px por linha de semanas
+WEEKS_PER_PAGE = 8   # semanas por figura (4 linhas); períodos longos são paginados
+SIDE_COLORS = {"Buy": "green", "Sell": "red"}
 
-    # Normaliza datas
-    df = df.copy()
-    df["date"] = pd.to_datetime(df["date"])
-    df["week"] = df["date"].dt.to_period("W-FRI").apply(lambda r: r.start_time.normalize())
 
-    # Agregado semanal
-    weekly = (
-        df.groupby(["week", "broker"], as_index=False)
-          .agg(buy_volume=("buy_volume", "sum"),
-               sell_volume=("sell_volume", "sum"))
+def weekly_figure(table: pd.DataFrame) -> go.Figure:
+    """Uma figura com um subplot por semana da tabela (mais recente primeiro)."""
+    weeks = table["week"].unique()  # já ordenadas da mais recente para a mais antiga
+    rows = math.ceil(len(weeks) / COLS)
+    fig = make_subplots(
+        rows=rows, cols=COLS,
+        subplot_titles=[f"Week of {pd.Timestamp(w):%b %d, %Y} – Net Volume" for w in weeks],
+        vertical_spacing=min(0.12, 0.4 / rows),
+        horizontal_spacing=0.08,
     )
-    weekly["net_volume"] = weekly["buy_volume"] - weekly["sell_volume"]
-
-    # Últimas 4 semanas baseadas nos dados
-    last_4_weeks = sorted(weekly["week"].unique())[-4:]
 
-    week_figs = []
-    for week in last_4_weeks[::-1]:  # mais recente à esquerda
-        week_df = weekly[weekly["week"] == week]
-        if week_df.empty:
-            continue
+    # fronteiras de cada semana na tabela ordenada → um trace por subplot, sem loop por linha
+    week = table["week"].to_numpy()
+    bounds = np.flatnonzero(week[1:] != week[:-1]) + 1
+    starts, ends = np.r_[0, bounds], np.r_[bounds, len(table)]
+    colors = table["side"].astype(str).map(SIDE_COLORS).to_numpy()
+    brokers, volumes = table["broker"].to_numpy(), table["net_volume"].to_numpy()
+    for i, (a, b) in enumerate(zip(starts, ends)):
+        fig.add_trace(
+            go.Bar(x=brokers[a:b], y=volumes[a:b], marker_color=colors[a:b], showlegend=False,
+                   hovertemplate="%{x}<br>Net: %{y:,.0f}<extra></extra>"),
+            row=i // COLS + 1, col=i % COLS + 1,
+        )
 
-        buyers = week_df[week_df["net_volume"] > 0].sort_values("net_volume", ascending=False).head(top_n)
-        sellers = week_df[week_df["net_volume"] < 0].sort_values("net_volume", ascending=True).head(top_n)
+    fig.update_xaxes(tickangle=-40)
+    fig.update_yaxes(title_text="Net Volume", col=1)
+    fig.update_layout(template="simple_white", height=ROW_HEIGHT * rows,
+                      margin=dict(l=20, r=20, t=40, b=20))
+    return fig
 
-        bars = []
-        for _, row in buyers.iterrows():
-            bars.append({"label": row["broker"], "volume": row["net_volume"], "type": "Buy"})
-        for _, row in sellers.iterrows():
-            bars.append({"label": row["broker"], "volume": row["net_volume"], "type": "Sell"})
 
-        wdf = pd.DataFrame(bars)
-        order = wdf["label"].tolist()
+def render_weekly_trading(df: pd.DataFrame, top_n: int = 5, cache_key: tuple | None = None,
+                          inputs: SectionInputs | None = None) -> None:
+    st.subheader("🔎 Weekly Trading Activity – Top Buyers and Sellers (Net Volume)")
 
-        fig = go.Figure()
-        fig.add_trace(go.Bar(
-            x=wdf.loc[wdf["type"]=="Buy", "label"],
-            y=wdf.loc[wdf["type"]=="Buy", "volume"],
-            name="Buy", marker_color="green"
-        ))
-        fig.add_trace(go.Bar(
-            x=wdf.loc[wdf["type"]=="Sell", "label"],
-            y=wdf.loc[wdf["type"]=="Sell", "volume"],
-            name="Sell", marker_color="red"
-        ))
-        fig.update_xaxes(categoryorder="array", categoryarray=order, tickangle=-40)
-        fig.update_layout(
-            title=f"Week of {week.strftime('%b %d')} – Net Volume",
-            barmode="group", template="simple_white", showlegend=False,
-            height=380, margin=dict(l=20, r=20, t=40, b=20),
-            yaxis_title="Net Volume"
-        )
-        week_figs.append(fig)
+    if df.empty:
+        st.info("No trading data available for this period.")
+        return
 
-    # Layout em 2 gráficos por linha
-    if not week_figs:
-        st.warning("Nenhum dado para semanas recentes.")
+    # tabela de ranks semanal (todas as semanas do período de uma vez, vetorizada)
+    table = section_result("Weekly Trading", df, None, cache_key, inputs or SectionInputs(), top_n)
+    if table.empty:
+        st.warning("No net buyers or sellers in the selected weeks.")
         return
 
-    for i in range(0, len(week_figs), 2):
-        cols = st.columns(2)
-        for j, fig in enumerate(week_figs[i:i+2]):
-            with cols[j]:
-                st.plotly_chart(fig, use_container_width=True)
+    # semanas Seg–Dom (calendário do app, utils.calendar_table): nos dias úteis agrupam
+    # como as semanas W-FRI de antes, mas o rótulo é a segunda-feira. Uma figura por
+    # página de WEEKS_PER_PAGE semanas (altura e payload limitados), montada uma vez por visão
+    weeks = table["week"].unique()  # da mais recente para a mais antiga
+    pages = [weeks[i:i + WEEKS_PER_PAGE] for i in range(0, len(weeks), WEEKS_PER_PAGE)]
+    page = 0
+    if len(pages) > 1:
+        page = st.selectbox(
+            "Weeks:", range(len(pages)), key="weekly_page",
+            format_func=lambda i: f"{pd.Timestamp(pages[i][0]):%b %d, %Y} – {pd.Timestamp(pages[i][-1]):%b %d, %Y}",
+        )
+    page_table = table[table["week"].isin(pages[page])]
+    plotly_chart(payload_key("weekly_trading", cache_key, top_n, page), lambda: weekly_figure(page_table),
+                 use_container_width=True)
@@ -0,0 +1,40 @@
+"""Frame sintético no formato normalized broker frame para os testes de paridade."""
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+
+from utils.broker_frame import normalize_broker_frame
+
+PROFILES = ["Foreign", "Institutional", "Retail"]
+
+
+def make_frame(seed: int = 0, n_brokers: int = 8, start: str = "2024-01-01", periods: int = 90,
+               missing: float = 0.1) -> pd.DataFrame:
+    """
+    Brokers × dias úteis com linhas faltando (fração `missing`), volumes inteiros de uma
+    faixa pequena (gera empates nos rankings), VWAPs/saldos/eficiência com NaN e um
+    profile fixo por broker.
+    """
+    rng = np.random.default_rng(seed)
+    brokers = [f"Broker {i:02d}" for i in range(n_brokers)]
+    days = pd.bdate_range(start, periods=periods)
+    df = pd.MultiIndex.from_product([brokers, days], names=["broker", "date"]).to_frame(index=False)
+    df = df[rng.random(len(df)) >= missing].reset_index(drop=True)
+    n = len(df)
+
+    def with_nan(values, frac=0.05):
+        values = values.astype(float)
+        values[rng.random(n) < frac] = np.nan
+        return values
+
+    df["buy_volume"] = rng.integers(0, 20, n) * 100
+    df["sell_volume"] = rng.integers(0, 20, n) * 100
+    df["buy_vwap"] = with_nan(rng.uniform(9, 11, n).round(2))
+    df["sell_vwap"] = with_nan(rng.uniform(9, 11, n).round(2))
+    df["start_balance"] = with_nan(rng.integers(1_000, 50_000, n))
+    df["end_balance"] = with_nan(rng.integers(1_000, 50_000, n))
+    df["efficiency_score"] = with_nan(rng.uniform(0, 1, n))
+    df["short_interest"] = rng.lognormal(8, 1, n).round()
+    df["anon_volume"] = np.where(rng.random(n) < 0.3, rng.integers(1, 10, n) * 100, 0)
+    df["profile"] = df["broker"].map({b: PROFILES[i % len(PROFILES)] for i, b in enumerate(brokers)})
+    return normalize_broker_frame(df)
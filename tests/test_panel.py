@@ -0,0 +1,56 @@
+import pandas as pd
+import pytest
+
+from tests.synthetic import make_frame
+from utils.filter_data import filter_data
+from utils.panel import build_panel
+from utils.sections import (buyers_sellers_summary, custody_summary, short_interest_peaks, top_rankings,
+                            weekly_net_rankings)
+
+VIEWS = [
+    ("2024-01-01", "2024-05-03", "All"),
+    ("2024-02-07", "2024-03-14", "All"),
+    ("2024-02-07", "2024-03-14", "Broker 03"),
+    ("2024-01-15", "2024-04-19", ("Broker 01", "Broker 04", "Broker 06")),
+    ("2030-01-01", "2030-01-31", "All"),  # janela sem dias
+]
+
+
+@pytest.fixture(scope="module")
+def frame():
+    return make_frame(seed=3)
+
+
+@pytest.fixture(scope="module")
+def panel(frame):
+    return build_panel(frame)
+
+
+def _frames_equal(left, right):
+    pd.testing.assert_frame_equal(left.reset_index(drop=True), right.reset_index(drop=True))
+
+
+@pytest.mark.parametrize("start,end,broker", VIEWS)
+def test_window_matches_groupby(frame, panel, start, end, broker):
+    cur = filter_data(frame, date_range=(start, end), broker=broker)
+    window = panel.window(start, end, broker)
+
+    for mode in ("Gross", "Net"):
+        for with_window, with_groupby in zip(top_rankings(cur, 5, window).for_mode(mode),
+                                             top_rankings(cur, 5).for_mode(mode)):
+            _frames_equal(with_window, with_groupby)
+
+    _frames_equal(weekly_net_rankings(cur, 3, window), weekly_net_rankings(cur, 3))
+    _frames_equal(short_interest_peaks(cur, window=window)[0], short_interest_peaks(cur)[0])
+
+    lo, hi = pd.Timestamp(start).date(), pd.Timestamp(end).date()
+    for summarize in (custody_summary, buyers_sellers_summary):
+        with_window, with_groupby = summarize(cur, lo, hi, window), summarize(cur, lo, hi)
+        if with_groupby is None:
+            assert with_window is None
+        else:
+            _frames_equal(with_window, with_groupby)
+
+
+def test_duplicate_broker_days_fall_back_to_groupby(frame):
+    assert build_panel(pd.concat([frame, frame.iloc[:1]])) is None
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tests.synthetic import make_frame
+from utils.profile_stats import profile_period_stats
+
+
+def _groupby_aggregate(df: pd.DataFrame) -> dict:
+    """Agregados do General Profile como eram calculados antes (nansum, _wavg e groupbys)."""
+    buy, sell = df["buy_volume"], df["sell_volume"]
+    total_buy, total_sell = float(np.nansum(buy)), float(np.nansum(sell))
+    by_profile = df.groupby("profile", as_index=False)["buy_volume"].sum()
+    return {
+        "total_buy": total_buy,
+        "total_sell": total_sell,
+        "w_buy_vwap": float(np.nansum(df["buy_vwap"] * buy) / np.nansum(buy)),
+        "w_sell_vwap": float(np.nansum(df["sell_vwap"] * sell) / np.nansum(sell)),
+        "anon_pct": float(np.nansum(df["anon_volume"])) / (total_buy + total_sell) * 100.0,
+        "top_profile": by_profile.sort_values("buy_volume", ascending=False)["profile"].iloc[0],
+        "n_entities": int(df["broker"].nunique()),
+        "profile_volumes": by_profile.rename(columns={"buy_volume": "total_buy_volume"}),
+    }
+
+
+def _assert_same(stats: dict, expected: dict) -> None:
+    for name in ("total_buy", "total_sell", "top_profile", "n_entities"):
+        assert stats[name] == expected[name], name
+    for name in ("w_buy_vwap", "w_sell_vwap", "anon_pct"):
+        assert stats[name] == pytest.approx(expected[name], rel=1e-12), name
+    pd.testing.assert_frame_equal(stats["profile_volumes"].reset_index(drop=True),
+                                  expected["profile_volumes"], check_dtype=False)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_matches_groupby_for_both_periods(seed):
+    df = make_frame(seed)
+    split = df["date"].sort_values().iloc[len(df) // 2]
+    cur, prev = df[df["date"] >= split], df[df["date"] < split]
+
+    cur_stats, prev_stats = profile_period_stats([cur, prev])
+
+    _assert_same(cur_stats, _groupby_aggregate(cur))
+    _assert_same(prev_stats, _groupby_aggregate(prev))
+
+
+def test_missing_or_empty_period_is_none():
+    df = make_frame()
+    cur_stats, prev_stats, empty_stats = profile_period_stats([df, None, df.iloc[:0]])
+    _assert_same(cur_stats, _groupby_aggregate(df))
+    assert prev_stats is None and empty_stats is None
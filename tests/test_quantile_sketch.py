@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tests.synthetic import make_frame
+from utils.quantile_sketch import TOTAL, KLLSketch, build_sketches, merge_sketches, short_interest_sketches
+
+QS = [0.05, 0.5, 0.9, 0.95, 0.99]
+
+
+@pytest.fixture(scope="module")
+def frame():
+    return make_frame(seed=7, n_brokers=6, start="2023-11-01", periods=320)
+
+
+def _daily(df: pd.DataFrame) -> pd.DataFrame:
+    return df.groupby("date", as_index=False)["short_interest"].sum().sort_values("date")
+
+
+def test_small_sketch_is_exact():
+    values = np.random.default_rng(0).lognormal(8, 1, 150)
+    sketch = KLLSketch(k=200).update(values)
+    assert sketch.exact
+    np.testing.assert_array_equal(sketch.quantiles(QS), np.quantile(values, QS))
+
+
+def test_merged_sketches_stay_within_rank_error():
+    rng = np.random.default_rng(1)
+    parts = [rng.lognormal(8, 1, 20_000) for _ in range(10)]
+    sketch = merge_sketches(KLLSketch(k=200).update(p) for p in parts)
+    values = np.sort(np.concatenate(parts))
+    assert not sketch.exact and sketch.count == len(values)
+    ranks = np.searchsorted(values, sketch.quantiles(QS)) / len(values)
+    np.testing.assert_allclose(ranks, QS, atol=0.02)
+
+
+@pytest.mark.parametrize("start,end", [("2024-01-01", "2024-06-30"),   # meses inteiros
+                                       ("2024-01-17", "2024-09-05"),   # pontas parciais
+                                       ("2024-03-04", "2024-03-15")])  # só um mês parcial
+def test_window_quantile_matches_numpy(frame, start, end):
+    sketches = build_sketches(frame)
+    window = frame[(frame["date"] >= start) & (frame["date"] <= end)]
+
+    daily = _daily(window)
+    assert sketches.window_quantile(0.95, daily, TOTAL) == pytest.approx(daily["short_interest"].quantile(0.95))
+
+    broker = "Broker 02"
+    daily = _daily(window[window["broker"] == broker])
+    assert sketches.window_quantile(0.95, daily, broker) == pytest.approx(daily["short_interest"].quantile(0.95))
+
+
+def test_history_quantile_matches_numpy(frame):
+    sketches = build_sketches(frame)
+    values = frame.loc[frame["broker"] == "Broker 04"].set_index("date")["short_interest"]
+
+    # até k itens no merge: exato
+    expected = values["2024-07-01":"2024-12-31"].quantile(0.95)
+    assert sketches.history_quantile(0.95, "2024-12-10", "Broker 04", months=6) == pytest.approx(expected)
+
+    # 12 meses passam de k: dentro do erro de rank do KLL
+    year = np.sort(values["2024-01-01":"2024-12-31"].to_numpy())
+    rank = np.searchsorted(year, sketches.history_quantile(0.95, "2024-12-10", "Broker 04")) / len(year)
+    assert rank == pytest.approx(0.95, abs=0.02)
+
+
+def test_extend_matches_full_build(frame):
+    cut = pd.Timestamp("2024-07-17")  # no meio de um mês
+    incremental = build_sketches(frame[frame["date"] < cut]).extend(frame)
+    full = build_sketches(frame)
+    assert incremental.month_days == full.month_days and set(incremental.sketches) == set(full.sketches)
+    for key, sketch in full.sketches.items():
+        np.testing.assert_array_equal(incremental.sketches[key].quantiles(QS), sketch.quantiles(QS))
+
+
+def test_latest_state_rebuilds_after_correction(frame):
+    short_interest_sketches(frame[frame["date"] < frame["date"].max()])
+    corrected = frame.copy()
+    corrected.loc[corrected.index[3], "short_interest"] *= 10
+    latest, full = short_interest_sketches(corrected), build_sketches(corrected)
+    for key, sketch in full.sketches.items():
+        np.testing.assert_array_equal(latest.sketches[key].quantiles(QS), sketch.quantiles(QS))
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tests.synthetic import make_frame
+from utils.rolling import METRICS, WINDOWS, build_rolling, rolling_analytics
+
+
+@pytest.fixture(scope="module")
+def frame():
+    return make_frame(seed=5, periods=120)
+
+
+def _pandas_rolling(df: pd.DataFrame, window: int) -> dict[str, pd.DataFrame]:
+    """Métricas por dia × broker com rolling().sum() do pandas sobre a tabela diária."""
+    buy, sell = df["buy_volume"].fillna(0), df["sell_volume"].fillna(0)
+    buy_ok, sell_ok = df["buy_vwap"].notna(), df["sell_vwap"].notna()
+    parts = pd.DataFrame({
+        "date": df["date"], "broker": df["broker"],
+        "net": buy - sell,
+        "pv": (df["buy_vwap"] * buy).where(buy_ok, 0) + (df["sell_vwap"] * sell).where(sell_ok, 0),
+        "vol": buy.where(buy_ok, 0) + sell.where(sell_ok, 0),
+        "eff": df["efficiency_score"].fillna(0),
+        "eff_n": df["efficiency_score"].notna().astype(float),
+    })
+    daily = parts.groupby(["date", "broker"]).sum().unstack("broker", fill_value=0)
+    rolled = daily.rolling(window).sum()
+    return {
+        "net_flow": rolled["net"],
+        "vwap": (rolled["pv"] / rolled["vol"]).where(rolled["vol"] > 0),
+        "efficiency": (rolled["eff"] / rolled["eff_n"]).where(rolled["eff_n"] > 0),
+    }
+
+
+def _assert_same_history(left, right):
+    """Mesmo histórico por broker (brokers novos entram no fim do estado incremental)."""
+    assert list(left.days) == list(right.days) and sorted(left.brokers) == sorted(right.brokers)
+    order = [left.brokers.index(b) for b in right.brokers]
+    np.testing.assert_array_equal(left.history[:, order], right.history)
+
+
+def test_matches_pandas_rolling(frame):
+    analytics = build_rolling(frame)
+    for wi, window in enumerate(WINDOWS):
+        expected = _pandas_rolling(frame, window)
+        for mi, metric in enumerate(METRICS):
+            table = expected[metric].reindex(columns=list(analytics.brokers))
+            assert list(table.index) == list(analytics.days)
+            np.testing.assert_allclose(analytics.history[:, :, wi, mi], table.to_numpy(), rtol=1e-9,
+                                       err_msg=f"{metric}_{window}d")
+
+
+def test_extend_matches_full_recompute(frame):
+    cut = frame["date"].drop_duplicates().sort_values().iloc[70]
+    # brokers novos só na parte anexada (antes e depois dos existentes na ordem alfabética)
+    appended = frame[frame["date"] >= cut]
+    extra = [appended.head(5).assign(broker="Broker 99"), appended.tail(5).assign(broker="Aardvark")]
+    full = pd.concat([frame, *extra], ignore_index=True)
+
+    partial = build_rolling(full[full["date"] < cut])
+    assert partial.digest.covers_prefix_of(full)
+    _assert_same_history(partial.extend(full), build_rolling(full))
+
+
+def test_digest_detects_past_day_corrections(frame):
+    prefix = build_rolling(frame)
+    assert prefix.digest.covers_prefix_of(frame.sample(frac=1.0, random_state=0))  # ordem das linhas não importa
+
+    # mesmo total do dia, volume movido entre dois brokers
+    day = frame["date"].drop_duplicates().sort_values().iloc[10]
+    rows = frame.index[frame["date"] == day][:2]
+    moved = frame.copy()
+    moved.loc[rows[0], "buy_volume"] += 100
+    moved.loc[rows[1], "buy_volume"] -= 100
+    assert not prefix.digest.covers_prefix_of(moved)
+    assert not prefix.digest.covers_prefix_of(frame.drop(index=rows[:1]))
+
+
+def test_latest_state_rebuilds_after_correction(frame):
+    rolling_analytics(frame[frame["date"] < frame["date"].max()])
+    corrected = frame.copy()
+    corrected.loc[corrected.index[0], "sell_volume"] += 500
+    _assert_same_history(rolling_analytics(corrected), build_rolling(corrected))
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tests.synthetic import make_frame
+from utils.top_n import rank_top_n, top_k
+
+
+def _frames_equal(left, right):
+    pd.testing.assert_frame_equal(left.reset_index(drop=True), right.reset_index(drop=True))
+
+
+@pytest.mark.parametrize("k", [0, 1, 3, 7, 20])
+def test_top_k_matches_nlargest_with_ties(k):
+    values = np.random.default_rng(k).integers(0, 5, 40).astype(float)  # muitos empates
+    expected = pd.Series(values).nlargest(k, keep="first").index.to_numpy()
+    np.testing.assert_array_equal(top_k(values, k), expected)
+
+
+@pytest.mark.parametrize("top_n", [1, 3, 5, 50])
+def test_rank_top_n_matches_nlargest(top_n):
+    frame = make_frame(seed=top_n, n_brokers=30, periods=5)
+    totals = frame.groupby("broker", as_index=False).agg(buy_volume=("buy_volume", "sum"),
+                                                          sell_volume=("sell_volume", "sum"))
+    net = totals.assign(net_volume=totals["buy_volume"] - totals["sell_volume"])
+
+    rankings = rank_top_n(totals, top_n)
+
+    _frames_equal(rankings.gross_buyers, totals.nlargest(top_n, "buy_volume", keep="first")[["broker", "buy_volume"]])
+    _frames_equal(rankings.gross_sellers,
+                  totals.nlargest(top_n, "sell_volume", keep="first")[["broker", "sell_volume"]]
+                  .assign(sell_volume=lambda d: -d["sell_volume"]))
+    _frames_equal(rankings.net_buyers, net[net["net_volume"] > 0].nlargest(top_n, "net_volume", keep="first"))
+    _frames_equal(rankings.net_sellers, net[net["net_volume"] < 0].nsmallest(top_n, "net_volume", keep="first"))
@@ -0,0 +1,126 @@
+"""
+Batch build das tabelas derivadas (fill, custody, buyers/sellers, rollup) em paralelo.
+
+Uso (rebuild noturno do histórico completo):
+    python -m utils.batch_build --input data/Broker_Daily_Data.csv --output build/
+
+O frame normalizado é publicado uma vez em Arrow IPC; cada worker faz memory-map do
+arquivo, recorta a sua partição (ticker × broker, fatia contígua, sem cópia) e devolve
+o resultado também em Arrow IPC. Só caminhos de arquivo trafegam entre processos.
+Com coluna ticker, todas as tabelas de saída a mantêm (chave ticker × broker × date):
+os agregados por broker/dia de tickers diferentes não se misturam nem se confundem.
+"""
+from __future__ import annotations
+import argparse
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from utils.broker_frame import normalize_broker_frame, ensure_normalized
+from utils.load_data import (load_broker_data, fill_missing_business_days,
+                             preprocess_custody, preprocess_buyers_sellers)
+from utils.trends import build_trend_rollup
+
+TABLES = ["fill", "custody", "buyers_sellers", "rollup"]
+
+
+def _partition_columns(df: pd.DataFrame) -> list[str]:
+    return (["ticker"] if "ticker" in df.columns else []) + ["broker"]
+
+
+def _build_tables(part: pd.DataFrame, business_days: pd.DatetimeIndex) -> dict[str, pd.DataFrame]:
+    """Tabelas derivadas de uma partição (mesmas funções do pipeline do app)."""
+    return {
+        "fill": fill_missing_business_days(part, date_col="date", business_days=business_days),
+        "custody": preprocess_custody(part),
+        "buyers_sellers": preprocess_buyers_sellers(part),
+        "rollup": build_trend_rollup(part).by_broker.reset_index(),
+    }
+
+
+def _build_partition(source: str, start: int, stop: int, bday_start: str, bday_end: str,
+                     out_dir: str, part_id: int) -> dict[str, str]:
+    """Worker: lê a fatia [start, stop) do snapshot por memory-map e grava cada tabela em Arrow IPC."""
+    with pa.memory_map(source, "r") as src:
+        table = pa.ipc.open_file(src).read_all().slice(start, stop - start)
+        part = normalize_broker_frame(table.to_pandas())
+    business_days = pd.bdate_range(start=bday_start, end=bday_end, freq="C")
+    # ticker da partição (custody/buyers_sellers/rollup agregam por broker e date e o fill
+    # insere dias sem ele)
+    ticker = part["ticker"].iloc[0] if "ticker" in part.columns else None
+
+    paths = {}
+    for name, result in _build_tables(part, business_days).items():
+        if ticker is not None:
+            result = result.drop(columns="ticker", errors="ignore")
+            result.insert(0, "ticker", ticker)
+        path = os.path.join(out_dir, f"{name}-{part_id:05d}.arrow")
+        feather.write_feather(result.reset_index(drop=True), path, compression="uncompressed")
+        paths[name] = path
+    return paths
+
+
+def build_tables_parallel(df: pd.DataFrame, max_workers: int | None = None,
+                          workdir: str | None = None) -> dict[str, pd.DataFrame]:
+    """
+    Constrói fill/custody/buyers_sellers/rollup particionando por ticker × broker num process pool.
+    O merge é determinístico: partições em ordem de chave, linhas ordenadas por ([ticker,] broker, date).
+    """
+    df = ensure_normalized(df)
+    if df.empty:
+        return {name: pd.DataFrame() for name in TABLES}
+
+    keys = _partition_columns(df)
+    df = df.sort_values(keys + ["date"], kind="stable").reset_index(drop=True)
+    bday_start, bday_end = str(df["date"].min().date()), str(df["date"].max().date())
+
+    # limites das fatias contíguas de cada partição
+    bounds = df.groupby(keys, sort=True).indices
+    slices = sorted((int(idx.min()), int(idx.max()) + 1) for idx in bounds.values())
+
+    max_workers = max_workers or os.cpu_count() or 1
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        source = os.path.join(tmp, "source.arrow")
+        feather.write_feather(df, source, compression="uncompressed")
+
+        args = [(source, a, b, bday_start, bday_end, tmp, i) for i, (a, b) in enumerate(slices)]
+        if max_workers == 1:
+            results = [_build_partition(*a) for a in args]
+        else:
+            # spawn: seguro mesmo quando chamado de dentro de um processo com threads (Streamlit)
+            ctx = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=max_workers, mp_context=ctx) as pool:
+                results = list(pool.map(_build_partition, *zip(*args)))
+
+        merged = {}
+        for name in TABLES:
+            tables = [feather.read_table(r[name], memory_map=True) for r in results]
+            out = pa.concat_tables(tables, promote_options="default").to_pandas()
+            sort_cols = [c for c in keys + ["date"] if c in out.columns]
+            merged[name] = out.sort_values(sort_cols, kind="stable").reset_index(drop=True)
+            del tables  # libera os memory-maps antes de apagar o diretório temporário
+    return merged
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Parallel rebuild of the derived broker tables.")
+    parser.add_argument("--input", default="data/Broker_Daily_Data.csv")
+    parser.add_argument("--output", default="build")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    tables = build_tables_parallel(load_broker_data(args.input), max_workers=args.workers)
+    os.makedirs(args.output, exist_ok=True)
+    for name, table in tables.items():
+        path = os.path.join(args.output, f"{name}.arrow")
+        feather.write_feather(table, path, compression="uncompressed")
+        print(f"{name}: {len(table):,} rows → {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,20 @@
 import pandas as pd
 
+from utils.broker_frame import ensure_normalized
+from utils.calendar_table import week_monday
+
 def get_weekly_top5_brokers(df):
     """
     Retorna os 5 brokers com maior volume líquido (buy - sell) por semana.
     """
-    # Garantir que a coluna 'date' está em datetime
-    df['date'] = pd.to_datetime(df['date'])
+    # Normalized broker frame ('date' já em datetime); não altera o frame de quem chamou
+    df = ensure_normalized(df)
 
-    # Criar coluna de semana
-    df['week'] = df['date'].dt.to_period("W").apply(lambda r: r.start_time.date())
+    # Criar coluna de semana (segunda-feira, mesma convenção do app)
+    df = df.assign(week=week_monday(df['date']))
 
     # Calcular volume líquido por broker
-    df['net_volume'] = df['buy_volume'] - df['sell_volume']
+    df = df.assign(net_volume=df['buy_volume'] - df['sell_volume'])
 
     # Agrupar por semana e broker
     grouped = df.groupby(['week', 'broker'], as_index=False)['net_volume'].sum()
@@ -0,0 +1,58 @@
+from __future__ import annotations
+import pandas as pd
+
+# Copy-on-Write (padrão do pandas 3, exigido em requirements.txt): recortes e colunas
+# derivadas são views baratas e nenhuma escrita volta para o frame original.
+
+NORMALIZED_ATTR = "normalized_broker_frame"
+
+REQUIRED_COLUMNS = ["date", "broker"]
+NUMERIC_COLUMNS = [
+    "buy_volume", "sell_volume", "buy_vwap", "sell_vwap",
+    "start_balance", "end_balance", "efficiency_score", "short_interest", "anon_volume",
+]
+# colunas opcionais que recebem um valor padrão quando não existem
+DEFAULTS = {"buy_volume": 0, "sell_volume": 0, "anon_volume": 0, "profile": "Unknown"}
+ALIASES = {"most_common_profile": "profile", "investor": "broker"}
+
+
+def normalize_broker_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Produz o "normalized broker frame": nomes de colunas normalizados, date em datetime64,
+    colunas numéricas coeridas, profile/anon_volume/anonymous garantidos.
+    Feito uma única vez na carga; os componentes só leem (views, sem cópias defensivas).
+    """
+    data = df.rename(columns=lambda c: str(c).strip().lower())
+    data = data.rename(columns={k: v for k, v in ALIASES.items() if k in data.columns and v not in data.columns})
+
+    missing = [c for c in REQUIRED_COLUMNS if c not in data.columns]
+    if missing:
+        raise ValueError(f"Missing required columns: {missing}")
+
+    if not pd.api.types.is_datetime64_any_dtype(data["date"]):
+        data["date"] = pd.to_datetime(data["date"], errors="coerce")
+
+    for col in NUMERIC_COLUMNS:
+        if col in data.columns and not pd.api.types.is_numeric_dtype(data[col]):
+            data[col] = pd.to_numeric(data[col], errors="coerce")
+
+    for col, default in DEFAULTS.items():
+        if col not in data.columns:
+            data[col] = default
+
+    # boolean 'anonymous' derivado do volume anônimo (True se houver qualquer volume anônimo)
+    if not pd.api.types.is_bool_dtype(data.get("anonymous", pd.Series(dtype=object))):
+        data["anonymous"] = data["anon_volume"] > 0
+
+    data.attrs[NORMALIZED_ATTR] = True
+    return data
+
+
+def is_normalized(df: pd.DataFrame) -> bool:
+    """True se o frame (ou um recorte dele) já passou por normalize_broker_frame."""
+    return bool(df.attrs.get(NORMALIZED_ATTR, False))
+
+
+def ensure_normalized(df: pd.DataFrame) -> pd.DataFrame:
+    """Retorna o próprio frame se já normalizado; senão normaliza (compatibilidade)."""
+    return df if is_normalized(df) else normalize_broker_frame(df)
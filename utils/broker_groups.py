@@ -0,0 +1,64 @@
+"""
+Grupos de brokers salvos (peer groups) em um arquivo JSON {nome: [brokers]}.
+
+O arquivo é lido uma vez por processo e relido só quando muda (mtime/tamanho — p.ex.
+salvo por outra réplica); save_group atualiza a cópia em memória junto com o arquivo.
+"""
+from __future__ import annotations
+import json
+import os
+import tempfile
+import threading
+
+GROUPS_PATH = os.environ.get("BAROMETER_BROKER_GROUPS", "data/broker_groups.json")
+
+_LOADED: dict[str, tuple[tuple[int, int], dict[str, list[str]]]] = {}  # path → (assinatura, grupos)
+_LOCK = threading.Lock()
+
+
+def _signature(path: str) -> tuple[int, int]:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _copy(groups: dict[str, list[str]]) -> dict[str, list[str]]:
+    return {name: list(brokers) for name, brokers in groups.items()}
+
+
+def load_groups(path: str = GROUPS_PATH) -> dict[str, list[str]]:
+    """Grupos salvos (vazio se o arquivo não existir); só relê o JSON quando o arquivo muda."""
+    try:
+        signature = _signature(path)
+    except FileNotFoundError:
+        return {}
+    with _LOCK:
+        loaded = _LOADED.get(path)
+    if loaded is None or loaded[0] != signature:
+        with open(path, encoding="utf-8") as f:
+            groups = json.load(f)
+        groups = {str(name): [str(b) for b in brokers] for name, brokers in groups.items()}
+        with _LOCK:
+            _LOADED[path] = loaded = (signature, groups)
+    return _copy(loaded[1])
+
+
+def save_group(name: str, brokers: list[str], path: str = GROUPS_PATH) -> dict[str, list[str]]:
+    """Cria/atualiza um grupo (lista vazia remove). Escrita atômica: temporário + replace."""
+    name = name.strip()
+    if not name:
+        raise ValueError("Group name is required")
+    groups = load_groups(path)
+    if brokers:
+        groups[name] = sorted(set(brokers))
+    else:
+        groups.pop(name, None)
+
+    folder = os.path.dirname(os.path.abspath(path))
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix=".groups-", suffix=".json")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(groups, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+    with _LOCK:
+        _LOADED[path] = (_signature(path), _copy(groups))
+    return groups
@@ -0,0 +1,90 @@
+"""
+Índice de brokers por códigos inteiros para filtrar um ou vários brokers de uma vez.
+
+Cada frame filtrado com frequência (ex.: df_fill) ganha, uma única vez, os códigos
+categóricos de cada linha. Uma seleção de brokers vira uma tabela booleana por código
+e a máscara de linhas sai de um único lookup (table[codes]) — o custo não depende de
+quantos brokers foram selecionados.
+"""
+from __future__ import annotations
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+
+def normalize_selection(brokers: str | Iterable[str] | None, universe: Iterable[str] | None = None):
+    """
+    Seleção canônica (hashable, usada nas chaves de cache): vazia ou todos → "All";
+    um broker → o nome; vários → tupla ordenada.
+    """
+    if brokers is None or isinstance(brokers, str):
+        return brokers or "All"
+    names = tuple(sorted(set(brokers)))
+    if not names or "All" in names or (universe is not None and set(names) >= set(universe)):
+        return "All"
+    return names[0] if len(names) == 1 else names
+
+
+def selection_names(selection) -> tuple[str, ...] | None:
+    """Nomes selecionados (None = todos)."""
+    if selection in (None, "All"):
+        return None
+    return (selection,) if isinstance(selection, str) else tuple(selection)
+
+
+@dataclass(frozen=True)
+class BrokerIndex:
+    names: np.ndarray   # categorias (ordem alfabética)
+    codes: np.ndarray   # código de cada linha (-1 = broker nulo)
+
+    def lookup(self, selection) -> np.ndarray:
+        """Tabela booleana por código (+1 posição para o código -1, sempre False)."""
+        table = np.zeros(len(self.names) + 1, dtype=bool)
+        names = selection_names(selection)
+        if names is None:
+            table[:-1] = True
+            return table
+        names = np.asarray(names, dtype=object)
+        pos = np.searchsorted(self.names, names)
+        found = pos < len(self.names)
+        found[found] = self.names[pos[found]] == names[found]
+        table[pos[found]] = True
+        return table
+
+    def mask(self, selection) -> np.ndarray:
+        """Máscara de linhas da seleção (um lookup por linha)."""
+        return self.lookup(selection)[self.codes]
+
+
+# id(frame) → (referência fraca ao frame, índice). O id sozinho não identifica o frame:
+# depois que um frame é coletado o CPython pode reusar o id antes de a entrada sair, então
+# a entrada só vale se a referência ainda aponta para o mesmo objeto.
+_INDEXES: dict[int, tuple[weakref.ref, BrokerIndex]] = {}
+_LOCK = threading.Lock()
+
+
+def _discard(key: int, ref: weakref.ref) -> None:
+    """Callback da referência: remove a entrada só se ainda for a do frame coletado."""
+    with _LOCK:
+        entry = _INDEXES.get(key)
+        if entry is not None and entry[0] is ref:
+            del _INDEXES[key]
+
+
+def broker_index(df: pd.DataFrame) -> BrokerIndex:
+    """Índice do frame, construído na primeira consulta e liberado junto com o frame."""
+    key = id(df)
+    with _LOCK:
+        entry = _INDEXES.get(key)
+    if entry is not None and entry[0]() is df:
+        return entry[1]
+    codes, names = pd.factorize(df["broker"], sort=True)
+    index = BrokerIndex(np.asarray(names, dtype=object), codes.astype(np.int32))
+    ref = weakref.ref(df, lambda r, key=key: _discard(key, r))
+    with _LOCK:
+        _INDEXES[key] = (ref, index)
+    return index
@@ -0,0 +1,110 @@
+"""
+Dimensão de calendário: ids inteiros de dia, semana e mês para qualquer data.
+
+Uma convenção única para o app inteiro:
+    day_id     – dias desde 1970-01-01
+    week_id    – semanas desde a segunda-feira 1969-12-29 (semana começa na segunda)
+    month_id   – meses desde 1970-01 (ano*12 + mês − 1, relativo a 1970)
+Os ids saem de aritmética inteira sobre datetime64[D]/[M] (vetorizada, sem datetime do
+Python nem passagem por nanossegundos, então datas depois de 2262 também servem):
+bucketizar uma coluna de datas é um array de inteiros e andar N semanas ou meses é
+somar N ao id.
+
+CalendarTable é a tabela do dataset: uma linha por dia do calendário, das semanas da
+primeira à última data, com week_id, dia útil (Seg–Sex) e semana fechada (sexta-feira
+≤ última data). build_catalog lê dela a última semana fechada e os dias úteis.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+_MONDAY_OFFSET = 3  # 1970-01-01 é quinta-feira: day_id + 3 conta a partir da segunda 1969-12-29
+
+
+def day_ids(dates) -> np.ndarray:
+    """Dias desde 1970-01-01 (datas já sem hora; a hora é descartada)."""
+    return np.asarray(dates, dtype="datetime64[D]").astype(np.int64)
+
+
+def week_ids(dates) -> np.ndarray:
+    return (day_ids(dates) + _MONDAY_OFFSET) // 7
+
+
+def month_ids(dates) -> np.ndarray:
+    return np.asarray(dates, dtype="datetime64[M]").astype(np.int64)
+
+
+def _timestamps(days: np.ndarray) -> pd.DatetimeIndex:
+    return pd.DatetimeIndex(np.asarray(days, dtype=np.int64).astype("datetime64[D]").astype("datetime64[us]"))
+
+
+def week_starts(ids) -> pd.DatetimeIndex:
+    """Segunda-feira de cada week_id."""
+    return _timestamps(np.asarray(ids, dtype=np.int64) * 7 - _MONDAY_OFFSET)
+
+
+def month_starts(ids) -> pd.DatetimeIndex:
+    """Primeiro dia de cada month_id."""
+    return pd.DatetimeIndex(np.asarray(ids, dtype=np.int64).astype("datetime64[M]").astype("datetime64[us]"))
+
+
+def week_monday(dates) -> pd.DatetimeIndex:
+    """Segunda-feira da semana de cada data (bucket semanal padrão do app)."""
+    return week_starts(week_ids(dates))
+
+
+def week_bounds(week_id: int) -> tuple[pd.Timestamp, pd.Timestamp]:
+    """Segunda e sexta-feira da semana."""
+    monday = week_starts([week_id])[0]
+    return monday, monday + pd.Timedelta(days=4)
+
+
+def shift_months(date, months: int) -> pd.Timestamp:
+    """Mesmo dia do mês `months` meses depois (antes, se negativo), limitado ao fim do mês (DateOffset)."""
+    date = pd.Timestamp(date)
+    target = int(month_ids([date])[0]) + months
+    start, next_start = day_ids(month_starts([target, target + 1]))
+    return _timestamps([start + min(date.day - 1, next_start - start - 1)])[0]
+
+
+@dataclass(frozen=True)
+class CalendarTable:
+    """Uma linha por dia do calendário (semanas completas) com week_id e flags do dataset."""
+    frame: pd.DataFrame  # índice date; week_id, is_business, week_closed
+
+    def business_days(self, start=None, end=None) -> pd.DatetimeIndex:
+        """Dias úteis (Seg–Sex) da tabela, opcionalmente só em [start, end]."""
+        days = self.frame.index[self.frame["is_business"].to_numpy()].rename(None)
+        if start is not None:
+            days = days[days >= pd.Timestamp(start)]
+        if end is not None:
+            days = days[days <= pd.Timestamp(end)]
+        return days
+
+    def last_closed_week(self) -> tuple[pd.Timestamp | None, pd.Timestamp | None]:
+        """Seg–Sex da última semana fechada do dataset."""
+        closed = self.frame["week_id"].to_numpy()[self.frame["week_closed"].to_numpy()]
+        if not len(closed):
+            return None, None
+        return week_bounds(int(closed.max()))
+
+
+def build_calendar(dates) -> CalendarTable:
+    """Tabela das semanas que cobrem as datas do dataset."""
+    days = np.unique(day_ids(pd.DatetimeIndex(dates).dropna()))
+    if not len(days):
+        return CalendarTable(pd.DataFrame(index=pd.DatetimeIndex([], name="date")))
+    first_week, last_week = (days[[0, -1]] + _MONDAY_OFFSET) // 7
+    all_days = np.arange(first_week * 7 - _MONDAY_OFFSET, (last_week + 1) * 7 - _MONDAY_OFFSET)
+    index = pd.DatetimeIndex(_timestamps(all_days), name="date")
+    week = (all_days + _MONDAY_OFFSET) // 7
+    # semana fechada: a sexta-feira dela não passa da última data com dados
+    friday = week * 7 - _MONDAY_OFFSET + 4
+    frame = pd.DataFrame({
+        "week_id": week,
+        "is_business": (all_days + _MONDAY_OFFSET) % 7 < 5,
+        "week_closed": friday <= days[-1],
+    }, index=index)
+    return CalendarTable(frame)
@@ -0,0 +1,68 @@
+from __future__ import annotations
+import datetime
+import sys
+from dataclasses import dataclass, field
+from typing import Tuple
+
+import pandas as pd
+
+from utils.broker_frame import ensure_normalized
+from utils.calendar_table import build_calendar
+
+
+@dataclass(frozen=True)
+class DatasetCatalog:
+    """Metadados do dataset calculados uma vez por versão e reaproveitados por widgets e presets."""
+    min_date: pd.Timestamp | None
+    max_date: pd.Timestamp | None
+    last_closed_week: Tuple[pd.Timestamp | None, pd.Timestamp | None]
+    brokers: Tuple[str, ...]
+    profiles: Tuple[str, ...]
+    rows_per_broker: dict = field(default_factory=dict)
+    business_days: pd.DatetimeIndex = field(default_factory=lambda: pd.DatetimeIndex([]))
+
+    @property
+    def nbytes(self) -> int:
+        """Tamanho aproximado (orçamento do ResultCache): dias úteis + nomes e contagens."""
+        names = self.brokers + self.profiles
+        return int(self.business_days.memory_usage(deep=True)
+                   + sum(sys.getsizeof(n) for n in names) + sys.getsizeof(names)
+                   + sys.getsizeof(self.rows_per_broker)
+                   + sum(sys.getsizeof(v) for v in self.rows_per_broker.values()))
+
+    @property
+    def empty(self) -> bool:
+        return self.min_date is None
+
+    def clip_bounds(self, start=None, end=None) -> Tuple[datetime.date, datetime.date] | Tuple[None, None]:
+        """Limites (date) para date pickers: período ∩ dataset; fora dos dados → dataset inteiro."""
+        if self.empty:
+            return None, None
+        lo = max(pd.Timestamp(start), self.min_date) if start is not None else self.min_date
+        hi = min(pd.Timestamp(end), self.max_date) if end is not None else self.max_date
+        if lo > hi:
+            lo, hi = self.min_date, self.max_date
+        return lo.date(), hi.date()
+
+
+def build_catalog(df: pd.DataFrame, date_col: str = "date") -> DatasetCatalog:
+    """Varre o dataset uma única vez (datas, brokers, profiles, contagens e tabela de calendário)."""
+    df = ensure_normalized(df)
+    dates = df[date_col].dropna()
+    if dates.empty:
+        return DatasetCatalog(None, None, (None, None), (), ())
+
+    min_date, max_date = dates.min().normalize(), dates.max().normalize()
+    calendar = build_calendar(dates)
+    brokers = df["broker"].dropna()
+    profiles = df["profile"].dropna() if "profile" in df.columns else pd.Series(dtype=object)
+
+    return DatasetCatalog(
+        min_date=min_date,
+        max_date=max_date,
+        last_closed_week=calendar.last_closed_week(),
+        brokers=tuple(sorted(brokers.unique().tolist())),
+        profiles=tuple(sorted(profiles.unique().tolist())),
+        rows_per_broker={k: int(v) for k, v in brokers.value_counts().sort_index().items()},
+        business_days=calendar.business_days(min_date, max_date),
+    )
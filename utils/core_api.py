@@ -0,0 +1,202 @@
+"""
+Núcleo de cálculo independente de framework: consultas por seção sobre as bases carregadas.
+
+Uma Query só tem campos simples (seção, datas ISO, broker, ticker), então pode ser
+montada pela UI, pelos relatórios ou recebida como JSON pelo serviço HTTP
+(utils.query_service). O resultado é sempre um dict {nome da tabela: DataFrame}.
+"""
+from __future__ import annotations
+import io
+import json
+from dataclasses import dataclass, asdict
+
+import pandas as pd
+
+from utils.broker_index import normalize_selection
+from utils.correlation import broker_correlation
+from utils.filter_data import filter_data
+from utils.load_data import data_version, load_tables
+from utils.sections import (short_interest_peaks, general_profile, top_rankings, weekly_net_rankings,
+                            custody_summary, buyers_sellers_summary)
+from utils.snapshot import SNAPSHOT_DIR
+from components.metrics import compute_metrics, calculate_variation
+
+SECTIONS = (
+    "Company View",
+    "Short Interest",
+    "General Profile",
+    "Top Buyers & Sellers",
+    "Weekly Trading",
+    "Custody",
+    "Buyers & Sellers",
+    "Broker Correlation",
+)
+
+PROFILE_FIELDS = ["total_buy", "total_sell", "w_buy_vwap", "w_sell_vwap", "anon_pct", "top_profile", "n_entities"]
+
+
+def _iso(value) -> str | None:
+    return None if value is None or pd.isna(value) else pd.Timestamp(value).strftime("%Y-%m-%d")
+
+
+@dataclass(frozen=True)
+class Query:
+    """
+    Consulta de uma seção. start/end: período da visão; prev_*: período anterior
+    (Company View / General Profile); window_*: recorte dos date pickers (Custody,
+    Buyers & Sellers), dentro do período. Datas em ISO (YYYY-MM-DD).
+    """
+    section: str
+    start: str
+    end: str
+    prev_start: str | None = None
+    prev_end: str | None = None
+    broker: str | tuple[str, ...] = "All"  # "All", um nome ou tupla ordenada de nomes
+    ticker: str = "All"
+    window_start: str | None = None
+    window_end: str | None = None
+    top_n: int = 5
+
+    @classmethod
+    def make(cls, section: str, start, end, prev_start=None, prev_end=None, broker="All",
+             ticker: str | None = "All", window_start=None, window_end=None, top_n: int = 5) -> "Query":
+        """Aceita Timestamp/date/str (datas → ISO) e broker como nome ou lista de nomes."""
+        return cls(section, _iso(start), _iso(end), _iso(prev_start), _iso(prev_end),
+                   normalize_selection(broker), ticker or "All", _iso(window_start), _iso(window_end), int(top_n))
+
+    @classmethod
+    def from_dict(cls, payload: dict) -> "Query":
+        return cls.make(**payload)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+# === Tabelas por seção ===
+
+def _company_view(cur_df, prev_df) -> dict[str, pd.DataFrame]:
+    metrics = compute_metrics(cur_df, prev_df)
+    table = pd.DataFrame({
+        "metric": [m["label"] for m in metrics],
+        "current": [m["current"] for m in metrics],
+        "previous": [m["previous"] for m in metrics],
+        "variation_pct": [calculate_variation(m["current"], m["previous"]) for m in metrics],
+    })
+    return {"company_view": table}
+
+
+def _short_interest(cur_df) -> dict[str, pd.DataFrame]:
+    sir_by_date, threshold, method_label, peaks_by_date, _ = short_interest_peaks(cur_df)
+    daily = sir_by_date.assign(
+        peak=sir_by_date["date"].isin(peaks_by_date["date"]),
+        threshold=threshold,
+        method=method_label,
+    )
+    return {"short_interest": daily}
+
+
+def _general_profile(cur_df, prev_df) -> dict[str, pd.DataFrame]:
+    cur_agg, prev_agg, profile_volumes = general_profile(cur_df, prev_df)
+    # uma linha por período (colunas tipadas, Parquet-friendly)
+    summary = pd.DataFrame(
+        [{"period": period, **{f: agg[f] for f in PROFILE_FIELDS}}
+         for period, agg in (("current", cur_agg), ("previous", prev_agg)) if agg],
+        columns=["period"] + PROFILE_FIELDS,
+    )
+    out = {"general_profile": summary}
+    if profile_volumes is not None:
+        out["profile_volumes"] = profile_volumes
+    return out
+
+
+def _top_buyers_sellers(cur_df, top_n: int = 5) -> dict[str, pd.DataFrame]:
+    rankings = top_rankings(cur_df, top_n)
+    return {
+        "top_buyers_gross": rankings.gross_buyers,
+        "top_sellers_gross": rankings.gross_sellers,
+        "top_buyers_net": rankings.net_buyers,
+        "top_sellers_net": rankings.net_sellers,
+    }
+
+
+def _weekly_trading(cur_df, top_n: int = 5) -> dict[str, pd.DataFrame]:
+    table = weekly_net_rankings(cur_df, top_n)
+    return {"weekly_trading": table.assign(side=table["side"].astype(str))}
+
+
+def _broker_correlation(cur_df, top_n: int = 5) -> dict[str, pd.DataFrame]:
+    result = broker_correlation(cur_df)
+    return {
+        "broker_correlation": result.matrix.reset_index(),
+        "correlated_pairs": result.pairs(top_n, positive=True),
+        "anticorrelated_pairs": result.pairs(top_n, positive=False),
+    }
+
+
+def run_query(tables, query: Query) -> dict[str, pd.DataFrame]:
+    """Executa a consulta sobre as bases (df, df_fill, df_custody, df_bs, catalog)."""
+    _, df_fill, _, _, _ = tables
+    if query.section not in SECTIONS:
+        raise ValueError(f"Unknown section: {query.section}")
+    if query.ticker != "All" and "ticker" not in df_fill.columns:
+        raise ValueError(f"Dataset has no 'ticker' column (query ticker: {query.ticker})")
+
+    cur_df = filter_data(df_fill, date_range=(query.start, query.end), broker=query.broker, ticker=query.ticker)
+
+    def prev_df():
+        if query.prev_start is None:
+            return cur_df.iloc[0:0]
+        return filter_data(df_fill, date_range=(query.prev_start, query.prev_end),
+                           broker=query.broker, ticker=query.ticker)
+
+    if query.section == "Company View":
+        return _company_view(cur_df, prev_df())
+    if query.section == "Short Interest":
+        return _short_interest(cur_df)
+    if query.section == "General Profile":
+        return _general_profile(cur_df, prev_df())
+    if query.section == "Top Buyers & Sellers":
+        return _top_buyers_sellers(cur_df, query.top_n)
+    if query.section == "Weekly Trading":
+        return _weekly_trading(cur_df, query.top_n)
+    if query.section == "Broker Correlation":
+        return _broker_correlation(cur_df, query.top_n)
+
+    # Custody / Buyers & Sellers: recorte dos date pickers dentro do período (default: o período todo)
+    d0 = pd.Timestamp(query.window_start or query.start).date()
+    d1 = pd.Timestamp(query.window_end or query.end).date()
+    if query.section == "Custody":
+        summary = custody_summary(cur_df, d0, d1)
+        return {} if summary is None else {"custody": summary}
+    summary = buyers_sellers_summary(cur_df, d0, d1)
+    return {} if summary is None else {"buyers_sellers": summary}
+
+
+# === Bases por processo ===
+
+_LOADED: dict[tuple[str, str], tuple] = {}
+
+
+def tables_for(data_path: str) -> tuple:
+    """Bases do processo, carregadas uma vez por versão dos dados."""
+    version = data_version(data_path)
+    key = (data_path, version)
+    if key not in _LOADED:
+        _LOADED.clear()
+        _LOADED[key] = load_tables(data_path, version, SNAPSHOT_DIR)
+    return _LOADED[key]
+
+
+# === Serialização JSON ===
+
+def tables_to_json(tables: dict[str, pd.DataFrame]) -> str:
+    """Tabelas em JSON (orient="table": schema incluso, tipos e datas voltam iguais)."""
+    return json.dumps({
+        name: json.loads(table.reset_index(drop=True).to_json(orient="table", date_format="iso", index=False))
+        for name, table in tables.items()
+    })
+
+
+def tables_from_json(payload: str | dict) -> dict[str, pd.DataFrame]:
+    data = json.loads(payload) if isinstance(payload, str) else payload
+    return {name: pd.read_json(io.StringIO(json.dumps(table)), orient="table") for name, table in data.items()}
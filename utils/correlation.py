@@ -0,0 +1,131 @@
+"""
+Correlação broker × broker do net volume diário (buy − sell) no período.
+
+O net volume vira uma matriz densa brokers × dias (fatia do painel ou códigos inteiros +
+bincount sobre o frame longo); cada linha é centrada e normalizada e a matriz inteira
+sai de um produto Z @ Z.T — uma multiplicação de matrizes no lugar de um corr do pandas
+por par, interativo com centenas de brokers.
+
+Para exibição os brokers são ordenados pelo vetor de Fiedler (segundo autovetor do
+laplaciano normalizado da afinidade (1 + ρ)/2): quem negocia junto fica lado a lado e
+quem negocia contra fica nas pontas, formando blocos na diagonal do heatmap.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pandas as pd
+
+from utils.broker_frame import ensure_normalized
+from utils.top_n import top_k
+
+if TYPE_CHECKING:
+    from utils.panel import PanelWindow
+
+# dias com net ≠ 0 para o broker entrar na matriz (abaixo disso a correlação é ruído)
+MIN_ACTIVE_DAYS = 3
+
+
+def net_flow_matrix(cur_df: pd.DataFrame,
+                    window: PanelWindow | None = None) -> tuple[np.ndarray, pd.DatetimeIndex, np.ndarray]:
+    """(brokers, dias, net[broker, dia]) dos dias com alguma linha; sem linha no dia → 0."""
+    if window is not None:
+        mask = window.mask
+        net = window.field("buy_volume") - window.field("sell_volume")
+        net = np.where(mask, np.nan_to_num(net), 0.0)
+        present, days = mask.any(axis=1), mask.any(axis=0)
+        return window.brokers[present].astype(str), window.days[days], net[np.ix_(present, days)]
+
+    df = ensure_normalized(cur_df)
+    df = df[df["broker"].notna() & df["date"].notna()]
+    broker_codes, brokers = pd.factorize(df["broker"], sort=True)
+    day_codes, days = pd.factorize(df["date"], sort=True)
+    values = (np.nan_to_num(df["buy_volume"].to_numpy(dtype=float, na_value=np.nan))
+              - np.nan_to_num(df["sell_volume"].to_numpy(dtype=float, na_value=np.nan)))
+    shape = (len(brokers), len(days))
+    flat = np.ravel_multi_index((broker_codes, day_codes), shape)
+    net = np.bincount(flat, weights=values, minlength=shape[0] * shape[1]).reshape(shape)
+    return np.asarray(brokers, dtype=object).astype(str), pd.DatetimeIndex(days), net
+
+
+def correlation_matrix(net: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Correlação de Pearson entre as linhas de net (brokers × dias) num único produto.
+    Retorna (matriz, linhas usadas): brokers com menos de MIN_ACTIVE_DAYS dias ativos ou
+    variância zero ficam de fora.
+    """
+    if net.size == 0:  # período sem pregões ou sem brokers
+        return np.empty((0, 0)), np.empty(0, dtype=np.int64)
+    active = np.count_nonzero(net, axis=1)
+    centered = net - net.mean(axis=1, keepdims=True)
+    norms = np.sqrt(np.einsum("ij,ij->i", centered, centered))
+    used = np.flatnonzero((active >= MIN_ACTIVE_DAYS) & (norms > 0))
+    z = centered[used] / norms[used, None]
+    corr = np.clip(z @ z.T, -1.0, 1.0)
+    np.fill_diagonal(corr, 1.0)
+    return corr, used
+
+
+def spectral_order(corr: np.ndarray) -> np.ndarray:
+    """Ordem dos brokers pelo vetor de Fiedler da afinidade (1 + ρ)/2 (determinística)."""
+    n = len(corr)
+    if n <= 2:
+        return np.arange(n)
+    affinity = (1.0 + corr) / 2.0
+    inv_sqrt = 1.0 / np.sqrt(affinity.sum(axis=1))
+    normalized = affinity * inv_sqrt[:, None] * inv_sqrt[None, :]
+    # maiores autovalores da afinidade normalizada = menores do laplaciano; [-1] é o trivial
+    _, vectors = np.linalg.eigh(normalized)
+    fiedler = vectors[:, -2] * inv_sqrt
+    if fiedler[0] > 0:  # sinal do autovetor é arbitrário: fixa pelo primeiro broker
+        fiedler = -fiedler
+    return np.lexsort((np.arange(n), fiedler))
+
+
+@dataclass(frozen=True)
+class BrokerCorrelation:
+    """Matriz de correlação já na ordem de exibição + dias ativos de cada broker."""
+    matrix: pd.DataFrame      # brokers × brokers (ordem espectral)
+    active_days: pd.Series    # dias com net ≠ 0 por broker (mesma ordem)
+    days: int                 # pregões no período
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.matrix.memory_usage(deep=True).sum() + self.active_days.memory_usage(deep=True))
+
+    @property
+    def brokers(self) -> int:
+        return len(self.matrix)
+
+    def most_active(self, n: int | None) -> "BrokerCorrelation":
+        """Só os n brokers com mais dias ativos, reordenados entre si (None → todos)."""
+        if n is None or n >= self.brokers:
+            return self
+        keep = np.sort(top_k(self.active_days.to_numpy(), n))
+        sub = self.matrix.to_numpy()[np.ix_(keep, keep)]
+        order = keep[spectral_order(sub)]
+        names = self.matrix.index[order]
+        return BrokerCorrelation(self.matrix.loc[names, names], self.active_days.loc[names], self.days)
+
+    def pairs(self, n: int, positive: bool = True) -> pd.DataFrame:
+        """Os n pares mais correlacionados (positive) ou mais anticorrelacionados."""
+        i, j = np.triu_indices(self.brokers, k=1)
+        values = self.matrix.to_numpy()[i, j]
+        idx = top_k(values if positive else -values, n)
+        names = self.matrix.index.to_numpy()
+        return pd.DataFrame({"broker_a": names[i[idx]], "broker_b": names[j[idx]],
+                             "correlation": values[idx]})
+
+
+def broker_correlation(cur_df: pd.DataFrame, window: PanelWindow | None = None) -> BrokerCorrelation:
+    """Correlação do net volume diário entre os brokers do período, ordenada para exibição."""
+    brokers, days, net = net_flow_matrix(cur_df, window)
+    corr, used = correlation_matrix(net)
+    order = spectral_order(corr)
+    names = pd.Index(brokers[used][order], name="broker")
+    return BrokerCorrelation(
+        matrix=pd.DataFrame(corr[np.ix_(order, order)], index=names, columns=names),
+        active_days=pd.Series(np.count_nonzero(net[used], axis=1)[order], index=names, name="active_days"),
+        days=len(days),
+    )
@@ -0,0 +1,334 @@
+"""
+Cache persistente em disco (segunda camada do ResultCache) que sobrevive a restarts.
+
+Cada resultado vai para <dir>/<versão do código>/<hash da chave>/: a estrutura do valor
+em pickle e cada DataFrame dentro dele como Arrow IPC comprimido (zstd). A chave em
+disco troca a versão dos dados (caminho + mtime + tamanho) pela impressão digital do
+conteúdo, então um processo novo — outro container, arquivo copiado com outro mtime —
+encontra os mesmos resultados; a versão do código (hash do fonte de utils/ e
+components/ + versões das bibliotecas) invalida tudo a cada mudança de código.
+
+Gravação em segundo plano (não atrasa a sessão que calculou); leitura só em miss da
+memória. Orçamento em bytes para o diretório inteiro, removendo primeiro as entradas
+usadas há mais tempo (mtime atualizado a cada hit). Erros de disco viram miss.
+"""
+from __future__ import annotations
+import functools
+import hashlib
+import io
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Hashable
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+DISK_CACHE_DIR = os.environ.get("BAROMETER_DISK_CACHE_DIR")
+DISK_CACHE_MB = float(os.environ.get("BAROMETER_DISK_CACHE_MB", "1024"))
+# resultados baratos de refazer e grandes demais para valer o disco (recortes por período) e
+# payloads de render (chave pela impressão digital da sessão, não pelo conteúdo do arquivo)
+SKIP_PREFIXES = {"period_frames", "figure", "itables", "table"}
+# com snapshot (BAROMETER_SNAPSHOT_DIR) as bases vêm do memory-map somente leitura compartilhado
+# entre réplicas; servidas do disco, cada réplica ganharia uma cópia privada no heap
+SNAPSHOT_SKIP_PREFIXES = {"base_tables"}
+
+_PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@functools.lru_cache(maxsize=None)
+def code_version() -> str:
+    """Hash do código-fonte do app (utils/, components/, app.py) + versões de pandas/pyarrow/numpy."""
+    digest = hashlib.sha1(f"{pd.__version__}|{pa.__version__}|{np.__version__}".encode())
+    paths = [os.path.join(_PACKAGE_ROOT, "app.py")]
+    for folder in ("utils", "components"):
+        base = os.path.join(_PACKAGE_ROOT, folder)
+        paths += [os.path.join(base, f) for f in sorted(os.listdir(base)) if f.endswith(".py")]
+    for path in paths:
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def data_fingerprint(file_path: str) -> str:
+    """Hash do conteúdo do arquivo de dados (ou de todos os arquivos do store particionado)."""
+    digest = hashlib.sha1()
+    if os.path.isdir(file_path):
+        files = sorted(os.path.join(root, f) for root, _, names in os.walk(file_path) for f in names)
+    else:
+        files = [file_path]
+    for path in files:
+        digest.update(os.path.relpath(path, file_path).encode() if path != file_path else b"")
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+class _Pickler(pickle.Pickler):
+    """Pickle da estrutura; DataFrames saem como tabelas Arrow separadas."""
+
+    def __init__(self, file, frames: list):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.frames = frames
+
+    def persistent_id(self, obj):
+        if type(obj) is pd.DataFrame:
+            try:
+                table = pa.Table.from_pandas(obj, preserve_index=True)
+            except (pa.ArrowException, TypeError, ValueError):
+                return None  # colunas que o Arrow não representa → pickle normal
+            self.frames.append(table)
+            return ("frame", len(self.frames) - 1, dict(obj.attrs))
+        return None
+
+
+class _Unpickler(pickle.Unpickler):
+    def __init__(self, file, entry_dir: str):
+        super().__init__(file)
+        self.entry_dir = entry_dir
+
+    def persistent_load(self, pid):
+        _, i, attrs = pid
+        df = feather.read_table(os.path.join(self.entry_dir, f"frame-{i}.arrow")).to_pandas()
+        df.attrs.update(attrs)  # ex.: flag do normalized broker frame
+        return df
+
+
+class DiskCache:
+    """Diretório de resultados com orçamento em bytes e remoção por uso mais antigo."""
+
+    def __init__(self, root: str, max_bytes: int, version: str | None = None,
+                 skip_prefixes: set[str] | None = None):
+        self.root = root
+        self.max_bytes = int(max_bytes)
+        self.version = version or code_version()
+        self.skip_prefixes = SKIP_PREFIXES if skip_prefixes is None else set(skip_prefixes)
+        self._fingerprints: dict[str, str] = {}
+        self._index: dict[str, tuple[int, float]] | None = None  # entrada → (bytes, último uso)
+        self._lock = threading.Lock()
+        self._writer = ThreadPoolExecutor(1, thread_name_prefix="disk-cache")
+        self._pending: set[str] = set()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.errors = 0
+
+    # === Chaves ===
+
+    def register_version(self, data_version: str, file_path: str) -> str:
+        """Associa a versão dos dados (mtime) à impressão digital do conteúdo (calculada uma vez)."""
+        with self._lock:
+            fingerprint = self._fingerprints.get(data_version)
+        if fingerprint is None:
+            fingerprint = data_fingerprint(file_path)
+            with self._lock:
+                self._fingerprints[data_version] = fingerprint
+        return fingerprint
+
+    def _stable(self, key):
+        if isinstance(key, tuple):
+            return tuple(self._stable(k) for k in key)
+        if isinstance(key, str) and key in self._fingerprints:
+            return ("data", self._fingerprints[key])
+        return key
+
+    def _entry(self, key: Hashable) -> str | None:
+        """Diretório da entrada (None: chave que não vai para o disco)."""
+        if isinstance(key, tuple) and key and key[0] in self.skip_prefixes:
+            return None
+        with self._lock:
+            stable = self._stable(key)
+        digest = hashlib.sha1(repr(stable).encode()).hexdigest()
+        return os.path.join(self.root, self.version, digest)
+
+    # === Leitura / escrita ===
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entry(key)
+        if entry is None:
+            return default
+        if not os.path.exists(os.path.join(entry, "value.pkl")):
+            with self._lock:
+                self.misses += 1
+            return default
+        try:
+            with open(os.path.join(entry, "value.pkl"), "rb") as f:
+                value = _Unpickler(f, entry).load()
+            os.utime(entry)  # uso recente (ordem de remoção)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            shutil.rmtree(entry, ignore_errors=True)  # entrada corrompida ou de outra versão
+            return default
+        with self._lock:
+            self.hits += 1
+            if self._index is not None and entry in self._index:
+                self._index[entry] = (self._index[entry][0], os.path.getmtime(entry))
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Grava a entrada (escrita atômica: diretório temporário + rename)."""
+        entry = self._entry(key)
+        if entry is None or os.path.exists(entry):
+            return
+        parent = os.path.dirname(entry)
+        os.makedirs(parent, exist_ok=True)
+        tmp = tempfile.mkdtemp(dir=parent, prefix=".write-")
+        try:
+            frames: list[pa.Table] = []
+            buffer = io.BytesIO()
+            _Pickler(buffer, frames).dump(value)
+            for i, table in enumerate(frames):
+                feather.write_feather(table, os.path.join(tmp, f"frame-{i}.arrow"), compression="zstd")
+            with open(os.path.join(tmp, "value.pkl"), "wb") as f:
+                f.write(buffer.getvalue())
+            size = sum(os.path.getsize(os.path.join(tmp, n)) for n in os.listdir(tmp))
+            if size > self.max_bytes:
+                shutil.rmtree(tmp, ignore_errors=True)
+                return
+            os.rename(tmp, entry)
+        except Exception:
+            # valor sem pickle, disco cheio ou outra réplica gravou primeiro → só não persiste
+            shutil.rmtree(tmp, ignore_errors=True)
+            failed = not os.path.exists(entry)
+            with self._lock:
+                self.errors += failed
+            return
+        with self._lock:
+            self.writes += 1
+            self._load_index()[entry] = (size, os.path.getmtime(entry))
+        self._evict()
+
+    def put_async(self, key: Hashable, value: Any) -> None:
+        """Agenda a gravação na thread de escrita (uma por chave de cada vez)."""
+        entry = self._entry(key)
+        if entry is None:
+            return
+        with self._lock:
+            if entry in self._pending:
+                return
+            self._pending.add(entry)
+        self._writer.submit(self._write, entry, key, value)
+
+    def _write(self, entry, key, value) -> None:
+        try:
+            self.put(key, value)
+        finally:
+            with self._lock:
+                self._pending.discard(entry)
+
+    def flush(self) -> None:
+        """Espera as gravações pendentes."""
+        self._writer.submit(lambda: None).result()
+
+    # === Orçamento ===
+
+    def _load_index(self) -> dict[str, tuple[int, float]]:
+        """Entradas existentes de todas as versões do código (varre o diretório uma vez)."""
+        if self._index is None:
+            self._index = {}
+            if os.path.isdir(self.root):
+                for version in os.listdir(self.root):
+                    vdir = os.path.join(self.root, version)
+                    if not os.path.isdir(vdir):
+                        continue
+                    for name in os.listdir(vdir):
+                        entry = os.path.join(vdir, name)
+                        if name.startswith(".") or not os.path.isdir(entry):
+                            continue
+                        size = sum(os.path.getsize(os.path.join(entry, n)) for n in os.listdir(entry))
+                        self._index[entry] = (size, os.path.getmtime(entry))
+        return self._index
+
+    def _evict(self) -> None:
+        with self._lock:
+            index = self._load_index()
+            total = sum(size for size, _ in index.values())
+            if total <= self.max_bytes:
+                return
+            # usadas há mais tempo primeiro (versões antigas do código saem naturalmente)
+            for entry, (size, _) in sorted(index.items(), key=lambda item: item[1][1]):
+                if total <= self.max_bytes:
+                    break
+                shutil.rmtree(entry, ignore_errors=True)
+                del index[entry]
+                total -= size
+
+    def stats(self) -> dict:
+        with self._lock:
+            index = self._load_index()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "errors": self.errors,
+                "entries": len(index),
+                "bytes": sum(size for size, _ in index.values()),
+                "max_bytes": self.max_bytes,
+            }
+
+
+_DISK: DiskCache | None = None
+_DISK_LOCK = threading.Lock()
+
+
+def get_disk_cache() -> DiskCache | None:
+    """Cache em disco do processo (None se BAROMETER_DISK_CACHE_DIR não estiver definido)."""
+    global _DISK
+    if not DISK_CACHE_DIR:
+        return None
+    from utils.snapshot import SNAPSHOT_DIR  # snapshot importa code_version daqui
+
+    with _DISK_LOCK:
+        if _DISK is None:
+            skip = SKIP_PREFIXES | (SNAPSHOT_SKIP_PREFIXES if SNAPSHOT_DIR else set())
+            _DISK = DiskCache(DISK_CACHE_DIR, int(DISK_CACHE_MB * 1024 * 1024), skip_prefixes=skip)
+        return _DISK
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Benchmark: bases (load_tables) calculadas a frio vs lidas do cache em disco num processo novo."""
+    import argparse
+    import time
+
+    from utils.load_data import data_version, load_tables
+
+    parser = argparse.ArgumentParser(description="Time cold base-table load vs disk-cache hit.")
+    parser.add_argument("--input", default="data/Broker_Daily_Data.csv")
+    parser.add_argument("--dir", default=None, help="cache directory (default: a temporary one)")
+    args = parser.parse_args(argv)
+
+    root = args.dir or tempfile.mkdtemp(prefix="disk-cache-bench-")
+    version = data_version(args.input)
+    key = ("base_tables", version)
+
+    writer = DiskCache(root, 1 << 40)
+    writer.register_version(version, args.input)
+    t0 = time.perf_counter()
+    tables = load_tables(args.input, version, None)
+    cold = time.perf_counter() - t0
+    writer.put(key, tables)
+    writer.flush()
+
+    reader = DiskCache(root, 1 << 40)  # instância nova: nada em memória, como depois de um restart
+    reader.register_version(version, args.input)
+    t0 = time.perf_counter()
+    warm = reader.get(key)
+    hit = time.perf_counter() - t0
+    if warm is None:
+        raise SystemExit("disk cache miss")
+    rows = len(tables[0])
+    print(f"{rows:,} rows: cold load {cold:.2f}s, disk-cache hit {hit:.2f}s ({root})")
+    if args.dir is None:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,39 @@
 import pandas as pd
 
+from utils.broker_frame import ensure_normalized
+from utils.broker_index import broker_index, normalize_selection, selection_names
+
 def filter_data(
     df: pd.DataFrame,
     date_range: tuple = None,
-    broker: str = None,
+    broker=None,
     ticker: str = None
 ) -> pd.DataFrame:
     """
-    Filtra dados por intervalo de datas, broker e (opcional) ticker.
+    Filtra dados por intervalo de datas, broker(s) e (opcional) ticker.
+    Recebe o normalized broker frame (sem cópia nem novo parse de datas).
+    broker: "All", um nome ou vários (lista/tupla) — resolvidos para códigos inteiros
+    e aplicados com um único lookup por linha, qualquer que seja o nº de brokers.
     """
-    df = df.copy()
-    df["date"] = pd.to_datetime(df["date"])
+    df = ensure_normalized(df)
+    mask = None
 
     # Filtro por data
     if date_range:
         start, end = pd.to_datetime(date_range[0]), pd.to_datetime(date_range[1])
-        df = df[(df["date"] >= start) & (df["date"] <= end)]
+        dates = df["date"]
+        mask = ((dates >= start) & (dates <= end)).to_numpy()
+
+    # Filtro por broker(s) (índice de códigos do frame, construído uma vez)
+    if selection_names(normalize_selection(broker)) is not None:
+        broker_mask = broker_index(df).mask(normalize_selection(broker))
+        mask = broker_mask if mask is None else (mask & broker_mask)
 
-    # Filtro por broker
-    if broker and broker != "All":
-        df = df[df["broker"] == broker]
+    if mask is not None:
+        df = df[mask]
 
     # 🔒 ticker (futuro)
     if ticker and ticker != "All":
         df = df[df["ticker"] == ticker]
 
-    return df
\ No newline at end of file
+    return df
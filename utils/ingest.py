@@ -0,0 +1,132 @@
+"""
+Ingestão em streaming do CSV diário para um store colunar particionado por mês.
+
+Uso:
+    python -m utils.ingest --input data/Broker_Daily_Data.csv --output store/
+
+O CSV é lido em blocos de tamanho fixo (bytes) pelo leitor do pyarrow, com o mesmo
+esquema explícito da carga do app (load_data.CSV_COLUMN_TYPES); cada bloco é
+normalizado (nomes de colunas, anon_volume/anonymous) e anexado como arquivos Parquet
+em store/month=YYYY-MM/. O pico de memória depende só do block size, não do tamanho
+do arquivo.
+
+O store é montado num diretório temporário ao lado de --output e só substitui o
+diretório no fim, com sucesso: um valor fora do esquema (ex.: volume decimal) aborta a
+ingestão sem deixar partições parciais que load_store serviria como store completo.
+"""
+from __future__ import annotations
+import argparse
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from utils.broker_frame import normalize_broker_frame
+from utils.load_data import CSV_COLUMN_TYPES, csv_convert_options
+
+DEFAULT_BLOCK_SIZE = 16 << 20  # bytes de CSV por bloco
+
+
+def _partitions(out_dir: str) -> list[str]:
+    if not os.path.isdir(out_dir):
+        return []
+    return [os.path.join(out_dir, d) for d in os.listdir(out_dir) if d.startswith("month=")]
+
+
+def _store_schema(table: pa.Table) -> pa.Schema:
+    """Esquema do store: tipos de CSV_COLUMN_TYPES nas colunas conhecidas, o do bloco nas derivadas."""
+    return pa.schema([pa.field(f.name, CSV_COLUMN_TYPES.get(f.name, f.type)) for f in table.schema])
+
+
+def _write_partitions(file_path: str, out_dir: str, block_size: int) -> int:
+    reader = pa_csv.open_csv(
+        file_path,
+        read_options=pa_csv.ReadOptions(block_size=block_size),
+        convert_options=csv_convert_options(file_path),
+    )
+    schema = None
+    rows = 0
+    for i, batch in enumerate(reader):
+        chunk = normalize_broker_frame(batch.to_pandas())
+        if schema is None:
+            # colunas do CSV tipadas pelo esquema explícito (int64 com vazios vira float no
+            # pandas e volta a int64 aqui); derivadas (anonymous, padrões) pelo primeiro bloco
+            schema = _store_schema(pa.Table.from_pandas(chunk, preserve_index=False))
+        table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False).replace_schema_metadata()
+
+        months = chunk["date"].dt.strftime("%Y-%m").to_numpy()
+        for month in pd.unique(months):
+            part_dir = os.path.join(out_dir, f"month={month}")
+            os.makedirs(part_dir, exist_ok=True)
+            pq.write_table(table.filter(pa.array(months == month)),
+                           os.path.join(part_dir, f"part-{i:05d}.parquet"))
+        rows += len(chunk)
+    return rows
+
+
+def ingest_csv(file_path: str, out_dir: str, block_size: int = DEFAULT_BLOCK_SIZE,
+               overwrite: bool = False) -> int:
+    """
+    Lê o CSV em blocos e grava cada bloco nas partições mensais. Retorna o nº de linhas.
+    out_dir é substituído inteiro ao final (overwrite=True se já tiver partições).
+    """
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"File not found: {file_path}")
+    if _partitions(out_dir) and not overwrite:
+        raise ValueError(f"Store already has partitions: {out_dir} (use overwrite=True)")
+
+    out_dir = os.path.abspath(out_dir)
+    parent = os.path.dirname(out_dir)
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=f".{os.path.basename(out_dir)}-", dir=parent)
+    try:
+        try:
+            rows = _write_partitions(file_path, tmp_dir, block_size)
+        except pa.ArrowInvalid as exc:
+            raise ValueError(f"{file_path} does not match the CSV column schema: {exc}") from exc
+        # publica: o store antigo sai de cena só depois que o novo está completo
+        old_dir = None
+        if os.path.exists(out_dir):
+            old_dir = tempfile.mkdtemp(prefix=f".{os.path.basename(out_dir)}-old-", dir=parent)
+            os.replace(out_dir, os.path.join(old_dir, "store"))
+        os.replace(tmp_dir, out_dir)
+        if old_dir is not None:
+            shutil.rmtree(old_dir, ignore_errors=True)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return rows
+
+
+def load_store(store_dir: str, start=None, end=None, columns: list[str] | None = None) -> pd.DataFrame:
+    """Lê o store particionado (opcionalmente só o intervalo [start, end]) como normalized broker frame."""
+    dataset = ds.dataset(store_dir, format="parquet", partitioning="hive")
+    flt = None
+    if start is not None:
+        flt = ds.field("date") >= pa.scalar(pd.Timestamp(start), type=dataset.schema.field("date").type)
+    if end is not None:
+        upper = ds.field("date") <= pa.scalar(pd.Timestamp(end), type=dataset.schema.field("date").type)
+        flt = upper if flt is None else (flt & upper)
+    cols = columns or [c for c in dataset.schema.names if c != "month"]
+    # fragmentos em ordem de caminho (mês, bloco) → mesma ordem de linhas do CSV original
+    return normalize_broker_frame(dataset.to_table(columns=cols, filter=flt).to_pandas())
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Chunked CSV ingest into a month-partitioned Parquet store.")
+    parser.add_argument("--input", default="data/Broker_Daily_Data.csv")
+    parser.add_argument("--output", default="store")
+    parser.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE, help="CSV bytes per chunk")
+    parser.add_argument("--overwrite", action="store_true")
+    args = parser.parse_args(argv)
+
+    rows = ingest_csv(args.input, args.output, block_size=args.block_size, overwrite=args.overwrite)
+    print(f"{rows:,} rows → {args.output}")
+
+
+if __name__ == "__main__":
+    main()
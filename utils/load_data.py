@@ -1,40 +1,99 @@
+import csv
 import pandas as pd
 import os
 
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+from utils.broker_frame import normalize_broker_frame, ensure_normalized
+
+# === Leitura tipada do CSV diário ===
+# tipos explícitos das colunas conhecidas (pelo nome normalizado); colunas extras são inferidas
+CSV_COLUMN_TYPES = {
+    "date": pa.timestamp("us"),  # ISO (YYYY-MM-DD) vira datetime64 na leitura, sem to_datetime
+    "broker": pa.string(), "investor": pa.string(), "ticker": pa.string(),
+    "profile": pa.string(), "most_common_profile": pa.string(),
+    "buy_volume": pa.int64(), "sell_volume": pa.int64(), "anon_volume": pa.int64(),
+    "start_balance": pa.int64(), "end_balance": pa.int64(), "short_interest": pa.int64(),
+    "buy_vwap": pa.float64(), "sell_vwap": pa.float64(), "efficiency_score": pa.float64(),
+}
+CSV_BLOCK_SIZE = 16 << 20  # bytes por bloco de parse (um bloco por thread)
+
+
+def csv_column_types(file_path: str) -> dict[str, pa.DataType]:
+    """Tipos de CSV_COLUMN_TYPES pelos nomes do cabeçalho do arquivo (como escritos nele)."""
+    with open(file_path, newline="", encoding="utf-8-sig") as f:
+        header = next(csv.reader(f), [])
+    return {name: CSV_COLUMN_TYPES[name.strip().lower()]
+            for name in header if name.strip().lower() in CSV_COLUMN_TYPES}
+
+
+def csv_convert_options(file_path: str) -> pa_csv.ConvertOptions:
+    return pa_csv.ConvertOptions(column_types=csv_column_types(file_path), strings_can_be_null=True)
+
+
+def read_broker_csv(file_path: str) -> pd.DataFrame:
+    """
+    Parse do CSV com o leitor do pyarrow (multithread) e esquema explícito: date já sai
+    datetime64, volumes/saldos int64 (float com NaN se houver vazios, como no read_csv).
+    Valor fora do esquema (data em outro formato, volume decimal) → read_csv com inferência
+    de tipos, coerção feita depois por normalize_broker_frame.
+    """
+    try:
+        table = pa_csv.read_csv(
+            file_path,
+            read_options=pa_csv.ReadOptions(use_threads=True, block_size=CSV_BLOCK_SIZE),
+            convert_options=csv_convert_options(file_path),
+        )
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        return pd.read_csv(file_path)
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
 def load_broker_data(file_path="data/Broker_Daily_Data.csv"):
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"File not found: {file_path}")
 
-    df = pd.read_csv(file_path)
+    # diretório → store colunar particionado gerado por utils.ingest
+    if os.path.isdir(file_path):
+        from utils.ingest import load_store
+        return load_store(file_path)
 
-    # === Initial cleaning ===
-    df.columns = df.columns.str.strip().str.lower()  # normalize column names
-    df['date'] = pd.to_datetime(df['date'])  # ensure date column is datetime
+    df = read_broker_csv(file_path)
 
-    # === Create anon_volume column if it does not exist ===
-    if 'anon_volume' not in df.columns:
-        df['anon_volume'] = 0
+    # === Initial cleaning (normalized broker frame) ===
+    # column names, datetime 'date' (already typed by the parse), numeric columns, anon_volume (default 0)
+    # and the boolean 'anonymous' flag are all handled once here
+    return normalize_broker_frame(df)
 
-    # === Create boolean 'anonymous' flag based on anon_volume ===
-    df['anonymous'] = df['anon_volume'] > 0  # True if there is any anonymous volume
 
-    return df
+def data_version(file_path="data/Broker_Daily_Data.csv") -> str:
+    """Identificador barato da versão do arquivo (caminho + mtime + tamanho) para chaves de cache."""
+    if os.path.isdir(file_path):
+        # store particionado: maior mtime e tamanho total dos arquivos
+        stats = [os.stat(os.path.join(root, f)) for root, _, files in os.walk(file_path) for f in files]
+        mtime = max((s.st_mtime_ns for s in stats), default=0)
+        return f"{os.path.abspath(file_path)}:{mtime}:{sum(s.st_size for s in stats)}:{len(stats)}"
+    st_ = os.stat(file_path)
+    return f"{os.path.abspath(file_path)}:{st_.st_mtime_ns}:{st_.st_size}"
 
-def fill_missing_business_days(df: pd.DataFrame, date_col: str = "date", broker_col: str = "broker") -> pd.DataFrame:
+def fill_missing_business_days(df: pd.DataFrame, date_col: str = "date", broker_col: str = "broker",
+                               business_days: pd.DatetimeIndex | None = None) -> pd.DataFrame:
     """
     Preenche dias úteis faltantes para cada broker separadamente.
     Mantém todas as linhas originais e adiciona linhas de datas que estavam ausentes.
+    business_days: calendário já calculado (ex.: DatasetCatalog.business_days).
     """
     if df.empty or date_col not in df.columns:
         return df
 
-    df = df.copy()
-    df[date_col] = pd.to_datetime(df[date_col], errors="coerce")
+    df = ensure_normalized(df)
 
     # Range completo de dias úteis
-    start = df[date_col].min()
-    end = df[date_col].max()
-    all_days = pd.bdate_range(start=start, end=end, freq="C")
+    if business_days is not None:
+        all_days = business_days
+    else:
+        all_days = pd.bdate_range(start=df[date_col].min(), end=df[date_col].max(), freq="C")
 
     brokers = df[broker_col].unique()
     df_list = []
@@ -51,14 +110,15 @@ def fill_missing_business_days(df: pd.DataFrame, date_col: str = "date", broker_
     num_cols = df_fill.select_dtypes(include=["number"]).columns
     df_fill[num_cols] = df_fill.groupby(broker_col)[num_cols].ffill()
 
-    return df_fill
+    # linhas inseridas → re-normaliza (flag 'anonymous' a partir do anon_volume preenchido)
+    return normalize_broker_frame(df_fill.drop(columns="anonymous", errors="ignore"))
 
 
 
 # === Custody Table prepossing (dedicated DataFrame) ===
 def preprocess_custody(df):
-    # Garante datetime
-    df["date"] = pd.to_datetime(df["date"])
+    # Garante datetime (sem alterar o frame de quem chamou)
+    df = ensure_normalized(df)
 
     # Group by broker and date (daily custody snapshot)
     df_custody = (
@@ -82,8 +142,8 @@ def preprocess_custody(df):
 # === Buyers & Sellers Table prepossing (dedicated DataFrame) ===
 
 def preprocess_buyers_sellers(df):
-    # Garante datetime
-    df["date"] = pd.to_datetime(df["date"])
+    # Garante datetime (sem alterar o frame de quem chamou)
+    df = ensure_normalized(df)
 
     # Consolida por broker + date (igual custody)
     df_bs = (
@@ -111,4 +171,46 @@ def preprocess_buyers_sellers(df):
 
 
 
- 
\ No newline at end of file
+ 
+
+
+# === Bases do app (uma carga por versão dos dados) ===
+
+SNAPSHOT_TABLES = ["df", "df_fill", "df_custody", "df_bs"]
+
+
+def load_tables(data_path="data/Broker_Daily_Data.csv", version=None, snapshot_dir=None):
+    """
+    Bases usadas pelo app e pelos relatórios: crua, preenchida, custody, buyers/sellers e catálogo.
+    Com snapshot_dir + version, réplicas no mesmo host abrem o snapshot Arrow IPC por memory-map.
+    """
+    from utils.catalog import build_catalog
+    from utils.snapshot import open_snapshot, publish_snapshot
+
+    if snapshot_dir and version:
+        snap = open_snapshot(snapshot_dir, version, SNAPSHOT_TABLES)
+        if snap is not None:
+            df, df_fill, df_custody, df_bs = (snap[name] for name in SNAPSHOT_TABLES)
+            return df, df_fill, df_custody, df_bs, build_catalog(df, date_col="date")
+
+    df = load_broker_data(data_path)  # normalized broker frame (tipos garantidos uma única vez)
+
+    # Catálogo: datas, brokers, profiles e calendário de dias úteis (uma vez por versão)
+    catalog = build_catalog(df, date_col="date")
+
+    # versão preenchida (pra calendário/filtros)
+    df_fill = fill_missing_business_days(df, date_col="date", business_days=catalog.business_days)
+
+    # custody e buyers/sellers usam o df cru → só dias reais
+    df_custody = preprocess_custody(df)
+    df_bs = preprocess_buyers_sellers(df)
+
+    if snapshot_dir and version:
+        publish_snapshot(dict(zip(SNAPSHOT_TABLES, (df, df_fill, df_custody, df_bs))), snapshot_dir, version)
+        # reabre pelo mmap para esta réplica também compartilhar as páginas; se outra
+        # réplica já removeu a versão, fica com as tabelas em memória
+        snap = open_snapshot(snapshot_dir, version, SNAPSHOT_TABLES)
+        if snap is not None:
+            df, df_fill, df_custody, df_bs = (snap[name] for name in SNAPSHOT_TABLES)
+
+    return df, df_fill, df_custody, df_bs, catalog
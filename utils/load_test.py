@@ -0,0 +1,181 @@
+"""
+Teste de carga do dashboard: N sessões concorrentes clicando pelas seções e presets.
+
+Uso:
+    python -m utils.load_test --sessions 8 --output loadtest.json
+    python -m utils.load_test --sessions 8 --compare loadtest-baseline.json
+
+Cada sessão é um AppTest (Streamlit headless) do app.py que percorre todas as seções ×
+presets da sidebar em ordem aleatória (semente fixa), medindo a latência de cada rerun.
+O AppTest usa um Runtime global por processo, então as sessões concorrentes rodam em
+processos separados (spawn); sessões atribuídas ao mesmo processo rodam em sequência
+e compartilham o cache dele, como usuários sucessivos de uma réplica.
+
+O relatório JSON traz commit, configuração, p50/p95/p99 por etapa e por seção e o pico
+de RSS de cada processo, para comparar entre commits (--compare).
+"""
+from __future__ import annotations
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows: sem getrusage → RSS não reportado
+    resource = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "app.py")
+PERCENTILES = (50, 95, 99)
+
+
+def _peak_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    # ru_maxrss em KB no Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _run_session(session: int, seed: int, timeout: float) -> dict:
+    """Worker: uma sessão completa do app. Retorna as latências (s) de cada rerun."""
+    from streamlit.testing.v1 import AppTest
+    from utils.periods_sidebar import PRESET_KEY, SECTION_KEY
+
+    os.chdir(ROOT)  # caminhos relativos do app (data/, assets/)
+    steps = []
+
+    def timed(kind, section, preset, action):
+        t0 = time.perf_counter()
+        at = action()
+        steps.append({
+            "kind": kind,
+            "section": section,
+            "preset": preset,
+            "latency": time.perf_counter() - t0,
+            "error": at.exception[0].message if at.exception else None,
+        })
+        return at
+
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    timed("initial", None, None, at.run)
+
+    # widgets pela key (a posição muda quando a sidebar ganha filtros)
+    sections = list(at.selectbox(key=SECTION_KEY).options)
+    presets = list(at.selectbox(key=PRESET_KEY).options)
+    clicks = [(s, p) for s in sections for p in presets]
+    random.Random(seed + session).shuffle(clicks)
+
+    for section, preset in clicks:
+        if at.selectbox(key=SECTION_KEY).value != section:
+            timed("section", section, at.selectbox(key=PRESET_KEY).value,
+                  lambda: at.selectbox(key=SECTION_KEY).set_value(section).run())
+        if at.selectbox(key=PRESET_KEY).value != preset:
+            timed("preset", section, preset, lambda: at.selectbox(key=PRESET_KEY).set_value(preset).run())
+
+    return {"session": session, "pid": os.getpid(), "peak_rss_mb": _peak_rss_mb(), "steps": steps}
+
+
+def _summary(latencies: list[float]) -> dict:
+    if not latencies:
+        return {"count": 0}
+    arr = np.asarray(latencies) * 1000.0
+    out = {"count": int(arr.size), "mean_ms": float(arr.mean())}
+    out.update({f"p{q}_ms": float(v) for q, v in zip(PERCENTILES, np.percentile(arr, PERCENTILES))})
+    return out
+
+
+def _git_commit() -> str | None:
+    try:
+        sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                             text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return sha + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_load_test(sessions: int = 4, processes: int | None = None, seed: int = 0, timeout: float = 120.0) -> dict:
+    """Roda as sessões num process pool e agrega latências e RSS no relatório."""
+    processes = min(processes or sessions, sessions)
+    ctx = multiprocessing.get_context("spawn")
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=processes, mp_context=ctx) as pool:
+        results = list(pool.map(_run_session, range(sessions), [seed] * sessions, [timeout] * sessions))
+    wall = time.perf_counter() - t0
+
+    steps = [s for r in results for s in r["steps"]]
+    reruns = [s for s in steps if s["kind"] != "initial"]
+    by_section: dict[str, list[float]] = {}
+    for s in reruns:
+        by_section.setdefault(s["section"], []).append(s["latency"])
+
+    rss = {}
+    for r in results:
+        if r["peak_rss_mb"] is not None:
+            rss[str(r["pid"])] = max(rss.get(str(r["pid"]), 0.0), r["peak_rss_mb"])
+
+    return {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {"sessions": sessions, "processes": processes, "seed": seed,
+                   "data": os.environ.get("BAROMETER_DATA", "data/Broker_Daily_Data.csv")},
+        "wall_s": wall,
+        "initial": _summary([s["latency"] for s in steps if s["kind"] == "initial"]),
+        "rerun": _summary([s["latency"] for s in reruns]),
+        "by_section": {k: _summary(v) for k, v in sorted(by_section.items())},
+        "errors": [{k: s[k] for k in ("section", "preset", "error")} for s in steps if s["error"]],
+        "peak_rss_mb": {"per_process": rss, "max": max(rss.values()) if rss else None},
+    }
+
+
+def compare(report: dict, baseline: dict) -> str:
+    """Tabela texto com as variações (atual vs baseline) dos percentis e do pico de RSS."""
+    lines = [f"{'metric':<28}{'baseline':>12}{'current':>12}{'delta':>10}"]
+
+    def row(name, old, new):
+        if old is None or new is None:
+            return
+        delta = (new - old) / old * 100 if old else float("nan")
+        lines.append(f"{name:<28}{old:>12.1f}{new:>12.1f}{delta:>9.1f}%")
+
+    for block in ("initial", "rerun"):
+        for q in PERCENTILES:
+            row(f"{block} p{q} (ms)", baseline.get(block, {}).get(f"p{q}_ms"), report[block].get(f"p{q}_ms"))
+    row("peak RSS max (MB)", baseline.get("peak_rss_mb", {}).get("max"), report["peak_rss_mb"]["max"])
+    return f"baseline {baseline.get('commit')} → current {report.get('commit')}\n" + "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Concurrent-session load test of the dashboard reruns.")
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--processes", type=int, default=None, help="worker processes (default: one per session)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--output", default=None, help="JSON report path (default: loadtest-<commit>.json)")
+    parser.add_argument("--compare", default=None, help="baseline JSON report to diff against")
+    args = parser.parse_args(argv)
+
+    report = run_load_test(args.sessions, args.processes, args.seed, args.timeout)
+    output = args.output or f"loadtest-{report['commit'] or 'local'}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    r = report["rerun"]
+    print(f"{r['count']} reruns in {report['wall_s']:.1f}s · p50 {r.get('p50_ms', 0):.0f} ms · "
+          f"p95 {r.get('p95_ms', 0):.0f} ms · p99 {r.get('p99_ms', 0):.0f} ms · "
+          f"peak RSS {report['peak_rss_mb']['max'] or 0:.0f} MB · {len(report['errors'])} errors → {output}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print(compare(report, json.load(f)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Painel denso broker × dia útil × campo (NumPy), construído uma vez por versão dos dados.
+
+values[broker_code, day, field] guarda os campos numéricos do frame preenchido (NaN onde
+não há valor) e mask[broker_code, day] marca as linhas que existem no frame. Recortes
+de período/broker viram fatias (views, sem cópia) e as agregações por broker ou por dia
+viram reduções por eixo, no lugar dos groupbys sobre o frame longo.
+"""
+from __future__ import annotations
+import os
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from utils.broker_frame import ensure_normalized
+from utils.broker_index import normalize_selection, selection_names
+from utils.calendar_table import week_ids, week_starts
+
+# desligável (BAROMETER_PANEL=0) → seções voltam aos groupbys sobre o frame longo
+PANEL_ENABLED = os.environ.get("BAROMETER_PANEL", "1") != "0"
+
+PANEL_FIELDS = ["buy_volume", "sell_volume", "buy_vwap", "sell_vwap", "start_balance",
+                "end_balance", "efficiency_score", "short_interest", "anon_volume"]
+
+
+def _restore_dtype(values: np.ndarray, dtype) -> np.ndarray:
+    """Somas de colunas inteiras voltam a inteiro (mesmo tipo do groupby) quando não há NaN."""
+    if pd.api.types.is_integer_dtype(dtype) and not np.isnan(values).any():
+        return values.astype(dtype)
+    return values
+
+
+@dataclass(frozen=True)
+class BrokerPanel:
+    brokers: tuple[str, ...]   # código → nome (ordem alfabética, como o groupby)
+    days: pd.DatetimeIndex     # eixo de dias (ordenado)
+    fields: tuple[str, ...]
+    dtypes: dict               # dtype original de cada campo
+    values: np.ndarray         # float64 [broker, day, field]
+    mask: np.ndarray           # bool [broker, day]
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.values.nbytes + self.mask.nbytes)
+
+    def window(self, start, end, broker="All") -> "PanelWindow":
+        """
+        Recorte [start, end] (datas inclusivas) de todos os brokers, de um só (fatia, sem
+        cópia) ou de vários (índices dos códigos selecionados).
+        """
+        lo = self.days.searchsorted(pd.Timestamp(start), side="left")
+        hi = self.days.searchsorted(pd.Timestamp(end), side="right")
+        names = selection_names(normalize_selection(broker))
+        if names is None:
+            rows = slice(None)
+        else:
+            brokers, names = np.asarray(self.brokers, dtype=object), np.asarray(names, dtype=object)
+            codes = np.searchsorted(brokers, names)
+            found = codes < len(brokers)
+            found[found] = brokers[codes[found]] == names[found]
+            codes = np.unique(codes[found])
+            rows = slice(int(codes[0]), int(codes[0]) + 1) if len(codes) == 1 else codes
+        return PanelWindow(self, rows, slice(lo, hi))
+
+
+@dataclass(frozen=True)
+class PanelWindow:
+    """Fatia do painel (brokers × dias) com as reduções usadas pelas seções."""
+    panel: BrokerPanel
+    rows: slice | np.ndarray  # fatia (todos / um broker) ou códigos (vários)
+    cols: slice
+
+    @property
+    def brokers(self) -> np.ndarray:
+        return np.asarray(self.panel.brokers, dtype=object)[self.rows]
+
+    @property
+    def days(self) -> pd.DatetimeIndex:
+        return self.panel.days[self.cols]
+
+    @property
+    def mask(self) -> np.ndarray:
+        return self.panel.mask[self.rows, self.cols]
+
+    def field(self, name: str) -> np.ndarray:
+        """Matriz brokers × dias do campo (view)."""
+        return self.panel.values[self.rows, self.cols, self.panel.fields.index(name)]
+
+    def _present(self) -> np.ndarray:
+        return self.mask.any(axis=1)
+
+    def sums(self, fields: list[str]) -> pd.DataFrame:
+        """Soma por broker (equivale a groupby("broker", as_index=False)[fields].sum())."""
+        present = self._present()
+        out = pd.DataFrame({"broker": self.brokers[present].astype(str)})
+        for name in fields:
+            total = np.nansum(np.where(self.mask, self.field(name), np.nan), axis=1)[present]
+            out[name] = _restore_dtype(total, self.panel.dtypes[name])
+        return out
+
+    def first_last(self, first_field: str, last_field: str) -> pd.DataFrame:
+        """Primeiro valor válido de first_field e último de last_field por broker (groupby first/last)."""
+        present = self._present()
+        out = pd.DataFrame({"broker": self.brokers[present].astype(str)})
+        if not present.any():  # janela sem linhas (ex.: sem dias no período)
+            return out.assign(**{first_field: [], last_field: []})
+        for name, take_last in ((first_field, False), (last_field, True)):
+            data = self.field(name)
+            valid = self.mask & ~np.isnan(data)
+            if take_last:
+                idx = data.shape[1] - 1 - np.argmax(valid[:, ::-1], axis=1)
+            else:
+                idx = np.argmax(valid, axis=1)
+            picked = np.where(valid.any(axis=1), data[np.arange(len(data)), idx], np.nan)[present]
+            out[name] = _restore_dtype(picked, self.panel.dtypes[name])
+        return out
+
+    def daily_sums(self, name: str) -> pd.DataFrame:
+        """Soma entre brokers por dia (dias com alguma linha), como groupby("date")[name].sum()."""
+        present = self.mask.any(axis=0)
+        total = np.nansum(np.where(self.mask, self.field(name), np.nan), axis=0)[present]
+        return pd.DataFrame({"date": self.days[present],
+                             name: _restore_dtype(total, self.panel.dtypes[name])})
+
+    def weekly_sums(self, name: str) -> pd.DataFrame:
+        """Soma por broker × semana (segunda-feira), brokers nas linhas e semanas nas colunas."""
+        weeks, codes = np.unique(week_ids(self.days), return_inverse=True)
+        data = np.where(self.mask, self.field(name), 0.0)
+        data = np.nan_to_num(data, nan=0.0)
+        out = np.zeros((data.shape[0], len(weeks)))
+        np.add.at(out.T, codes, data.T)
+        present = self._present()
+        return pd.DataFrame(out[present], index=self.brokers[present].astype(str),
+                            columns=week_starts(weeks).rename("week"))
+
+
+def window_for(panel: BrokerPanel | None, view, start=None, end=None) -> PanelWindow | None:
+    """
+    Recorte do painel para a visão da sidebar (ViewKey: período + broker). start/end
+    (date pickers) restringem o período — mesma interseção que filtrar o cur_df.
+    """
+    if panel is None or view is None:
+        return None
+    lo, hi = pd.Timestamp(view.start_date), pd.Timestamp(view.end_date)
+    if start is not None:
+        lo = max(lo, pd.Timestamp(start))
+    if end is not None:
+        hi = min(hi, pd.Timestamp(end))
+    return panel.window(lo, hi, view.broker)
+
+
+def build_panel(df: pd.DataFrame, fields: list[str] | None = None) -> BrokerPanel | None:
+    """
+    Monta o painel a partir do frame longo (normalmente o df_fill). None quando o painel
+    não representa o frame: (broker, date) repetidos (ex.: várias linhas por ticker).
+    """
+    df = ensure_normalized(df)
+    df = df[df["broker"].notna() & df["date"].notna()]
+    if df.empty or df.duplicated(["broker", "date"]).any():
+        return None
+    fields = [f for f in (fields or PANEL_FIELDS) if f in df.columns]
+
+    broker_codes, brokers = pd.factorize(df["broker"], sort=True)
+    day_codes, days = pd.factorize(df["date"], sort=True)
+
+    values = np.full((len(brokers), len(days), len(fields)), np.nan)
+    values[broker_codes, day_codes] = df[fields].to_numpy(dtype=float, na_value=np.nan)
+    mask = np.zeros((len(brokers), len(days)), dtype=bool)
+    mask[broker_codes, day_codes] = True
+
+    return BrokerPanel(
+        brokers=tuple(str(b) for b in brokers),
+        days=pd.DatetimeIndex(days),
+        fields=tuple(fields),
+        dtypes={f: df[f].dtype for f in fields},
+        values=values,
+        mask=mask,
+    )
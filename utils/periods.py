@@ -1,70 +1,82 @@
-from datetime import datetime, timedelta
-from typing import Tuple
+from __future__ import annotations
+from typing import Tuple, TYPE_CHECKING
 import pandas as pd
 
+from utils.calendar_table import shift_months, week_bounds, week_ids
+
+if TYPE_CHECKING:
+    from utils.catalog import DatasetCatalog
+
 PERIOD_PRESETS = [
     "Last closed week",
     "Last 4 weeks",
     "Last 3 months",
     "Last 12 months",
 ]
+WEEK_PRESETS = {"Last closed week": 1, "Last 4 weeks": 4}       # semanas Seg–Sex
+MONTH_PRESETS = {"Last 3 months": 3, "Last 12 months": 12}      # meses
+
 
+# Períodos em ids inteiros de semana/mês (utils.calendar_table): semanas Seg–Sex,
+# meses pelo mesmo dia do mês (como DateOffset).
 
 def _last_closed_week_calendar() -> Tuple[pd.Timestamp, pd.Timestamp]:
     """Seg–Sex da última semana fechada (pelo calendário, independente do dataset)."""
-    today = datetime.today()
-    days_since_monday = today.weekday()
-    monday = today - timedelta(days=days_since_monday + 7)
-    friday = monday + timedelta(days=4)
-    return pd.to_datetime(monday.date()), pd.to_datetime(friday.date())
+    return week_bounds(int(week_ids([pd.Timestamp.today()])[0]) - 1)
 
 
-def _last_closed_week_data(df: pd.DataFrame, date_col: str = "date") -> Tuple[pd.Timestamp, pd.Timestamp]:
-    """Última semana fechada *com dados* no dataset (Seg–Sex)."""
-    df = df.copy()
-    df[date_col] = pd.to_datetime(df[date_col], errors="coerce")
-
-    max_date = df[date_col].max()
-    if pd.isna(max_date):
+def _closed_week_ending(max_date: pd.Timestamp) -> Tuple[pd.Timestamp, pd.Timestamp]:
+    """Seg–Sex da última semana fechada até max_date (sexta-feira ≤ max_date)."""
+    if max_date is None or pd.isna(max_date):
         return None, None  # dataset vazio
 
-    # encontra a última sexta-feira <= max_date
-    friday = max_date - pd.Timedelta(days=(max_date.weekday() - 4) % 7)
+    week = int(week_ids([max_date])[0])
+    monday, friday = week_bounds(week)
+    if friday > pd.Timestamp(max_date).normalize():
+        monday, friday = week_bounds(week - 1)
+    return monday, friday
+
 
-    # correção: não permitir sexta depois do max_date
-    if friday > max_date:
-        friday -= pd.Timedelta(weeks=1)
+def _last_closed_week_data(df: pd.DataFrame | None, date_col: str = "date",
+                           catalog: DatasetCatalog | None = None) -> Tuple[pd.Timestamp, pd.Timestamp]:
+    """Última semana fechada *com dados* no dataset (Seg–Sex). Com catalog, não varre o frame."""
+    if catalog is not None:
+        return catalog.last_closed_week
 
-    monday = friday - pd.Timedelta(days=4)
+    dates = df[date_col]
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates, errors="coerce")
 
-    return monday.normalize(), friday.normalize()
+    return _closed_week_ending(dates.max())
 
 
-def _last_n_weeks_range(n: int, df: pd.DataFrame | None = None, date_col: str = "date") -> Tuple[pd.Timestamp, pd.Timestamp]:
+def _last_n_weeks_range(n: int, df: pd.DataFrame | None = None, date_col: str = "date",
+                        catalog: DatasetCatalog | None = None) -> Tuple[pd.Timestamp, pd.Timestamp]:
     """N semanas completas terminando na última semana fechada (alinhadas Seg–Sex)."""
-    if df is not None:
-        start0, end0 = _last_closed_week_data(df, date_col)
+    if df is not None or catalog is not None:
+        start0, end0 = _last_closed_week_data(df, date_col, catalog)
     else:
         start0, end0 = _last_closed_week_calendar()
 
     if start0 is None or end0 is None:
         return None, None
 
-    startN = start0 - timedelta(weeks=n - 1)
-    return startN.normalize(), end0.normalize()
+    start_n, _ = week_bounds(int(week_ids([start0])[0]) - (n - 1))
+    return start_n, end0.normalize()
 
 
-def get_period_by_preset(preset: str, df: pd.DataFrame | None = None, date_col: str = "date") -> Tuple[pd.Timestamp, pd.Timestamp]:
-    """Período atual para cada preset."""
+def get_period_by_preset(preset: str, df: pd.DataFrame | None = None, date_col: str = "date",
+                         catalog: DatasetCatalog | None = None) -> Tuple[pd.Timestamp, pd.Timestamp]:
+    """Período atual para cada preset (catalog evita varrer o DataFrame)."""
     
     if preset == "Last closed week":
-        if df is None:
-            raise ValueError("Para 'Last closed week' é necessário passar o DataFrame.")
-        return _last_closed_week_data(df, date_col)
+        if df is None and catalog is None:
+            raise ValueError("Para 'Last closed week' é necessário passar o DataFrame (ou o catálogo).")
+        return _last_closed_week_data(df, date_col, catalog)
 
     # ancora na última semana fechada (pelos dados se possível)
-    if df is not None:
-        _, anchor_end = _last_closed_week_data(df, date_col)
+    if df is not None or catalog is not None:
+        _, anchor_end = _last_closed_week_data(df, date_col, catalog)
     else:
         _, anchor_end = _last_closed_week_calendar()
 
@@ -72,14 +84,10 @@ def get_period_by_preset(preset: str, df: pd.DataFrame | None = None, date_col:
         return None, None
 
     if preset == "Last 4 weeks":
-        return _last_n_weeks_range(4, df, date_col)
+        return _last_n_weeks_range(4, df, date_col, catalog)
 
-    if preset == "Last 3 months":
-        start = anchor_end - pd.DateOffset(months=3)
-        return start.normalize(), anchor_end.normalize()
-
-    if preset == "Last 12 months":
-        start = anchor_end - pd.DateOffset(years=1)
+    if preset in MONTH_PRESETS:
+        start = shift_months(anchor_end, -MONTH_PRESETS[preset])
         return start.normalize(), anchor_end.normalize()
 
     raise ValueError(f"Preset desconhecido: {preset}")
@@ -91,28 +99,40 @@ def previous_period_by_preset(preset: str,
     """Janela imediatamente anterior equivalente ao preset atual."""
     start_date = pd.to_datetime(start_date); end_date = pd.to_datetime(end_date)
 
-    if preset == "Last closed week":
-        prev_end = start_date - pd.Timedelta(days=1)
-        prev_start = prev_end - pd.Timedelta(days=4)
-        return prev_start.normalize(), prev_end.normalize()
+    if preset in WEEK_PRESETS:
+        # o mesmo número de semanas (Seg–Sex) imediatamente antes
+        n = WEEK_PRESETS[preset]
+        week = int(week_ids([start_date])[0])
+        prev_start, _ = week_bounds(week - n)
+        _, prev_end = week_bounds(week - 1)
+        return prev_start, prev_end
 
-    if preset == "Last 4 weeks":
-        # mantém sempre blocos completos de 4 semanas (Seg–Sex)
+    if preset in MONTH_PRESETS:
         prev_end = start_date - pd.Timedelta(days=1)
-        prev_start = prev_end - pd.Timedelta(weeks=4) + pd.Timedelta(days=1)
-        return prev_start.normalize(), prev_end.normalize()
-
-    if preset == "Last 3 months":
-        prev_end = start_date - pd.Timedelta(days=1)
-        prev_start = prev_end - pd.DateOffset(months=3) + pd.Timedelta(days=1)
-        return prev_start.normalize(), prev_end.normalize()
-
-    if preset == "Last 12 months":
-        prev_end = start_date - pd.Timedelta(days=1)
-        prev_start = prev_end - pd.DateOffset(years=1) + pd.Timedelta(days=1)
+        prev_start = shift_months(prev_end, -MONTH_PRESETS[preset]) + pd.Timedelta(days=1)
         return prev_start.normalize(), prev_end.normalize()
 
     # fallback: mesma duração deslocada pra trás
     prev_end = start_date - pd.Timedelta(days=1)
     prev_start = prev_end - (end_date - start_date)
     return prev_start.normalize(), prev_end.normalize()
+
+
+def resolve_preset(preset: str, catalog: DatasetCatalog | None = None, back: int = 0):
+    """
+    Período atual e anterior do preset, com a mesma regra da sidebar:
+    "Last closed week" pelos dados (catálogo); os demais pelo calendário.
+    back: quantos períodos voltar (o anterior vira o atual, back vezes).
+    Retorna (start_date, end_date, prev_start, prev_end).
+    """
+    if preset == "Last closed week":
+        start_date, end_date = get_period_by_preset(preset, catalog=catalog)
+    else:
+        start_date, end_date = get_period_by_preset(preset)
+    if start_date is None:
+        return None, None, None, None
+    prev_start, prev_end = previous_period_by_preset(preset, start_date, end_date)
+    for _ in range(back):
+        start_date, end_date = prev_start, prev_end
+        prev_start, prev_end = previous_period_by_preset(preset, start_date, end_date)
+    return start_date, end_date, prev_start, prev_end
@@ -1,7 +1,57 @@
+from typing import NamedTuple
 import pandas as pd
 import streamlit as st
-from utils.periods import PERIOD_PRESETS, get_period_by_preset, previous_period_by_preset
+from utils.periods import PERIOD_PRESETS, resolve_preset
 from utils.filter_data import filter_data
+from utils.catalog import DatasetCatalog, build_catalog
+from utils.result_cache import cached, content_fingerprint
+from utils.broker_index import normalize_selection
+from utils.broker_groups import load_groups, save_group
+
+
+# chaves dos widgets principais da sidebar (também usadas pelo utils.load_test)
+SECTION_KEY = "section"
+PRESET_KEY = "period_preset"
+
+
+class ViewKey(NamedTuple):
+    """Chave da visão selecionada (datas resolvidas + broker) usada nos caches por seção."""
+    data_version: str
+    start_date: pd.Timestamp
+    end_date: pd.Timestamp
+    prev_start: pd.Timestamp
+    prev_end: pd.Timestamp
+    broker: str | tuple[str, ...]  # "All", um broker ou tupla ordenada (grupo)
+
+    @property
+    def fingerprint(self) -> str:
+        """Impressão digital de cur_df/prev_df (versão dos dados + filtro), chave dos payloads de render."""
+        return content_fingerprint(*self)
+
+
+def _apply_group(groups: dict, brokers: tuple) -> None:
+    """Escolher um grupo salvo preenche a seleção de brokers ("—" → todos)."""
+    members = groups.get(st.session_state.broker_group, [])
+    st.session_state.brokers = [b for b in members if b in brokers]
+
+
+def _render_broker_filter(brokers: tuple):
+    """Grupo salvo + multiselect de brokers (vazio = todos) + salvar seleção como grupo."""
+    groups = load_groups()
+    st.sidebar.selectbox("Broker group", ["—"] + list(groups), key="broker_group",
+                         on_change=_apply_group, args=(groups, brokers))
+    selected = st.sidebar.multiselect("Brokers", brokers, key="brokers", placeholder="All brokers")
+
+    with st.sidebar.expander("Save selection as group"):
+        name = st.text_input("Group name", key="broker_group_name")
+        if st.button("Save group", disabled=not selected):
+            try:
+                save_group(name, selected)
+                st.success(f"Group saved: {name.strip()}")
+            except ValueError as e:
+                st.error(str(e))
+
+    return normalize_selection(selected, universe=brokers)
 
 
 def render_period_sidebar(
@@ -9,7 +59,19 @@ def render_period_sidebar(
     date_col: str = "date",
     sections: list[str] | None = None,
     show_filters_title: bool = True,
+    data_version: str | None = None,
+    catalog: DatasetCatalog | None = None,
 ):
+    """
+    Sidebar de seção/período/broker.
+    Com data_version, os recortes cur_df/prev_df passam pelo cache do processo
+    (sessões com a mesma seleção reaproveitam o mesmo resultado).
+    catalog: metadados do dataset (datas, brokers) já calculados na carga.
+    """
+    if catalog is None:
+        catalog = cached(("catalog", data_version, date_col) if data_version else None,
+                         lambda: build_catalog(df, date_col))
+
     if sections is None:
         sections = ["Company View", "Short Interest"]
 
@@ -17,30 +79,35 @@ def render_period_sidebar(
         st.sidebar.title("🔎 Filters")
 
     # Seções
-    section = st.sidebar.selectbox("Section", sections, index=0)
+    section = st.sidebar.selectbox("Section", sections, index=0, key=SECTION_KEY)
 
     # Preset de período (lista de strings, não função!)
-    preset = st.sidebar.selectbox("Reference period", PERIOD_PRESETS, index=0)
+    preset = st.sidebar.selectbox("Reference period", PERIOD_PRESETS, index=0, key=PRESET_KEY)
 
-    # Se for "Last closed week" → calcula com base no dataset
-    if preset == "Last closed week":
-        start_date, end_date = get_period_by_preset(preset, df, date_col=date_col)
-    else:
-        start_date, end_date = get_period_by_preset(preset)
+    # Voltar N períodos do preset (0 = o mais recente)
+    back = st.sidebar.number_input("Periods back", min_value=0, max_value=520, value=0, step=1,
+                                   key="periods_back")
 
-    # Filtros adicionais
-    brokers = ["All"] + sorted(df["broker"].dropna().unique().tolist())
-    broker = st.sidebar.selectbox("Broker", brokers, index=0)
+    # Período atual ("Last closed week" pelo dataset) e anterior
+    start_date, end_date, prev_start, prev_end = resolve_preset(preset, catalog=catalog, back=int(back))
 
-    # aplica filtro
-    cur_df = filter_data(df, date_range=(start_date, end_date), broker=broker)
+    # Filtros adicionais: um, vários ou todos os brokers (seleção canônica → chave de cache)
+    broker = _render_broker_filter(catalog.brokers)
+
+    # chave da visão: datas resolvidas (não o preset, que pode depender do calendário) + broker
+    view_key = ViewKey(data_version, start_date, end_date, prev_start, prev_end, broker) if data_version else None
 
-    # Período anterior
-    prev_start, prev_end = previous_period_by_preset(preset, start_date, end_date)
-    prev_df = filter_data(df, date_range=(prev_start, prev_end), broker=broker)
+    # aplica filtro
+    cur_df, prev_df = cached(
+        ("period_frames",) + view_key if view_key else None,
+        lambda: (
+            filter_data(df, date_range=(start_date, end_date), broker=broker),
+            filter_data(df, date_range=(prev_start, prev_end), broker=broker),
+        ),
+    )
 
     # Label para títulos
     period_label = f"{start_date:%Y/%m/%d} – {end_date:%Y/%m/%d}"
 
-    return section, preset, start_date, end_date, cur_df, prev_df, period_label
+    return section, preset, start_date, end_date, cur_df, prev_df, period_label, view_key
 
@@ -0,0 +1,204 @@
+"""
+Pré-aquecimento especulativo do cache de resultados.
+
+Depois de renderizar uma visão, calcula em segundo plano as visões que o analista
+costuma abrir em seguida: o mesmo preset um período para trás ("Periods back" + 1: o
+anterior vira o atual, o anterior do anterior vira a comparação) e os outros presets
+para o mesmo broker.
+Para cada visão são aquecidos os recortes da sidebar (cur_df/prev_df) e o resultado da
+seção aberta pelo mesmo registro que os componentes usam (utils.section_tasks: chave +
+cálculo) — a próxima navegação vira hit no ResultCache.
+
+O trabalho roda num pool de threads limitado (BAROMETER_PREFETCH_WORKERS, 0 desliga),
+com no máximo BAROMETER_PREFETCH_VIEWS visões por render e só enquanto o cache tem
+folga (não expulsa resultados reais para guardar especulação). Uma chave em cálculo no
+prefetch não é recalculada pela sessão: get_or_compute espera o resultado.
+"""
+from __future__ import annotations
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Hashable
+
+import pandas as pd
+
+from utils.catalog import DatasetCatalog
+from utils.filter_data import filter_data
+from utils.panel import BrokerPanel
+from utils.periods import PERIOD_PRESETS, previous_period_by_preset, resolve_preset
+from utils.result_cache import cached, get_result_cache
+from utils.section_tasks import SECTION_TASKS, TOP_N, SectionInputs, section_key, section_result
+from utils.sections import THRESHOLD_MEAN_2SD
+
+PREFETCH_WORKERS = int(os.environ.get("BAROMETER_PREFETCH_WORKERS", "2"))
+PREFETCH_VIEWS = int(os.environ.get("BAROMETER_PREFETCH_VIEWS", "4"))
+# fração do orçamento do cache acima da qual o prefetch não roda
+PREFETCH_CACHE_FILL = 0.8
+
+# seções que, sem dados no período, mostram "No data" sem calcular nada
+_SKIP_WHEN_EMPTY = ("Short Interest", "General Profile", "Top Buyers & Sellers", "Weekly Trading",
+                    "Broker Correlation")
+
+
+@dataclass(frozen=True)
+class PrefetchContext:
+    """Bases e estruturas compartilhadas de que as seções precisam (as mesmas do app)."""
+    df: pd.DataFrame                       # df_fill (base dos recortes da sidebar)
+    catalog: DatasetCatalog
+    panel: BrokerPanel | None = None
+    client: Any = None                     # QueryClient (BAROMETER_QUERY_URL) ou None
+    pickers: dict | None = None            # widgets salvos: date pickers (custody_*, bs_*), si_threshold
+
+    @property
+    def inputs(self) -> SectionInputs:
+        return SectionInputs(df=self.df, panel=self.panel, client=self.client)
+
+
+def neighbor_views(preset: str, view_key, catalog: DatasetCatalog, back: int = 0) -> list:
+    """
+    Visões prováveis a seguir, da mais para a menos provável: um período para trás no
+    mesmo preset e depois os outros presets (mesmo broker, mesmo "Periods back").
+    """
+    views = []
+    prev_start, prev_end = view_key.prev_start, view_key.prev_end
+    if prev_start is not None and prev_end is not None:
+        back_start, back_end = previous_period_by_preset(preset, prev_start, prev_end)
+        views.append(view_key._replace(start_date=prev_start, end_date=prev_end,
+                                       prev_start=back_start, prev_end=back_end))
+    for other in PERIOD_PRESETS:
+        if other == preset:
+            continue
+        start, end, p_start, p_end = resolve_preset(other, catalog=catalog, back=back)
+        if start is None:
+            continue
+        views.append(view_key._replace(start_date=start, end_date=end, prev_start=p_start, prev_end=p_end))
+    return views
+
+
+def _picker_window(ctx: PrefetchContext, prefix: str, view_key):
+    """Janela que os date pickers da seção terão na visão: a salva presa aos novos limites."""
+    lo, hi = ctx.catalog.clip_bounds(view_key.start_date, view_key.end_date)
+    if lo is None:
+        return None, None
+    saved = ctx.pickers or {}
+    start = saved.get(f"{prefix}_start", lo)
+    end = saved.get(f"{prefix}_end", hi)
+    return min(max(start, lo), hi), min(max(end, lo), hi)
+
+
+# parâmetros de render de cada seção (os demais resultados dependem só da visão)
+_PICKER_PREFIX = {"Custody": "custody", "Buyers & Sellers": "bs"}
+
+
+def _section_params(section: str, view_key, ctx: PrefetchContext) -> tuple | None:
+    """Parâmetros que o render da seção usará na visão (None: seção sem resultado a aquecer)."""
+    if section not in SECTION_TASKS:
+        return None
+    if section in ("Top Buyers & Sellers", "Weekly Trading"):
+        return (TOP_N,)
+    if section == "Short Interest":
+        return ((ctx.pickers or {}).get("si_threshold", THRESHOLD_MEAN_2SD),)
+    if section in _PICKER_PREFIX:
+        start, end = _picker_window(ctx, _PICKER_PREFIX[section], view_key)
+        return None if start is None else (start, end)
+    return ()
+
+
+def _view_keys(section: str, view_key, ctx: PrefetchContext) -> list[Hashable]:
+    """Chaves de cache que a visão usa (recortes da sidebar + resultado da seção)."""
+    params = _section_params(section, view_key, ctx)
+    keys = [("period_frames",) + view_key]
+    return keys if params is None else keys + [section_key(section, view_key, *params)]
+
+
+def warm_view(section: str, view_key, ctx: PrefetchContext) -> None:
+    """Aquece os recortes da sidebar e o resultado da seção para uma visão."""
+    params = _section_params(section, view_key, ctx)
+    if params is not None and section_key(section, view_key, *params) in get_result_cache():
+        return
+    cur_df, prev_df = cached(
+        ("period_frames",) + view_key,
+        lambda: (
+            filter_data(ctx.df, date_range=(view_key.start_date, view_key.end_date), broker=view_key.broker),
+            filter_data(ctx.df, date_range=(view_key.prev_start, view_key.prev_end), broker=view_key.broker),
+        ),
+    )
+    if params is not None and not (cur_df.empty and section in _SKIP_WHEN_EMPTY):
+        section_result(section, cur_df, prev_df, view_key, ctx.inputs, *params)
+
+
+class Prefetcher:
+    """Pool de threads limitado + conjunto de visões pendentes (sem trabalho duplicado)."""
+
+    def __init__(self, workers: int = PREFETCH_WORKERS, max_views: int = PREFETCH_VIEWS):
+        self.workers = max(0, workers)
+        self.max_views = max(0, max_views)
+        self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="prefetch") if self.workers else None
+        self._pending: set[Hashable] = set()
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._pool is not None and self.max_views > 0
+
+    def _has_room(self) -> bool:
+        stats = get_result_cache().stats()
+        return stats["bytes"] < PREFETCH_CACHE_FILL * stats["max_bytes"]
+
+    def schedule(self, section: str, preset: str, view_key, ctx: PrefetchContext, back: int = 0) -> int:
+        """Agenda as visões vizinhas ainda fora do cache. Retorna quantas foram agendadas."""
+        if not self.enabled or view_key is None or not self._has_room():
+            return 0
+        cache = get_result_cache()
+        scheduled = 0
+        for view in neighbor_views(preset, view_key, ctx.catalog, back)[: self.max_views]:
+            task_key = (section, view)
+            if all(k in cache for k in _view_keys(section, view, ctx)):
+                continue  # já em cache: nada a fazer (e não conta hit)
+            with self._lock:
+                # fila limitada: no máximo max_views visões por worker esperando
+                if task_key in self._pending or len(self._pending) >= self.workers * self.max_views:
+                    continue
+                self._pending.add(task_key)
+            self._pool.submit(self._run, task_key, section, view, ctx)
+            scheduled += 1
+        with self._lock:
+            self.submitted += scheduled
+        return scheduled
+
+    def _run(self, task_key, section, view, ctx) -> None:
+        try:
+            if self._has_room():
+                warm_view(section, view, ctx)
+        except Exception:
+            with self._lock:
+                self.errors += 1  # especulação: a sessão recalcula normalmente se precisar
+        finally:
+            with self._lock:
+                self._pending.discard(task_key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = len(self._pending)
+        return {"workers": self.workers, "pending": pending, "submitted": self.submitted, "errors": self.errors}
+
+
+_PREFETCHER: Prefetcher | None = None
+_PREFETCHER_LOCK = threading.Lock()
+
+
+def get_prefetcher() -> Prefetcher:
+    """Prefetcher único do processo (pool compartilhado por todas as sessões)."""
+    global _PREFETCHER
+    with _PREFETCHER_LOCK:
+        if _PREFETCHER is None:
+            _PREFETCHER = Prefetcher()
+        return _PREFETCHER
+
+
+def schedule_prefetch(section: str, preset: str, view_key, ctx: PrefetchContext, back: int = 0) -> int:
+    """Atalho usado pelo app depois de renderizar a visão."""
+    return get_prefetcher().schedule(section, preset, view_key, ctx, back)
@@ -0,0 +1,96 @@
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+
+from utils.broker_frame import ensure_normalized
+
+
+def _col(df: pd.DataFrame, name: str) -> np.ndarray:
+    if name not in df.columns:
+        return np.full(len(df), np.nan)
+    return df[name].to_numpy(dtype=float, na_value=np.nan)
+
+
+def profile_period_stats(frames: list[pd.DataFrame | None]) -> list[dict | None]:
+    """
+    Agregados do General Profile para vários períodos (ex.: [cur, prev]) em uma única redução.
+    Cada linha vira um segmento inteiro (período × profile × anonymous) e os totais saem de
+    np.bincount com pesos: volumes, VWAPs ponderados, % anônimo, top profile e volume por profile.
+    """
+    parts = [(i, ensure_normalized(f)) for i, f in enumerate(frames) if f is not None and not f.empty]
+    out: list[dict | None] = [None] * len(frames)
+    if not parts:
+        return out
+
+    n_periods = len(frames)
+    needed = ["profile", "anonymous", "broker", "investor", "buy_volume", "sell_volume",
+              "buy_vwap", "sell_vwap", "anon_volume"]
+    data = pd.concat([f[[c for c in needed if c in f.columns]] for _, f in parts], ignore_index=True)
+    period = np.concatenate([np.full(len(f), i, dtype=np.int64) for i, f in parts])
+
+    # códigos inteiros (profile NaN → -1, fica fora do volume por profile, como no groupby)
+    prof_codes, prof_names = pd.factorize(data["profile"], sort=True)
+    n_prof = len(prof_names)
+    anon = data["anonymous"].to_numpy(dtype=bool) if "anonymous" in data.columns else np.zeros(len(data), bool)
+    ent_col = "broker" if "broker" in data.columns else ("investor" if "investor" in data.columns else None)
+
+    buy, sell = _col(data, "buy_volume"), _col(data, "sell_volume")
+    buy_vwap, sell_vwap = _col(data, "buy_vwap"), _col(data, "sell_vwap")
+    anon_vol = _col(data, "anon_volume")
+
+    seg = (period * (n_prof + 1) + (prof_codes + 1)) * 2 + anon
+    n_seg = n_periods * (n_prof + 1) * 2
+    shape = (n_periods, n_prof + 1, 2)
+
+    def reduce(weights=None):
+        w = None if weights is None else np.nan_to_num(weights, nan=0.0)
+        return np.bincount(seg, weights=w, minlength=n_seg).reshape(shape)
+
+    rows = reduce()
+    buy_s, sell_s = reduce(buy), reduce(sell)
+    buy_px, sell_px = reduce(buy_vwap * buy), reduce(sell_vwap * sell)
+    anon_s, anon_n = reduce(anon_vol), reduce(~np.isnan(anon_vol))
+
+    # brokers distintos por período (pares período × código únicos)
+    if ent_col:
+        ent_codes, ent_names = pd.factorize(data[ent_col])
+        valid = ent_codes >= 0
+        n_entities = np.bincount(np.unique(period[valid] * len(ent_names) + ent_codes[valid]) // max(len(ent_names), 1),
+                                 minlength=n_periods)
+    else:
+        n_entities = np.zeros(n_periods, dtype=np.int64)
+
+    for i, _ in parts:
+        total_buy = float(buy_s[i].sum())
+        total_sell = float(sell_s[i].sum())
+        w_buy = float("nan") if total_buy == 0 else float(buy_px[i].sum() / total_buy)
+        w_sell = float("nan") if total_sell == 0 else float(sell_px[i].sum() / total_sell)
+
+        # % de volume anônimo: usa 'anon_volume' quando houver; senão buy+sell das linhas anonymous=True
+        if anon_n[i].sum() > 0:
+            anon_total = float(anon_s[i].sum())
+        else:
+            anon_total = float(buy_s[i, :, 1].sum() + sell_s[i, :, 1].sum())
+        denom = total_buy + total_sell
+        anon_pct = float("nan") if denom == 0 else (anon_total / denom) * 100.0
+
+        # volume por profile (só profiles presentes no período) e perfil topo por buy volume
+        present = rows[i, 1:].sum(axis=1) > 0
+        prof_buy = buy_s[i, 1:].sum(axis=1)
+        profile_volumes = pd.DataFrame({
+            "profile": np.asarray(prof_names)[present],
+            "total_buy_volume": prof_buy[present],
+        })
+        top_profile = profile_volumes["profile"].iloc[int(np.argmax(prof_buy[present]))] if present.any() else "Unknown"
+
+        out[i] = {
+            "total_buy": total_buy,
+            "total_sell": total_sell,
+            "w_buy_vwap": w_buy,
+            "w_sell_vwap": w_sell,
+            "anon_pct": anon_pct,
+            "top_profile": top_profile,
+            "n_entities": int(n_entities[i]),
+            "profile_volumes": profile_volumes,
+        }
+    return out
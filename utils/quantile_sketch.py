@@ -0,0 +1,226 @@
+"""
+Sketches de quantis mergeáveis (KLL) do short interest diário, por partição mensal.
+
+Cada mês guarda um sketch por broker (short interest do broker no dia) e um do total
+(soma entre brokers no dia). Um percentil de qualquer janela sai do merge dos sketches
+dos meses que a janela cobre inteiros + os valores crus dos dias das pontas, sem
+reordenar o histórico; um percentil de longo prazo por broker (ex.: últimos 12 meses)
+é só um merge de 12 sketches.
+
+KLL: níveis de compactadores; o nível h guarda itens de peso 2^h e, cheio, ordena e
+promove metade dos itens (alternando pares/ímpares) para o nível h+1. Com poucos itens
+nada é compactado e o quantil é exato (interpolação linear, como pandas.quantile).
+
+Os sketches são atualizados de forma incremental: uma nova versão dos dados que só
+acrescenta dias (digest por dia de utils.append_only, o mesmo de utils.rolling)
+reaproveita o último estado do processo e só os meses com dias novos ganham sketches
+novos.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from utils.append_only import LatestState, PrefixDigest
+from utils.broker_frame import ensure_normalized
+from utils.broker_index import normalize_selection, selection_names
+from utils.calendar_table import month_ids
+
+DEFAULT_K = 200      # itens no nível mais alto (erro de rank ~ 1.7/k)
+TOTAL = "__total__"  # chave do sketch do total entre brokers
+HISTORY_MONTHS = 12  # horizonte do percentil por broker na tabela de picos
+INPUT_COLUMNS = ("date", "broker", "short_interest")  # digest de prefixo
+
+
+class KLLSketch:
+    """Sketch KLL de quantis (somente leitura depois de pronto: merge devolve um novo)."""
+
+    def __init__(self, k: int = DEFAULT_K):
+        self.k = k
+        self.levels: list[np.ndarray] = [np.empty(0)]
+        self.parity: list[int] = [0]
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+
+    @property
+    def nbytes(self) -> int:
+        return int(sum(level.nbytes for level in self.levels))
+
+    @property
+    def exact(self) -> bool:
+        """Nenhum item compactado: quantis exatos."""
+        return all(len(level) == 0 for level in self.levels[1:])
+
+    def _capacity(self, h: int) -> int:
+        return max(2, int(np.ceil(self.k * (2 / 3) ** (len(self.levels) - 1 - h))))
+
+    def _compress(self) -> None:
+        changed = True
+        while changed:
+            changed = False
+            for h in range(len(self.levels)):
+                level = self.levels[h]
+                if len(level) <= self._capacity(h):
+                    continue
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                    self.parity.append(0)
+                level = np.sort(level)
+                keep = level[len(level) - len(level) % 2:]  # ímpar → o último fica no nível
+                promoted = level[self.parity[h]: len(level) - len(keep): 2]
+                self.parity[h] ^= 1
+                self.levels[h] = keep
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+                changed = True
+
+    def copy(self) -> "KLLSketch":
+        new = KLLSketch(self.k)
+        new.levels, new.parity = list(self.levels), list(self.parity)  # arrays nunca são alterados
+        new.count, new.min, new.max = self.count, self.min, self.max
+        return new
+
+    def update(self, values) -> "KLLSketch":
+        """Novo sketch com os valores (NaN ignorados)."""
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        new = self.copy()
+        if len(values):
+            new.levels[0] = np.concatenate([new.levels[0], values])
+            new.count += len(values)
+            new.min, new.max = min(new.min, values.min()), max(new.max, values.max())
+            new._compress()
+        return new
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        """Novo sketch com os itens dos dois (nível a nível) recompactados."""
+        new = self.copy()
+        for h, level in enumerate(other.levels):
+            if h == len(new.levels):
+                new.levels.append(np.empty(0))
+                new.parity.append(0)
+            if len(level):
+                new.levels[h] = np.concatenate([new.levels[h], level])
+        new.count += other.count
+        new.min, new.max = min(new.min, other.min), max(new.max, other.max)
+        new._compress()
+        return new
+
+    def quantiles(self, qs) -> np.ndarray:
+        qs = np.atleast_1d(np.asarray(qs, dtype=float))
+        if self.count == 0:
+            return np.full(len(qs), np.nan)
+        values = np.concatenate(self.levels)
+        if self.exact:
+            return np.quantile(values, qs)
+        weights = np.concatenate([np.full(len(level), 2.0 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(values, kind="stable")
+        values, cum = values[order], np.cumsum(weights[order])
+        idx = np.minimum(np.searchsorted(cum, qs * cum[-1], side="left"), len(values) - 1)
+        return np.clip(values[idx], self.min, self.max)
+
+    def quantile(self, q: float) -> float:
+        return float(self.quantiles([q])[0])
+
+
+def merge_sketches(sketches, k: int = DEFAULT_K) -> KLLSketch:
+    out = KLLSketch(k)
+    for sketch in sketches:
+        out = out.merge(sketch)
+    return out
+
+
+def _daily_values(df: pd.DataFrame) -> tuple[pd.DatetimeIndex, list[str], np.ndarray, np.ndarray]:
+    """short_interest por dia × broker (somado em linhas repetidas) + máscara de presença."""
+    df = df[df["broker"].notna() & df["date"].notna()]
+    day_codes, days = pd.factorize(df["date"], sort=True)
+    broker_codes, brokers = pd.factorize(df["broker"], sort=True)
+    shape = (len(days), len(brokers))
+    flat = np.ravel_multi_index((day_codes, broker_codes), shape)
+    values = np.nan_to_num(df["short_interest"].to_numpy(dtype=float, na_value=np.nan))
+    sums = np.bincount(flat, weights=values, minlength=shape[0] * shape[1]).reshape(shape)
+    present = np.bincount(flat, minlength=shape[0] * shape[1]).reshape(shape) > 0
+    return pd.DatetimeIndex(days), [str(b) for b in brokers], sums, present
+
+
+@dataclass(frozen=True)
+class ShortInterestSketches:
+    """Sketches por (mês, broker | TOTAL) + dias de cada mês, para continuar anexando."""
+    sketches: dict             # (month_id, chave) → KLLSketch
+    month_days: dict           # mês → nº de dias processados
+    last_day: pd.Timestamp | None
+    digest: PrefixDigest       # linhas já processadas, por dia (checagem de prefixo)
+    k: int = DEFAULT_K
+
+    @property
+    def nbytes(self) -> int:
+        return int(sum(s.nbytes for s in self.sketches.values()))
+
+    def extend(self, df: pd.DataFrame) -> "ShortInterestSketches":
+        """Nova instância com os dias de df posteriores ao último dia já processado."""
+        df = ensure_normalized(df)
+        if self.last_day is not None:
+            df = df[df["date"] > self.last_day]
+        days, brokers, sums, present = _daily_values(df)
+        if not len(days):
+            return self
+
+        sketches, month_days = dict(self.sketches), dict(self.month_days)
+        months = month_ids(days)
+        # dias ordenados → cada mês é uma fatia contígua das linhas
+        bounds = np.flatnonzero(months[1:] != months[:-1]) + 1
+        totals = sums.sum(axis=1)
+        for a, b in zip(np.r_[0, bounds], np.r_[bounds, len(days)]):
+            month = int(months[a])
+            month_days[month] = month_days.get(month, 0) + int(b - a)
+            key = (month, TOTAL)
+            sketches[key] = sketches.get(key, KLLSketch(self.k)).update(totals[a:b])
+            block, seen = sums[a:b].T, present[a:b].T
+            for j in np.flatnonzero(seen.any(axis=1)):
+                key = (month, brokers[j])
+                sketches[key] = sketches.get(key, KLLSketch(self.k)).update(block[j][seen[j]])
+        return ShortInterestSketches(sketches, month_days, days[-1], self.digest.append(df), self.k)
+
+    def key_for(self, broker) -> str | None:
+        """Chave dos sketches para a seleção: total (All) ou o broker; grupos → None."""
+        names = selection_names(normalize_selection(broker))
+        if names is None:
+            return TOTAL
+        return names[0] if len(names) == 1 else None
+
+    def merged(self, months, key: str = TOTAL) -> KLLSketch:
+        return merge_sketches((self.sketches[(m, key)] for m in months if (m, key) in self.sketches), self.k)
+
+    def window_quantile(self, q: float, daily: pd.DataFrame, key: str = TOTAL,
+                        column: str = "short_interest") -> float:
+        """
+        Quantil da série diária da janela (date + column): meses que a janela cobre inteiros
+        saem dos sketches; os dias dos meses parciais (pontas) entram crus.
+        """
+        months = month_ids(daily["date"])
+        uniq, counts = np.unique(months, return_counts=True)
+        full = [int(m) for m, n in zip(uniq, counts) if self.month_days.get(int(m)) == n]
+        edges = daily[column].to_numpy(dtype=float, na_value=np.nan)[~np.isin(months, full)]
+        return self.merged(full, key).update(edges).quantile(q)
+
+    def history_quantile(self, q: float, end, key: str, months: int = HISTORY_MONTHS) -> float:
+        """Quantil dos últimos `months` meses até o mês de end (inclusive), só com merges."""
+        last = int(month_ids([pd.Timestamp(end)])[0])
+        span = range(last - months + 1, last + 1)
+        return self.merged(span, key).quantile(q)
+
+
+def build_sketches(df: pd.DataFrame, k: int = DEFAULT_K) -> ShortInterestSketches:
+    return ShortInterestSketches({}, {}, None, PrefixDigest.empty(INPUT_COLUMNS), k).extend(df)
+
+
+_LATEST: LatestState[ShortInterestSketches] = LatestState(build_sketches)
+
+
+def short_interest_sketches(df: pd.DataFrame) -> ShortInterestSketches:
+    """
+    Sketches do frame. Se a versão anterior processada no processo é um prefixo deste
+    frame (só chegaram dias novos), continua dela; senão reconstrói.
+    """
+    return _LATEST.get(ensure_normalized(df))
@@ -0,0 +1,184 @@
+"""
+Serviço HTTP/JSON local na frente do núcleo de cálculo (utils.core_api).
+
+Uso:
+    python -m utils.query_service --input data/Broker_Daily_Data.csv --port 8765 --workers 4
+
+Endpoints:
+    GET  /health                       → {"status": "ok", "version": ...}
+    GET  /stats                        → estatísticas do cache de resultados
+    GET  /query?section=Custody&start=2025-07-01&end=2025-07-31&broker=All
+         (vários brokers: repetir broker=...)
+    POST /query  (corpo JSON com os campos de core_api.Query)
+         → {"version": ..., "tables": {nome: tabela JSON orient="table"}}
+
+As consultas rodam num process pool (cada worker carrega as bases uma vez por versão);
+as respostas ficam num ResultCache próprio do serviço, então agregações pesadas não
+disputam a thread de script do Streamlit e consultas repetidas saem do cache.
+"""
+from __future__ import annotations
+import argparse
+import json
+import multiprocessing
+import os
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from utils.core_api import Query, run_query, tables_for, tables_to_json, tables_from_json
+from utils.load_data import data_version
+from utils.result_cache import ResultCache, DEFAULT_BUDGET_MB
+
+QUERY_URL = os.environ.get("BAROMETER_QUERY_URL")
+
+
+def execute(data_path: str, query: dict) -> str:
+    """Worker: executa a consulta e já devolve o JSON (serialização fora do processo do servidor)."""
+    return tables_to_json(run_query(tables_for(data_path), Query.from_dict(query)))
+
+
+class QueryService:
+    """Pool de workers + cache de respostas JSON por (versão dos dados, consulta)."""
+
+    def __init__(self, data_path: str, max_workers: int | None = None, cache_mb: float = DEFAULT_BUDGET_MB):
+        self.data_path = data_path
+        self.cache = ResultCache(int(cache_mb * 1024 * 1024))
+        ctx = multiprocessing.get_context("spawn")
+        self.pool = ProcessPoolExecutor(max_workers=max_workers or os.cpu_count() or 1, mp_context=ctx)
+
+    def query(self, query: Query) -> tuple[str, str]:
+        """Retorna (versão, JSON das tabelas)."""
+        version = data_version(self.data_path)
+        key = (version,) + tuple(query.to_dict().values())
+        payload = self.cache.get_or_compute(
+            key, lambda: self.pool.submit(execute, self.data_path, query.to_dict()).result()
+        )
+        return version, payload
+
+    def close(self) -> None:
+        self.pool.shutdown(cancel_futures=True)
+
+
+def make_handler(service: QueryService):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status: int, body: str) -> None:
+            data = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _answer(self, params: dict) -> None:
+            try:
+                query = Query.from_dict(params)
+            except (TypeError, ValueError) as e:
+                self._send(400, json.dumps({"error": str(e)}))
+                return
+            try:
+                version, payload = service.query(query)
+            except ValueError as e:
+                self._send(400, json.dumps({"error": str(e)}))
+                return
+            except Exception as e:  # erro no worker → 500 com a mensagem
+                self._send(500, json.dumps({"error": f"{type(e).__name__}: {e}"}))
+                return
+            self._send(200, f'{{"version": {json.dumps(version)}, "tables": {payload}}}')
+
+        def do_GET(self):
+            url = urllib.parse.urlparse(self.path)
+            if url.path == "/health":
+                self._send(200, json.dumps({"status": "ok", "version": data_version(service.data_path)}))
+            elif url.path == "/stats":
+                self._send(200, json.dumps(service.cache.stats()))
+            elif url.path == "/query":
+                params = {k: (v if k == "broker" and len(v) > 1 else v[-1])
+                          for k, v in urllib.parse.parse_qs(url.query).items()}
+                self._answer(params)
+            else:
+                self._send(404, json.dumps({"error": f"Unknown path: {url.path}"}))
+
+        def do_POST(self):
+            if urllib.parse.urlparse(self.path).path != "/query":
+                self._send(404, json.dumps({"error": f"Unknown path: {self.path}"}))
+                return
+            length = int(self.headers.get("Content-Length", 0))
+            try:
+                params = json.loads(self.rfile.read(length) or b"{}")
+            except json.JSONDecodeError as e:
+                self._send(400, json.dumps({"error": f"Invalid JSON: {e}"}))
+                return
+            self._answer(params)
+
+        def log_message(self, format, *args):  # silencioso (o Streamlit já loga)
+            pass
+
+    return Handler
+
+
+def serve(data_path: str, host: str = "127.0.0.1", port: int = 8765, max_workers: int | None = None,
+          cache_mb: float = DEFAULT_BUDGET_MB) -> None:
+    service = QueryService(data_path, max_workers=max_workers, cache_mb=cache_mb)
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+# === Cliente (UI e ferramentas internas) ===
+
+class QueryClient:
+    """Cliente do serviço: mesma Query do núcleo, tabelas de volta como DataFrames."""
+
+    def __init__(self, base_url: str, timeout: float = 30.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def query(self, query: Query) -> dict[str, pd.DataFrame]:
+        request = urllib.request.Request(
+            f"{self.base_url}/query",
+            data=json.dumps(query.to_dict()).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return tables_from_json(json.loads(response.read())["tables"])
+
+
+def get_query_client() -> QueryClient | None:
+    """Cliente do serviço configurado em BAROMETER_QUERY_URL (None = cálculo local)."""
+    return QueryClient(QUERY_URL) if QUERY_URL else None
+
+
+def query_or_compute(client: QueryClient | None, query: Query, table: str, compute):
+    """Tabela vinda do serviço quando configurado; sem serviço (ou fora do ar) calcula localmente."""
+    if client is not None:
+        try:
+            return client.query(query).get(table)
+        except (OSError, urllib.error.URLError):
+            pass
+    return compute()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Local HTTP/JSON query service for the broker sections.")
+    parser.add_argument("--input", default=os.environ.get("BAROMETER_DATA", "data/Broker_Daily_Data.csv"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--cache-mb", type=float, default=DEFAULT_BUDGET_MB)
+    args = parser.parse_args(argv)
+
+    print(f"Serving {args.input} on http://{args.host}:{args.port}")
+    serve(args.input, host=args.host, port=args.port, max_workers=args.workers, cache_mb=args.cache_mb)
+
+
+if __name__ == "__main__":
+    main()
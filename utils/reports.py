@@ -0,0 +1,144 @@
+"""
+Relatórios headless (sem Streamlit) de todas as seções, em HTML standalone ou Parquet.
+
+Uso (relatórios semanais de todos os brokers):
+    python -m utils.reports --presets "Last closed week" --brokers each --output reports/
+
+Cada job (ticker × período × broker) vira uma consulta por seção no núcleo de cálculo
+(utils.core_api), o mesmo usado pelo serviço HTTP. Os jobs rodam num process pool;
+cada worker carrega as bases uma vez por versão dos dados (com BAROMETER_SNAPSHOT_DIR,
+por memory-map).
+"""
+from __future__ import annotations
+import argparse
+import html
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import pandas as pd
+
+from utils.core_api import SECTIONS, Query, run_query, tables_for
+from utils.load_data import load_broker_data
+from utils.periods import resolve_preset
+
+FORMATS = ("html", "parquet")
+
+
+@dataclass(frozen=True)
+class ReportJob:
+    """Um relatório: preset de período, broker e ticker ("All" = sem filtro)."""
+    preset: str = "Last closed week"
+    broker: str = "All"
+    ticker: str = "All"
+    sections: tuple[str, ...] = SECTIONS
+
+    @property
+    def name(self) -> str:
+        parts = [self.ticker, self.broker, self.preset]
+        return "_".join(re.sub(r"[^0-9A-Za-z]+", "-", p).strip("-").lower() for p in parts)
+
+
+def build_report(tables, job: ReportJob) -> tuple[str, dict[str, pd.DataFrame]]:
+    """Resolve o período do job e calcula as tabelas de cada seção. Retorna (label do período, tabelas)."""
+    catalog = tables[-1]
+    unknown = set(job.sections) - set(SECTIONS)
+    if unknown:
+        raise ValueError(f"Unknown sections: {sorted(unknown)}")
+
+    start_date, end_date, prev_start, prev_end = resolve_preset(job.preset, catalog=catalog)
+    out: dict[str, pd.DataFrame] = {}
+    for section in job.sections:
+        query = Query.make(section, start_date, end_date, prev_start, prev_end, broker=job.broker, ticker=job.ticker)
+        out.update(run_query(tables, query))
+
+    period_label = f"{start_date:%Y/%m/%d} – {end_date:%Y/%m/%d}"
+    return period_label, out
+
+
+# === Saídas ===
+
+_CSS = """
+body { font-family: Arial, sans-serif; margin: 24px; color: #222; }
+h1 { font-size: 20px; } h2 { font-size: 16px; margin-top: 28px; }
+table { border-collapse: collapse; font-size: 13px; }
+th, td { padding: 4px 10px; border-bottom: 1px solid #ddd; text-align: right; }
+th { background: #f3f3f3; }
+"""
+
+
+def write_html(path: str, title: str, tables: dict[str, pd.DataFrame]) -> str:
+    """HTML standalone (CSS inline, sem JavaScript) com uma tabela por bloco."""
+    body = [f"<h1>{html.escape(title)}</h1>"]
+    for name, table in tables.items():
+        body.append(f"<h2>{html.escape(name.replace('_', ' ').title())}</h2>")
+        body.append(table.to_html(index=False, border=0, na_rep="–", float_format=lambda x: f"{x:,.4f}"))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"<!DOCTYPE html>\n<html><head><meta charset='utf-8'><title>{html.escape(title)}</title>"
+                f"<style>{_CSS}</style></head><body>\n" + "\n".join(body) + "\n</body></html>\n")
+    return path
+
+
+def write_parquet(path: str, tables: dict[str, pd.DataFrame]) -> str:
+    """Um arquivo Parquet por tabela em <path>/."""
+    os.makedirs(path, exist_ok=True)
+    for name, table in tables.items():
+        table.reset_index(drop=True).to_parquet(os.path.join(path, f"{name}.parquet"), index=False)
+    return path
+
+
+# === Execução (process pool) ===
+
+def run_job(job: ReportJob, data_path: str, out_dir: str, fmt: str = "html") -> str:
+    """Gera um relatório e devolve o caminho do arquivo (html) ou diretório (parquet)."""
+    period_label, tables = build_report(tables_for(data_path), job)
+    if fmt == "html":
+        title = f"{job.ticker} · {job.broker} · {job.preset} ({period_label})"
+        return write_html(os.path.join(out_dir, f"{job.name}.html"), title, tables)
+    return write_parquet(os.path.join(out_dir, job.name), tables)
+
+
+def run_reports(jobs: list[ReportJob], data_path: str = "data/Broker_Daily_Data.csv", out_dir: str = "reports",
+                fmt: str = "html", max_workers: int | None = None) -> list[str]:
+    """Roda os jobs num process pool (spawn). Retorna os caminhos na ordem dos jobs."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format: {fmt} (expected one of {FORMATS})")
+    os.makedirs(out_dir, exist_ok=True)
+
+    max_workers = min(max_workers or os.cpu_count() or 1, max(len(jobs), 1))
+    if max_workers == 1:
+        return [run_job(job, data_path, out_dir, fmt) for job in jobs]
+
+    # jobs em blocos: cada worker amortiza a carga das bases em vários relatórios
+    chunksize = max(1, len(jobs) // (max_workers * 4))
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=ctx) as pool:
+        n = len(jobs)
+        return list(pool.map(run_job, jobs, [data_path] * n, [out_dir] * n, [fmt] * n, chunksize=chunksize))
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Headless section reports for (ticker, period, broker) jobs.")
+    parser.add_argument("--input", default="data/Broker_Daily_Data.csv")
+    parser.add_argument("--output", default="reports")
+    parser.add_argument("--format", choices=FORMATS, default="html")
+    parser.add_argument("--presets", nargs="+", default=["Last closed week"])
+    parser.add_argument("--brokers", nargs="+", default=["All"], help="broker names, 'All' or 'each'")
+    parser.add_argument("--tickers", nargs="+", default=["All"])
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    brokers = args.brokers
+    if "each" in brokers:
+        all_brokers = sorted(load_broker_data(args.input)["broker"].dropna().unique())
+        brokers = [b for b in brokers if b != "each"] + all_brokers
+
+    jobs = [ReportJob(preset=p, broker=b, ticker=t) for t in args.tickers for p in args.presets for b in brokers]
+    paths = run_reports(jobs, data_path=args.input, out_dir=args.output, fmt=args.format, max_workers=args.workers)
+    print(f"{len(paths)} reports → {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+from __future__ import annotations
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+import numpy as np
+import pandas as pd
+
+from utils.disk_cache import DiskCache, get_disk_cache
+
+# Orçamento padrão do cache (MB), configurável por variável de ambiente
+DEFAULT_BUDGET_MB = float(os.environ.get("BAROMETER_CACHE_MB", "256"))
+
+_MISSING = object()
+
+
+def _nbytes(value: Any) -> int:
+    """Tamanho aproximado de um resultado em bytes (DataFrames via memory_usage(deep=True))."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(_nbytes(v) for v in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_nbytes(v) for v in value.values())
+    if hasattr(value, "nbytes"):  # estruturas próprias que expõem o tamanho (ex.: BrokerPanel)
+        return int(value.nbytes)
+    return sys.getsizeof(value)
+
+
+class ResultCache:
+    """
+    Cache LRU de resultados compartilhado entre sessões do mesmo processo.
+    Os valores são tratados como somente leitura: quem consome não deve alterá-los.
+    disk: segunda camada persistente (utils.disk_cache), consultada antes de calcular.
+    """
+
+    def __init__(self, max_bytes: int, disk: DiskCache | None = None):
+        self.max_bytes = int(max_bytes)
+        self.disk = disk
+        self._entries: OrderedDict[Hashable, tuple[Any, int]] = OrderedDict()
+        self._inflight: dict[Hashable, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any) -> None:
+        size = _nbytes(value)
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                return  # maior que o orçamento inteiro → não guarda
+            self._entries[key] = (value, size)
+            self._bytes += size
+            self._evict()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Retorna o valor em cache ou calcula uma única vez, mesmo com sessões concorrentes."""
+        while True:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._entries[key][0]
+                event = self._inflight.get(key)
+                if event is None:
+                    self.misses += 1
+                    event = self._inflight[key] = threading.Event()
+                    owner = True
+                else:
+                    owner = False
+
+            if not owner:
+                # outra sessão já está calculando a mesma chave → espera e tenta de novo
+                event.wait()
+                with self._lock:
+                    if key in self._entries:
+                        self._entries.move_to_end(key)
+                        self.hits += 1
+                        return self._entries[key][0]
+                # não ficou no cache (erro ou maior que o orçamento) → calcula por conta própria
+                return compute()
+
+            try:
+                value = self.disk.get(key, _MISSING) if self.disk is not None else _MISSING
+                if value is _MISSING:
+                    value = compute()
+                    if self.disk is not None:
+                        self.disk.put_async(key, value)  # grava em segundo plano
+                self.put(key, value)
+                return value
+            finally:
+                with self._lock:
+                    self._inflight.pop(key, None)
+                event.set()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _evict(self) -> None:
+        # remove os menos usados recentemente até caber no orçamento
+        while self._bytes > self.max_bytes and self._entries:
+            _, (_, size) = self._entries.popitem(last=False)
+            self._bytes -= size
+
+
+_CACHE = ResultCache(int(DEFAULT_BUDGET_MB * 1024 * 1024), disk=get_disk_cache())
+
+
+def get_result_cache() -> ResultCache:
+    """Cache único do processo (compartilhado por todas as sessões do Streamlit)."""
+    return _CACHE
+
+
+def content_fingerprint(*parts: Any) -> str:
+    """
+    Impressão digital curta das entradas de uma seção (versão dos dados + chave do filtro +
+    parâmetros). Mesma impressão digital → mesmos recortes → mesmas saídas.
+    """
+    return hashlib.blake2b(repr(parts).encode(), digest_size=8).hexdigest()
+
+
+def cached(key: Hashable | None, compute: Callable[[], Any]) -> Any:
+    """Atalho: sem chave calcula direto; com chave passa pelo cache do processo."""
+    if key is None:
+        return compute()
+    return _CACHE.get_or_compute(key, compute)
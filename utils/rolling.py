@@ -0,0 +1,224 @@
+"""
+Analytics de janela móvel por broker (5/20/60 pregões), mantidos de forma incremental.
+
+O estado guarda, para cada broker, um ring buffer dos componentes diários (net, preço ×
+volume, volume, eficiência) e as somas correntes de cada janela. Anexar um dia soma o
+dia novo e subtrai o que saiu de cada janela: O(1) por broker-dia, vetorizado entre os
+brokers. Uma nova versão dos dados que só acrescenta dias (conferido pelo digest por
+dia de utils.append_only) reaproveita o último estado do processo e processa apenas os
+dias novos.
+
+Métricas por janela:
+    net_flow  – Σ(buy_volume − sell_volume)
+    vwap      – VWAP ponderado pelo volume negociado: Σ(buy_vwap·buy + sell_vwap·sell) / Σ(buy + sell)
+    efficiency – média do efficiency_score nos dias com valor
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from utils.append_only import LatestState, PrefixDigest
+from utils.broker_frame import ensure_normalized
+from utils.broker_index import normalize_selection, selection_names
+
+WINDOWS = (5, 20, 60)
+METRICS = ("net_flow", "vwap", "efficiency")
+
+# componentes diários aditivos: net, preço×volume, volume, soma e contagem da eficiência
+_NET, _PV, _VOL, _EFF, _EFF_N = range(5)
+_N_COMPONENTS = 5
+# colunas de entrada dos componentes (digest de prefixo)
+INPUT_COLUMNS = ("date", "broker", "buy_volume", "sell_volume", "buy_vwap", "sell_vwap", "efficiency_score")
+
+
+def _daily_components(df: pd.DataFrame) -> tuple[pd.DatetimeIndex, list[str], np.ndarray]:
+    """Componentes por dia × broker: array [day, broker, componente] (broker sem linha no dia → 0)."""
+    df = ensure_normalized(df)
+    df = df[df["broker"].notna() & df["date"].notna()]
+
+    def num(col):
+        return df[col].to_numpy(dtype=float, na_value=np.nan) if col in df.columns else np.full(len(df), np.nan)
+
+    buy, sell = np.nan_to_num(num("buy_volume")), np.nan_to_num(num("sell_volume"))
+    buy_px, sell_px = num("buy_vwap"), num("sell_vwap")
+    eff = num("efficiency_score")
+
+    # lado sem VWAP não entra no preço médio (nem no volume do denominador)
+    buy_ok, sell_ok = ~np.isnan(buy_px), ~np.isnan(sell_px)
+    comps = np.column_stack([
+        buy - sell,
+        np.where(buy_ok, buy_px * buy, 0.0) + np.where(sell_ok, sell_px * sell, 0.0),
+        np.where(buy_ok, buy, 0.0) + np.where(sell_ok, sell, 0.0),
+        np.nan_to_num(eff),
+        (~np.isnan(eff)).astype(float),
+    ])
+
+    day_codes, days = pd.factorize(df["date"], sort=True)
+    broker_codes, brokers = pd.factorize(df["broker"], sort=True)
+    out = np.zeros((len(days), len(brokers), _N_COMPONENTS))
+    np.add.at(out, (day_codes, broker_codes), comps)  # (broker, date) repetidos → somados
+    return pd.DatetimeIndex(days), [str(b) for b in brokers], out
+
+
+class RollingState:
+    """Ring buffer + somas correntes por janela para todos os brokers."""
+
+    def __init__(self, brokers: list[str], windows: tuple[int, ...] = WINDOWS):
+        self.brokers = list(brokers)
+        self.windows = tuple(windows)
+        self.depth = max(self.windows)
+        self.ring = np.zeros((self.depth, len(self.brokers), _N_COMPONENTS))
+        self.sums = np.zeros((len(self.windows), len(self.brokers), _N_COMPONENTS))
+        self.n_days = 0
+
+    def copy(self) -> "RollingState":
+        new = RollingState.__new__(RollingState)
+        new.brokers, new.windows, new.depth, new.n_days = list(self.brokers), self.windows, self.depth, self.n_days
+        new.ring, new.sums = self.ring.copy(), self.sums.copy()
+        return new
+
+    def add_brokers(self, brokers: list[str]) -> None:
+        """Brokers novos entram com histórico zerado."""
+        new = [b for b in brokers if b not in set(self.brokers)]
+        if not new:
+            return
+        self.brokers += new
+        self.ring = np.concatenate([self.ring, np.zeros((self.depth, len(new), _N_COMPONENTS))], axis=1)
+        self.sums = np.concatenate([self.sums, np.zeros((len(self.windows), len(new), _N_COMPONENTS))], axis=1)
+
+    def append(self, comps: np.ndarray) -> None:
+        """Anexa um dia (comps: [broker, componente] na ordem de self.brokers)."""
+        for wi, w in enumerate(self.windows):
+            if self.n_days >= w:
+                self.sums[wi] -= self.ring[(self.n_days - w) % self.depth]  # dia que sai da janela
+            self.sums[wi] += comps
+        self.ring[self.n_days % self.depth] = comps
+        self.n_days += 1
+
+    def metrics(self) -> np.ndarray:
+        """Métricas atuais: [janela, broker, métrica]; NaN enquanto a janela não tem dias suficientes."""
+        s = self.sums
+        with np.errstate(invalid="ignore", divide="ignore"):
+            vwap = np.where(s[..., _VOL] > 0, s[..., _PV] / s[..., _VOL], np.nan)
+            eff = np.where(s[..., _EFF_N] > 0, s[..., _EFF] / s[..., _EFF_N], np.nan)
+        out = np.stack([s[..., _NET], vwap, eff], axis=-1)
+        filled = np.asarray(self.windows) <= self.n_days
+        out[~filled] = np.nan
+        return out
+
+
+@dataclass(frozen=True)
+class RollingAnalytics:
+    """Histórico das métricas (um registro por dia anexado) + estado para continuar anexando."""
+    days: pd.DatetimeIndex
+    brokers: tuple[str, ...]
+    history: np.ndarray        # [day, broker, janela, métrica]
+    state: RollingState
+    digest: PrefixDigest       # linhas já processadas, por dia (checagem de prefixo)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.history.nbytes + self.state.ring.nbytes + self.state.sums.nbytes)
+
+    @property
+    def last_day(self) -> pd.Timestamp | None:
+        return self.days[-1] if len(self.days) else None
+
+    def extend(self, df: pd.DataFrame) -> "RollingAnalytics":
+        """Nova instância com os dias de df posteriores ao último dia já processado."""
+        df = ensure_normalized(df)
+        if self.last_day is not None:
+            df = df[df["date"] > self.last_day]
+        days, brokers, comps = _daily_components(df)
+        if not len(days):
+            return self
+
+        state = self.state.copy()
+        state.add_brokers(brokers)
+        cols = [state.brokers.index(b) for b in brokers]
+        history = np.full((len(days), len(state.brokers), len(state.windows), len(METRICS)), np.nan)
+        for i in range(len(days)):
+            row = np.zeros((len(state.brokers), _N_COMPONENTS))
+            row[cols] = comps[i]
+            state.append(row)
+            history[i] = state.metrics().transpose(1, 0, 2)
+
+        old = self.history
+        if old.shape[1] < len(state.brokers):
+            # brokers novos: no histórico anterior valem como sem negócios (net flow 0 nas
+            # janelas completas, VWAP/eficiência NaN), igual a recalcular do zero
+            pad = np.full((old.shape[0], len(state.brokers) - old.shape[1]) + old.shape[2:], np.nan)
+            filled = np.arange(1, old.shape[0] + 1)[:, None] >= np.asarray(state.windows)[None, :]
+            pad[..., METRICS.index("net_flow")] = np.where(filled[:, None, :], 0.0, np.nan)
+            old = np.concatenate([old, pad], axis=1)
+        return RollingAnalytics(
+            days=self.days.append(days),
+            brokers=tuple(state.brokers),
+            history=np.concatenate([old, history]),
+            state=state,
+            digest=self.digest.append(df),
+        )
+
+    def frame(self, as_of=None, broker="All") -> pd.DataFrame:
+        """Tabela por broker no último dia ≤ as_of: net_flow_5d, vwap_5d, efficiency_5d, ..."""
+        if not len(self.days):
+            return pd.DataFrame(columns=["broker"])
+        i = len(self.days) - 1 if as_of is None else self.days.searchsorted(pd.Timestamp(as_of), side="right") - 1
+        if i < 0:
+            return pd.DataFrame(columns=["broker"])
+        out = pd.DataFrame({"broker": list(self.brokers)})
+        for wi, w in enumerate(self.state.windows):
+            for mi, m in enumerate(METRICS):
+                out[f"{m}_{w}d"] = self.history[i, :, wi, mi]
+        names = selection_names(normalize_selection(broker))
+        if names is not None:
+            out = out[out["broker"].isin(names)]
+        return out.reset_index(drop=True)
+
+    def series(self, metric: str, start, end, broker="All") -> pd.DataFrame:
+        """
+        Série diária da métrica em [start, end], uma coluna por janela. Vários brokers
+        (ou All) → soma do net flow do grupo.
+        """
+        lo = self.days.searchsorted(pd.Timestamp(start), side="left")
+        hi = self.days.searchsorted(pd.Timestamp(end), side="right")
+        mi = METRICS.index(metric)
+        names = selection_names(normalize_selection(broker))
+        cols = list(range(len(self.brokers))) if names is None else [self.brokers.index(n) for n in names
+                                                                      if n in self.brokers]
+        if not cols:
+            data = np.empty((0, len(self.state.windows)))
+            lo = hi
+        elif len(cols) == 1:
+            data = self.history[lo:hi, cols[0], :, mi]
+        else:
+            if metric != "net_flow":
+                raise ValueError("Only net_flow can be aggregated across brokers")
+            data = np.nansum(self.history[lo:hi, :, :, mi][:, cols], axis=1)
+        return pd.DataFrame(data, index=pd.Index(self.days[lo:hi], name="date"),
+                            columns=[f"{w}d" for w in self.state.windows])
+
+
+def build_rolling(df: pd.DataFrame, windows: tuple[int, ...] = WINDOWS) -> RollingAnalytics:
+    """Processa todo o histórico (dia a dia, O(1) por broker-dia)."""
+    empty = RollingAnalytics(
+        days=pd.DatetimeIndex([]),
+        brokers=(),
+        history=np.empty((0, 0, len(windows), len(METRICS))),
+        state=RollingState([], windows),
+        digest=PrefixDigest.empty(INPUT_COLUMNS),
+    )
+    return empty.extend(df)
+
+
+_LATEST: LatestState[RollingAnalytics] = LatestState(build_rolling)
+
+
+def rolling_analytics(df: pd.DataFrame) -> RollingAnalytics:
+    """
+    Analytics do frame. Se a versão anterior processada no processo é um prefixo deste
+    frame (só chegaram dias novos), continua do estado dela; senão recalcula tudo.
+    """
+    return _LATEST.get(ensure_normalized(df))
@@ -0,0 +1,106 @@
+"""
+Registro único dos resultados em cache de cada seção: chave + cálculo.
+
+Componentes (render da seção aberta) e o prefetch (utils.prefetch, visões vizinhas)
+pedem o resultado por aqui, então os dois usam sempre a mesma chave e o mesmo cálculo —
+o que o prefetch aquece é exatamente o que a próxima navegação lê.
+
+Chave: (nome da seção, *params, *view_key). params são os argumentos do render que
+mudam o resultado (top_n, limiar de pico, janela dos date pickers); SectionInputs traz as estruturas
+compartilhadas (df_fill, painel, cliente do serviço de consultas).
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable
+
+import pandas as pd
+
+from components.metrics import compute_metrics
+from utils.core_api import Query
+from utils.correlation import broker_correlation
+from utils.panel import BrokerPanel, window_for
+from utils.quantile_sketch import short_interest_sketches
+from utils.query_service import query_or_compute
+from utils.result_cache import cached
+from utils.sections import (THRESHOLD_MEAN_2SD, short_interest_peaks, general_profile, top_rankings,
+                            weekly_net_rankings, custody_summary, buyers_sellers_summary)
+from utils.trends import build_trend_rollup
+
+TOP_N = 5  # top_n das seções Top Buyers & Sellers e Weekly Trading
+
+
+@dataclass(frozen=True)
+class SectionInputs:
+    """Bases e estruturas compartilhadas de que os cálculos precisam (as mesmas do app)."""
+    df: pd.DataFrame | None = None         # df_fill (rollup de tendência, sketches de short interest)
+    panel: BrokerPanel | None = None
+    client: Any = None                     # QueryClient (BAROMETER_QUERY_URL) ou None
+
+
+@dataclass(frozen=True)
+class SectionTask:
+    """name: prefixo da chave; compute(cur_df, prev_df, view_key, inputs, *params)."""
+    name: str
+    compute: Callable[..., Any]
+
+
+def _company_view(cur_df, prev_df, view_key, inputs: SectionInputs):
+    rollup = cached(("trend_rollup", view_key.data_version), lambda: build_trend_rollup(inputs.df))
+    grouped = rollup.series(view_key.start_date, view_key.end_date, broker=view_key.broker)
+    return compute_metrics(cur_df, prev_df, grouped_df=grouped)
+
+
+def _short_interest(cur_df, _, view_key, inputs: SectionInputs, method: str = THRESHOLD_MEAN_2SD):
+    sketches = None
+    if view_key is not None and inputs.df is not None:
+        # sketches de quantis mensais (por broker e total), incrementais entre versões dos dados
+        sketches = cached(("si_sketches", view_key.data_version), lambda: short_interest_sketches(inputs.df))
+    return short_interest_peaks(cur_df, window=window_for(inputs.panel, view_key), sketches=sketches,
+                                broker=view_key.broker if view_key else "All", method=method)
+
+
+def _window_summary(section: str, table: str, summarize):
+    """Custody / Buyers & Sellers: recorte dos date pickers, pelo serviço de consultas quando há."""
+    def compute(cur_df, _, view_key, inputs: SectionInputs, start, end):
+        query = Query.make(section, view_key.start_date, view_key.end_date, broker=view_key.broker,
+                           window_start=start, window_end=end) if view_key else None
+        return query_or_compute(inputs.client if query else None, query, table,
+                                lambda: summarize(cur_df, start, end,
+                                                  window=window_for(inputs.panel, view_key, start, end)))
+    return compute
+
+
+SECTION_TASKS: dict[str, SectionTask] = {
+    "Company View": SectionTask("metrics", _company_view),
+    "Short Interest": SectionTask("short_interest", _short_interest),
+    "General Profile": SectionTask("general_profile", lambda cur_df, prev_df, *_: general_profile(cur_df, prev_df)),
+    "Top Buyers & Sellers": SectionTask(
+        "top_buyers_sellers",
+        lambda cur_df, _, view_key, inputs, top_n: top_rankings(cur_df, top_n,
+                                                               window=window_for(inputs.panel, view_key))),
+    "Weekly Trading": SectionTask(
+        "weekly_trading",
+        lambda cur_df, _, view_key, inputs, top_n: weekly_net_rankings(cur_df, top_n,
+                                                                      window=window_for(inputs.panel, view_key))),
+    "Broker Correlation": SectionTask(
+        "broker_correlation",
+        lambda cur_df, _, view_key, inputs: broker_correlation(cur_df, window=window_for(inputs.panel, view_key))),
+    "Custody": SectionTask("custody", _window_summary("Custody", "custody", custody_summary)),
+    "Buyers & Sellers": SectionTask("buyers_sellers",
+                                    _window_summary("Buyers & Sellers", "buyers_sellers", buyers_sellers_summary)),
+}
+
+
+def section_key(section: str, view_key, *params) -> Hashable | None:
+    """Chave do resultado da seção na visão (None: sem chave da visão → não entra no cache)."""
+    if view_key is None or section not in SECTION_TASKS:
+        return None
+    return (SECTION_TASKS[section].name,) + params + tuple(view_key)
+
+
+def section_result(section: str, cur_df: pd.DataFrame, prev_df: pd.DataFrame | None, view_key,
+                   inputs: SectionInputs, *params):
+    """Resultado da seção, calculado uma vez por chave (compartilhado entre sessões e o prefetch)."""
+    task = SECTION_TASKS[section]
+    return cached(section_key(section, view_key, *params),
+                  lambda: task.compute(cur_df, prev_df, view_key, inputs, *params))
@@ -0,0 +1,181 @@
+"""
+Lógica de cada seção do dashboard, sem Streamlit.
+Os componentes (components/*) só renderizam; relatórios headless reaproveitam estas funções.
+Com window (recorte do painel denso, utils.panel), as agregações por broker/dia saem de
+reduções por eixo em vez de groupbys sobre o frame longo.
+"""
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pandas as pd
+
+from utils.broker_frame import ensure_normalized
+from utils.calendar_table import week_ids, week_starts
+from utils.profile_stats import profile_period_stats
+from utils.quantile_sketch import HISTORY_MONTHS
+from utils.top_n import TopRankings, rank_top_n, rank_weekly
+
+if TYPE_CHECKING:
+    from utils.panel import PanelWindow
+    from utils.quantile_sketch import ShortInterestSketches
+
+
+# limiares de pico do short interest: desvio sobre a média do período ou percentil 95
+# (sketches: do período, ou dos últimos 12 meses até o fim do período)
+THRESHOLD_MEAN_2SD = "μ + 2σ"
+THRESHOLD_Q95_PERIOD = "q95 of period"
+THRESHOLD_Q95_12M = "q95 of last 12 months"
+THRESHOLD_METHODS = (THRESHOLD_MEAN_2SD, THRESHOLD_Q95_PERIOD, THRESHOLD_Q95_12M)
+
+
+def _q95_threshold(sir_by_date: pd.DataFrame, sketches: ShortInterestSketches | None, key: str | None,
+                   months: int | None = None) -> tuple[float, str]:
+    """
+    q95 da série do período (merge dos sketches mensais + pontas cruas) ou, com months,
+    dos últimos `months` meses de histórico até o fim do período. Sem sketch para a
+    seleção (grupos de brokers) → quantil exato da série do período.
+    """
+    if sketches is None or key is None or sir_by_date.empty:
+        return float(sir_by_date["short_interest"].quantile(0.95)), "q > 0.95"
+    if months:
+        end = sir_by_date["date"].max()
+        return float(sketches.history_quantile(0.95, end, key, months)), f"q > 0.95 ({months}m)"
+    return float(sketches.window_quantile(0.95, sir_by_date, key)), "q > 0.95"
+
+
+def short_interest_peaks(cur_df: pd.DataFrame, window: PanelWindow | None = None,
+                         sketches: ShortInterestSketches | None = None, broker="All",
+                         method: str = THRESHOLD_MEAN_2SD):
+    """
+    Série diária de short interest, limiar de pico e linhas dos dias de pico.
+    method (THRESHOLD_METHODS): μ + 2σ do período (série constante → q95), q95 do período
+    ou q95 dos últimos 12 meses — os percentis saem do merge dos sketches mensais
+    (utils.quantile_sketch). Com sketches, as linhas dos picos ganham o p95 de 12 meses
+    de cada broker.
+    """
+    if method not in THRESHOLD_METHODS:
+        raise ValueError(f"Unknown threshold method: {method}")
+    tmp = ensure_normalized(cur_df)  # date/short_interest já tipados, sem cópia
+
+    if window is not None:
+        sir_by_date = window.daily_sums("short_interest")
+    else:
+        sir_by_date = (
+            tmp.groupby("date", as_index=False)["short_interest"]
+               .sum()
+               .sort_values("date")
+        )
+
+    key = sketches.key_for(broker) if sketches is not None else None
+    mu = sir_by_date["short_interest"].mean()
+    sd = sir_by_date["short_interest"].std(ddof=0)
+    if method == THRESHOLD_MEAN_2SD and pd.notna(sd) and sd > 0:
+        threshold = float(mu + 2*sd); method_label = "μ + 2σ"
+    elif method == THRESHOLD_Q95_12M:
+        threshold, method_label = _q95_threshold(sir_by_date, sketches, key, HISTORY_MONTHS)
+    else:
+        threshold, method_label = _q95_threshold(sir_by_date, sketches, key)
+    peaks_by_date = sir_by_date[sir_by_date["short_interest"] > threshold]
+
+    df_picos = tmp[tmp["date"].isin(peaks_by_date["date"])]
+    if sketches is not None and not df_picos.empty:
+        # limiar de longo prazo de cada broker: merge dos sketches dos últimos 12 meses
+        end = sir_by_date["date"].max()
+        p95 = {b: sketches.history_quantile(0.95, end, b) for b in df_picos["broker"].dropna().unique()}
+        df_picos = df_picos.assign(si_p95_12m=df_picos["broker"].map(p95).astype(float))
+    return sir_by_date, threshold, method_label, peaks_by_date, df_picos
+
+
+def general_profile(cur_df: pd.DataFrame, prev_df: pd.DataFrame | None = None):
+    """Agregados do período atual e anterior + volume de compra por profile (pizza)."""
+    cur_agg, prev_agg = profile_period_stats([cur_df, prev_df])
+    return cur_agg, prev_agg, (cur_agg["profile_volumes"] if cur_agg else None)
+
+
+def top_rankings(cur_df: pd.DataFrame, top_n: int, window: PanelWindow | None = None) -> TopRankings:
+    """Top N buyers/sellers nos modos Gross e Net de uma vez (totais por broker calculados uma única vez)."""
+    if window is not None:
+        totals = window.sums(["buy_volume", "sell_volume"])
+    else:
+        totals = (ensure_normalized(cur_df).groupby("broker", as_index=False)
+                  .agg(buy_volume=("buy_volume", "sum"),
+                       sell_volume=("sell_volume", "sum")))
+    return rank_top_n(totals, top_n)
+
+
+def top_buyers_sellers(cur_df: pd.DataFrame, mode: str, top_n: int,
+                       window: PanelWindow | None = None) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Top N buyers/sellers no modo Gross ou Net."""
+    return top_rankings(cur_df, top_n, window).for_mode(mode)
+
+
+def _weekly_totals(cur_df: pd.DataFrame):
+    """buy/sell por broker × semana (segunda-feira) via códigos inteiros, sem groupby por semana."""
+    df = ensure_normalized(cur_df)
+    df = df[df["broker"].notna() & df["date"].notna()]
+    week_codes, weeks = pd.factorize(week_ids(df["date"]), sort=True)
+    broker_codes, brokers = pd.factorize(df["broker"], sort=True)
+    out = np.zeros((2, len(brokers), len(weeks)))
+    for i, col in enumerate(("buy_volume", "sell_volume")):
+        values = np.nan_to_num(df[col].to_numpy(dtype=float, na_value=np.nan))
+        np.add.at(out[i], (broker_codes, week_codes), values)
+    return np.asarray(brokers, dtype=object), week_starts(weeks), out[0], out[1]
+
+
+def weekly_net_rankings(cur_df: pd.DataFrame, top_n: int, window: PanelWindow | None = None) -> pd.DataFrame:
+    """Top N net buyers/sellers de cada semana do período (tabela longa, ver rank_weekly)."""
+    if window is not None:
+        buy = window.weekly_sums("buy_volume")
+        sell = window.weekly_sums("sell_volume")
+        return rank_weekly(buy.to_numpy(), sell.to_numpy(), buy.index, buy.columns, top_n)
+    brokers, weeks, buy, sell = _weekly_totals(cur_df)
+    return rank_weekly(buy, sell, brokers, weeks, top_n)
+
+
+def _first_last_balances(df, start_date, end_date, window=None):
+    """start_balance do primeiro dia e end_balance do último dia por broker (None se vazio)."""
+    if window is not None:
+        summary = window.first_last("start_balance", "end_balance")
+        return None if summary.empty else summary
+
+    period = df[
+        (df["date"].dt.date >= start_date) &
+        (df["date"].dt.date <= end_date)
+    ]
+    if period.empty:
+        return None
+
+    return (
+        period.groupby("broker").agg(
+            start_balance=("start_balance", "first"),
+            end_balance=("end_balance", "last")
+        ).reset_index()
+    )
+
+
+def custody_summary(df_custody, start_date, end_date, window: PanelWindow | None = None):
+    """Consolida a custódia por broker no período (None se não houver dados)."""
+    summary = _first_last_balances(df_custody, start_date, end_date, window)
+    if summary is None:
+        return None
+
+    summary["total_change"] = summary["end_balance"] - summary["start_balance"]
+    summary["variation_pct"] = (
+        summary["total_change"] / summary["start_balance"]
+    ) * 100
+    return summary
+
+
+def buyers_sellers_summary(df_bs, start_date, end_date, window: PanelWindow | None = None):
+    """Consolida saldos por broker no período e classifica Buyer/Seller (None se vazio)."""
+    summary = _first_last_balances(df_bs, start_date, end_date, window)
+    if summary is None:
+        return None
+
+    summary["total_change"] = summary["end_balance"] - summary["start_balance"]
+    summary["variation_pct"] = (summary["total_change"] / summary["start_balance"]) * 100
+    summary["Category"] = summary["total_change"].apply(
+        lambda x: "Buyer" if x > 0 else ("Seller" if x < 0 else "Neutral")
+    )
+    return summary
@@ -0,0 +1,109 @@
+"""
+Snapshot Arrow IPC das tabelas carregadas, compartilhado por várias réplicas do Streamlit.
+
+A primeira réplica que carrega uma versão dos dados publica as tabelas em
+<snapshot_dir>/<versão>/<tabela>.arrow (IPC sem compressão). As demais fazem
+memory-map somente leitura e criam os DataFrames sem cópia, então N réplicas no
+mesmo host dividem as mesmas páginas do page cache e nenhuma precisa refazer o parse.
+
+A versão do diretório combina a versão dos dados com a do código (disk_cache.code_version:
+fontes + pandas/pyarrow/numpy), então um deploy que muda o pré-processamento publica um
+snapshot novo em vez de servir tabelas antigas. Depois de publicar, só as
+BAROMETER_SNAPSHOT_KEEP versões usadas mais recentemente ficam (abrir uma versão renova
+o mtime do diretório): durante um deploy gradual, réplicas com o código antigo e o novo
+publicam versões diferentes e uma não apaga a que a outra acabou de publicar. Réplicas
+que ainda mapeiam uma versão removida mantêm os arquivos abertos até fechar, no POSIX.
+"""
+from __future__ import annotations
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from utils.broker_frame import normalize_broker_frame
+from utils.disk_cache import code_version
+
+SNAPSHOT_DIR = os.environ.get("BAROMETER_SNAPSHOT_DIR")
+# tabelas no formato normalized broker frame (recebem a flag de novo ao abrir)
+BROKER_FRAMES = {"df", "df_fill"}
+SNAPSHOT_KEEP = int(os.environ.get("BAROMETER_SNAPSHOT_KEEP", "3"))
+_VERSION_NAME = re.compile(r"^[0-9a-f]{16}$")
+
+
+def _version_dir(snapshot_dir: str, version: str) -> str:
+    key = f"{version}|{code_version()}"
+    return os.path.join(snapshot_dir, hashlib.sha1(key.encode()).hexdigest()[:16])
+
+
+def _prune_versions(snapshot_dir: str, keep: str, newest: int = SNAPSHOT_KEEP) -> None:
+    """
+    Remove as versões além das `newest` usadas mais recentemente (mtime); `keep` nunca sai.
+    Temporários de publicação em andamento ficam.
+    """
+    versions = []
+    for name in os.listdir(snapshot_dir):
+        path = os.path.join(snapshot_dir, name)
+        if _VERSION_NAME.match(name) and path != keep:
+            try:
+                versions.append((os.path.getmtime(path), path))
+            except OSError:
+                continue  # removido por outra réplica
+    versions.sort(reverse=True)
+    for _, path in versions[max(0, newest - 1):]:
+        shutil.rmtree(path, ignore_errors=True)  # Windows: arquivo mapeado por outra réplica fica
+
+
+def publish_snapshot(tables: dict[str, pd.DataFrame], snapshot_dir: str, version: str) -> str:
+    """Grava as tabelas (escrita atômica: diretório temporário + rename). Idempotente por versão."""
+    target = _version_dir(snapshot_dir, version)
+    if os.path.isdir(target):
+        return target
+
+    os.makedirs(snapshot_dir, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=snapshot_dir, prefix=".publish-")
+    try:
+        for name, table in tables.items():
+            # sem compressão: pré-requisito para o memory-map zero-copy
+            feather.write_feather(table.reset_index(drop=True), os.path.join(tmp, f"{name}.arrow"),
+                                  compression="uncompressed")
+        os.rename(tmp, target)
+    except OSError:
+        # outra réplica publicou a mesma versão primeiro → usa a dela
+        shutil.rmtree(tmp, ignore_errors=True)
+        if not os.path.isdir(target):
+            raise
+        return target
+    _prune_versions(snapshot_dir, target)
+    return target
+
+
+def open_snapshot(snapshot_dir: str, version: str, names: list[str]) -> dict[str, pd.DataFrame] | None:
+    """
+    Abre as tabelas por memory-map (somente leitura). None se a versão não foi publicada
+    (ou foi removida por outra réplica no meio da abertura).
+    """
+    target = _version_dir(snapshot_dir, version)
+    paths = {name: os.path.join(target, f"{name}.arrow") for name in names}
+    if not all(os.path.exists(p) for p in paths.values()):
+        return None
+
+    tables = {}
+    for name, path in paths.items():
+        try:
+            source = pa.memory_map(path, "r")
+        except OSError:
+            return None
+        table = pa.ipc.open_file(source).read_all()
+        # split_blocks: uma coluna por bloco → colunas numéricas sem nulos viram views do mmap
+        df = table.to_pandas(split_blocks=True)
+        tables[name] = normalize_broker_frame(df) if name in BROKER_FRAMES else df
+    try:
+        os.utime(target)  # versão em uso: fica entre as mais recentes no prune
+    except OSError:
+        pass
+    return tables
@@ -1,14 +1,17 @@
 import pandas as pd
 
+from utils.broker_frame import ensure_normalized
+from utils.calendar_table import week_monday
+
 def get_weekly_top5_brokers(df, n_top=5):
-    # Garante que a data esteja formatada corretamente
-    df["date"] = pd.to_datetime(df["date"])
+    # Normalized broker frame; colunas derivadas sem alterar o frame de quem chamou
+    df = ensure_normalized(df)
     
     # Cria coluna de semana (segunda-feira de cada semana)
-    df["week"] = df["date"] - pd.to_timedelta(df["date"].dt.weekday, unit="d")
+    df = df.assign(week=week_monday(df["date"]))
 
     # Cria coluna de volume líquido
-    df["net_volume"] = df["buy_volume"] - df["sell_volume"]
+    df = df.assign(net_volume=df["buy_volume"] - df["sell_volume"])
 
     # Agrupa por semana e broker
     grouped = df.groupby(["week", "broker"], as_index=False)["net_volume"].sum()
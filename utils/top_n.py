@@ -0,0 +1,106 @@
+"""
+Top-N de buyers/sellers nos dois modos (Gross e Net) a partir de uma única passada.
+
+Os totais por broker (buy, sell, net) são calculados uma vez; cada ranking escolhe os k
+maiores com seleção parcial (np.argpartition, O(n)) e só ordena esses k. As quatro
+tabelas saem juntas, então alternar o modo na UI não recalcula nada.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+
+def top_k(values: np.ndarray, k: int) -> np.ndarray:
+    """
+    Índices dos k maiores valores, em ordem decrescente. Empates são desfeitos pela
+    posição (ordem alfabética dos brokers), de forma determinística.
+    """
+    n = len(values)
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < n:
+        kth = values[np.argpartition(values, n - k)[n - k]]
+        above = np.flatnonzero(values > kth)
+        ties = np.flatnonzero(values == kth)[: k - len(above)]
+        candidates = np.concatenate([above, ties])
+    else:
+        candidates = np.arange(n)
+    # ordena só os k candidatos: valor desc, posição asc
+    return candidates[np.lexsort((candidates, -values[candidates]))]
+
+
+@dataclass(frozen=True)
+class TopRankings:
+    """As quatro tabelas (colunas iguais às da versão com groupby + sort)."""
+    gross_buyers: pd.DataFrame   # broker, buy_volume (desc)
+    gross_sellers: pd.DataFrame  # broker, sell_volume negativo (maior venda primeiro)
+    net_buyers: pd.DataFrame     # broker, buy_volume, sell_volume, net_volume > 0 (desc)
+    net_sellers: pd.DataFrame    # idem, net_volume < 0 (mais negativo primeiro)
+
+    @property
+    def nbytes(self) -> int:
+        tables = (self.gross_buyers, self.gross_sellers, self.net_buyers, self.net_sellers)
+        return int(sum(t.memory_usage(deep=True).sum() for t in tables))
+
+    def for_mode(self, mode: str) -> tuple[pd.DataFrame, pd.DataFrame]:
+        if mode.startswith("Gross"):
+            return self.gross_buyers, self.gross_sellers
+        return self.net_buyers, self.net_sellers
+
+
+def rank_top_n(totals: pd.DataFrame, top_n: int) -> TopRankings:
+    """totals: uma linha por broker com buy_volume e sell_volume (ordem alfabética)."""
+    buy = totals["buy_volume"].to_numpy()
+    sell = totals["sell_volume"].to_numpy()
+    net = buy - sell
+
+    def rows(idx, columns):
+        return totals.iloc[idx][columns]
+
+    gross_buyers = rows(top_k(buy, top_n), ["broker", "buy_volume"])
+    gross_sellers = rows(top_k(sell, top_n), ["broker", "sell_volume"])
+    gross_sellers = gross_sellers.assign(sell_volume=-gross_sellers["sell_volume"])  # negativo para sellers
+
+    # Net: candidatos só entre os brokers com saldo positivo/negativo
+    pos, neg = np.flatnonzero(net > 0), np.flatnonzero(net < 0)
+    net_cols = ["broker", "buy_volume", "sell_volume"]
+    net_buyers = rows(pos[top_k(net[pos], top_n)], net_cols)
+    net_sellers = rows(neg[top_k(-net[neg], top_n)], net_cols)
+    net_buyers = net_buyers.assign(net_volume=net_buyers["buy_volume"] - net_buyers["sell_volume"])
+    net_sellers = net_sellers.assign(net_volume=net_sellers["buy_volume"] - net_sellers["sell_volume"])
+
+    return TopRankings(gross_buyers, gross_sellers, net_buyers, net_sellers)
+
+
+def rank_weekly(buy: np.ndarray, sell: np.ndarray, brokers, weeks, top_n: int) -> pd.DataFrame:
+    """
+    Top N net buyers/sellers de todas as semanas de uma vez. buy/sell: [broker, semana].
+    Um argsort por coluna da matriz de net volume (sem loop por semana); empates pela
+    posição do broker. Retorna uma linha por (semana, lado, rank): week, side ("Buy"/
+    "Sell"), rank, broker, buy_volume, sell_volume, net_volume — semanas mais recentes
+    primeiro; em cada semana, compradores (maior net primeiro) e depois vendedores.
+    """
+    brokers = np.asarray(brokers, dtype=object)
+    net = buy - sell
+    k = min(top_n, len(brokers))
+    frames = []
+    for side, order in (("Buy", np.argsort(-net, axis=0, kind="stable")[:k]),
+                        ("Sell", np.argsort(net, axis=0, kind="stable")[:k])):
+        values = np.take_along_axis(net, order, axis=0)
+        rank, col = np.nonzero(values > 0 if side == "Buy" else values < 0)
+        row = order[rank, col]
+        frames.append(pd.DataFrame({
+            "week": pd.DatetimeIndex(weeks)[col],
+            "side": side,
+            "rank": rank + 1,
+            "broker": brokers[row],
+            "buy_volume": buy[row, col],
+            "sell_volume": sell[row, col],
+            "net_volume": net[row, col],
+        }))
+    out = pd.concat(frames, ignore_index=True)
+    out["side"] = pd.Categorical(out["side"], categories=["Buy", "Sell"])
+    return out.sort_values(["week", "side", "rank"], ascending=[False, True, True], ignore_index=True)
@@ -0,0 +1,299 @@
+"""
+Ingestão de prints de negócios (trade-level) direto para barras diárias por broker.
+
+Uso (backfill de vários meses em um job):
+    python -m utils.trade_ingest --input "prints/2025-*.csv" --output data/backfill_bars.csv \
+        --opening data/Broker_Daily_Data.csv
+
+Cada print (timestamp, buyer, seller, price, volume[, anonymous][, ticker]) conta como
+compra para o broker comprador e venda para o vendedor. Os arquivos são lidos em blocos
+de tamanho fixo e cada bloco vira somas parciais por (dia, [ticker,] broker): volume e
+preço × volume de cada lado e volume anônimo. As somas são combináveis, então cada
+arquivo roda num processo e os parciais (dias × brokers linhas, não prints) são somados
+no fim — a memória depende do chunksize e do nº de broker-dias, não do nº de prints.
+
+Saída com as colunas de negociação do Broker_Daily_Data.csv: buy/sell volume, VWAPs,
+anon_volume e start/end balance (saldo encadeado a partir dos saldos de abertura,
+--opening). Não é um substituto do arquivo diário do app: short_interest,
+efficiency_score e profile não saem de prints e ficam de fora, então o arquivo não
+serve direto como BAROMETER_DATA. --output é obrigatório, não pode ser o --opening e
+é gravado de forma atômica (arquivo temporário + os.replace).
+"""
+from __future__ import annotations
+import argparse
+import glob
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CHUNKSIZE = 500_000
+
+# nomes aceitos para as colunas dos prints
+PRINT_ALIASES = {
+    "time": "timestamp", "datetime": "timestamp", "trade_time": "timestamp", "date": "timestamp",
+    "buy_broker": "buyer", "buyer_broker": "buyer",
+    "sell_broker": "seller", "seller_broker": "seller",
+    "quantity": "volume", "size": "volume", "qty": "volume",
+    "symbol": "ticker",
+}
+PRINT_COLUMNS = ["timestamp", "buyer", "seller", "price", "volume"]
+
+# somas parciais por (dia, [ticker,] broker)
+SUMS = ["buy_volume", "buy_pv", "sell_volume", "sell_pv", "anon_volume"]
+DAILY_COLUMNS = ["date", "broker", "buy_volume", "sell_volume", "buy_vwap", "sell_vwap",
+                 "start_balance", "end_balance", "anon_volume"]
+
+
+def _names(col: pd.Series) -> pd.Series:
+    """Nomes/códigos de broker ou ticker como texto sem espaços (nulos continuam nulos)."""
+    if pd.api.types.is_string_dtype(col):
+        return col.str.strip()
+    if pd.api.types.is_float_dtype(col) and (col.dropna() % 1 == 0).all():
+        col = col.astype("Int64")  # códigos numéricos com nulos: 7, não "7.0"
+    return col.astype(str).str.strip().where(col.notna())
+
+
+def normalize_prints(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Nomes de colunas canônicos, tipos numéricos e o dia de cada print."""
+    data = chunk.rename(columns=lambda c: str(c).strip().lower())
+    data = data.rename(columns={k: v for k, v in PRINT_ALIASES.items() if k in data.columns and v not in data.columns})
+    missing = [c for c in PRINT_COLUMNS if c not in data.columns]
+    if missing:
+        raise ValueError(f"Missing trade print columns: {missing}")
+
+    out = pd.DataFrame({
+        "date": pd.to_datetime(data["timestamp"], errors="coerce").dt.normalize(),
+        "buyer": _names(data["buyer"]),
+        "seller": _names(data["seller"]),
+        "price": pd.to_numeric(data["price"], errors="coerce"),
+        "volume": pd.to_numeric(data["volume"], errors="coerce"),
+        "anonymous": (data["anonymous"].astype(str).str.strip().str.lower().isin(["1", "true", "t", "y", "yes"])
+                      if "anonymous" in data.columns else False),
+    })
+    if "ticker" in data.columns:
+        out.insert(1, "ticker", _names(data["ticker"]))
+    # prints sem dia, preço ou volume válidos não entram nas barras
+    return out[out["date"].notna() & out["price"].notna() & (out["volume"] > 0)]
+
+
+def aggregate_chunk(prints: pd.DataFrame) -> pd.DataFrame:
+    """
+    Somas parciais de um bloco, uma linha por (dia, [ticker,] broker). Cada print entra
+    duas vezes (lado comprador e vendedor); as chaves viram códigos inteiros e as somas
+    saem de np.bincount, sem groupby sobre strings.
+    """
+    n = len(prints)
+    vol = prints["volume"].to_numpy(dtype=float)
+    pv = prints["price"].to_numpy(dtype=float) * vol
+    anon = np.where(prints["anonymous"].to_numpy(dtype=bool), vol, 0.0)
+    buy_side = np.r_[np.ones(n, dtype=bool), np.zeros(n, dtype=bool)]
+    vol2, pv2 = np.r_[vol, vol], np.r_[pv, pv]
+    values = {
+        "buy_volume": np.where(buy_side, vol2, 0.0),
+        "buy_pv": np.where(buy_side, pv2, 0.0),
+        "sell_volume": np.where(buy_side, 0.0, vol2),
+        "sell_pv": np.where(buy_side, 0.0, pv2),
+        "anon_volume": np.r_[anon, anon],
+    }
+
+    names, codes, levels = [], [], []
+    for name in ("date", "ticker"):
+        if name in prints.columns:
+            c, uniques = pd.factorize(prints[name])
+            names.append(name); codes.append(np.r_[c, c]); levels.append(uniques)
+    c, brokers = pd.factorize(pd.concat([prints["buyer"], prints["seller"]], ignore_index=True))
+    c[np.isin(c, np.flatnonzero(np.asarray(brokers) == ""))] = -1  # broker em branco = sem broker
+    names.append("broker"); codes.append(c); levels.append(brokers)
+
+    valid = np.logical_and.reduce([c >= 0 for c in codes])
+    shape = tuple(max(len(level), 1) for level in levels)
+    keys, inverse = np.unique(np.ravel_multi_index([c[valid] for c in codes], shape), return_inverse=True)
+    sums = {col: np.bincount(inverse, weights=v[valid], minlength=len(keys)) for col, v in values.items()}
+    index = pd.MultiIndex.from_arrays(
+        [level[pos] for level, pos in zip(levels, np.unravel_index(keys, shape))], names=names)
+    return pd.DataFrame(sums, index=index)
+
+
+class DailyBarAggregator:
+    """
+    Acumulador online das somas por (dia, [ticker,] broker). add() recebe prints,
+    merge() recebe parciais de outro acumulador (outro arquivo/processo).
+    """
+
+    def __init__(self, compact_every: int = 16):
+        self.compact_every = compact_every
+        self._parts: list[pd.DataFrame] = []
+        self.prints = 0
+
+    def add(self, prints: pd.DataFrame) -> None:
+        self.prints += len(prints)
+        if len(prints):
+            self.merge(aggregate_chunk(prints))
+
+    def merge(self, partial: pd.DataFrame) -> None:
+        self._parts.append(partial)
+        if len(self._parts) >= self.compact_every:
+            self.partial()
+
+    def partial(self) -> pd.DataFrame:
+        """Somas acumuladas até aqui (compacta os parciais pendentes numa tabela só)."""
+        if not self._parts:
+            return pd.DataFrame(columns=SUMS)
+        if len(self._parts) > 1:
+            merged = pd.concat(self._parts)
+            self._parts = [merged.groupby(level=list(range(merged.index.nlevels)), sort=False).sum()]
+        return self._parts[0]
+
+    def bars(self, opening: pd.Series | None = None) -> pd.DataFrame:
+        """Barras diárias no schema do CSV diário; opening: saldo de abertura por broker (ou ticker, broker)."""
+        return daily_bars(self.partial(), opening)
+
+
+def daily_bars(sums: pd.DataFrame, opening: pd.Series | None = None) -> pd.DataFrame:
+    """Somas por (dia, [ticker,] broker) → VWAPs, anon_volume e saldos encadeados por broker."""
+    if sums.empty:
+        return pd.DataFrame(columns=DAILY_COLUMNS)
+    bars = sums.reset_index()
+    group = [c for c in ("ticker", "broker") if c in bars.columns]
+    bars = bars.sort_values(group + ["date"], kind="stable", ignore_index=True)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        bars["buy_vwap"] = np.where(bars["buy_volume"] > 0, bars["buy_pv"] / bars["buy_volume"], np.nan)
+        bars["sell_vwap"] = np.where(bars["sell_volume"] > 0, bars["sell_pv"] / bars["sell_volume"], np.nan)
+
+    # saldo: abertura + Σ(compra − venda) até o dia, por broker (dias sem negócio não mudam o saldo)
+    net = bars["buy_volume"] - bars["sell_volume"]
+    seed = 0.0
+    if opening is not None:
+        key = bars.set_index(group).index
+        seed = opening.reindex(key).fillna(0.0).to_numpy()
+    bars["end_balance"] = net.groupby([bars[c] for c in group], sort=False).cumsum() + seed
+    bars["start_balance"] = bars["end_balance"] - net
+
+    for col in ("buy_volume", "sell_volume", "anon_volume", "start_balance", "end_balance"):
+        if (bars[col] % 1 == 0).all():
+            bars[col] = bars[col].astype("int64")
+    columns = DAILY_COLUMNS[:1] + (["ticker"] if "ticker" in bars.columns else []) + DAILY_COLUMNS[1:]
+    return bars.sort_values(["date"] + group, kind="stable", ignore_index=True)[columns]
+
+
+def aggregate_file(path: str, chunksize: int = DEFAULT_CHUNKSIZE) -> pd.DataFrame:
+    """Worker: lê um arquivo de prints em blocos e devolve as somas parciais (pequenas)."""
+    agg = DailyBarAggregator()
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        agg.add(normalize_prints(chunk))
+    return agg.partial()
+
+
+def opening_balances(daily_path: str, before, by: list[str] | None = None) -> pd.Series:
+    """
+    Último end_balance antes de `before` por broker (ou ticker, broker) num CSV diário
+    existente — os saldos de abertura do backfill.
+    """
+    by = by or ["broker"]
+    daily = pd.read_csv(daily_path, usecols=lambda c: c in ("date", "ticker", "broker", "end_balance"))
+    missing = [c for c in by if c not in daily.columns]
+    if missing:
+        raise ValueError(f"Opening balances file has no {missing} column")
+    daily["date"] = pd.to_datetime(daily["date"], errors="coerce")
+    daily = daily[daily["date"] < pd.Timestamp(before)].sort_values("date", kind="stable")
+    return daily.groupby(by)["end_balance"].last().astype(float)
+
+
+def expand_inputs(patterns: list[str]) -> list[str]:
+    """Arquivos, diretórios (todos os .csv dentro) ou globs → lista ordenada de arquivos."""
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths += glob.glob(os.path.join(pattern, "*.csv"))
+        else:
+            paths += glob.glob(pattern) or [pattern]
+    return sorted(set(paths))
+
+
+def aggregate_files(paths: list[str], max_workers: int | None = None,
+                    chunksize: int = DEFAULT_CHUNKSIZE) -> pd.DataFrame:
+    """Somas de todos os arquivos: um processo por arquivo, parciais somados conforme chegam."""
+    missing = [p for p in paths if not os.path.exists(p)]
+    if missing:
+        raise FileNotFoundError(f"File not found: {missing[0]}")
+
+    agg = DailyBarAggregator()
+    max_workers = min(max_workers or os.cpu_count() or 1, max(len(paths), 1))
+    if max_workers == 1:
+        for path in paths:
+            agg.merge(aggregate_file(path, chunksize))
+    else:
+        # spawn: seguro mesmo quando chamado de dentro de um processo com threads (Streamlit)
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=ctx) as pool:
+            futures = [pool.submit(aggregate_file, path, chunksize) for path in paths]
+            for future in as_completed(futures):
+                agg.merge(future.result())
+    return agg.partial()
+
+
+def ingest_trades(paths: list[str], max_workers: int | None = None, chunksize: int = DEFAULT_CHUNKSIZE,
+                  opening_path: str | None = None) -> pd.DataFrame:
+    """
+    Barras diárias de todos os arquivos de prints. opening_path: CSV diário existente
+    cujo último saldo antes do primeiro print abre os saldos (sem ele, começam em zero).
+    """
+    sums = aggregate_files(paths, max_workers, chunksize)
+    opening = None
+    if opening_path and not sums.empty:
+        first_day = sums.index.get_level_values("date").min()
+        by = [c for c in ("ticker", "broker") if c in sums.index.names]
+        opening = opening_balances(opening_path, first_day, by)
+    return daily_bars(sums, opening)
+
+
+def write_bars(bars: pd.DataFrame, path: str) -> None:
+    """Grava o CSV de barras de forma atômica: quem lê o arquivo nunca vê uma escrita pela metade."""
+    folder = os.path.dirname(os.path.abspath(path))
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix=".bars-", suffix=".csv")
+    try:
+        with os.fdopen(fd, "w", newline="", encoding="utf-8") as f:
+            bars.to_csv(f, index=False, date_format="%Y-%m-%d")
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _same_file(a: str, b: str) -> bool:
+    if os.path.exists(a) and os.path.exists(b):
+        return os.path.samefile(a, b)
+    return os.path.realpath(a) == os.path.realpath(b)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Stream trade prints into daily broker bars.")
+    parser.add_argument("--input", nargs="+", required=True, help="CSV files, directories or globs of trade prints")
+    parser.add_argument("--output", required=True,
+                        help="new CSV of daily bars (no short_interest/efficiency_score/profile: "
+                             "not a drop-in replacement for the app's daily file)")
+    parser.add_argument("--opening", default=None,
+                        help="existing daily CSV: last end_balance before the first print seeds the balances")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    args = parser.parse_args(argv)
+    if args.opening and _same_file(args.output, args.opening):
+        parser.error("--output must not be the --opening file (it would be overwritten with the new days only)")
+
+    paths = expand_inputs(args.input)
+    if not paths:
+        raise SystemExit("No input files")
+
+    bars = ingest_trades(paths, max_workers=args.workers, chunksize=args.chunksize, opening_path=args.opening)
+    write_bars(bars, args.output)
+    print(f"{len(paths)} files → {len(bars):,} broker-days → {args.output}")
+
+
+if __name__ == "__main__":
+    main()
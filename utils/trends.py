@@ -0,0 +1,78 @@
+from __future__ import annotations
+from dataclasses import dataclass
+
+import pandas as pd
+
+from utils.broker_frame import ensure_normalized
+from utils.broker_index import normalize_selection, selection_names
+from utils.calendar_table import week_monday
+
+# colunas aditivas do rollup diário (médias/razões são derivadas na leitura)
+ADDITIVE = ["buy_volume", "sell_volume", "start_balance", "end_balance", "short_interest"]
+VWAPS = ["buy_vwap", "sell_vwap"]
+
+
+@dataclass(frozen=True)
+class TrendRollup:
+    """Rollup diário pré-agregado (por broker e total) de onde saem as séries de tendência dos cards."""
+    by_broker: pd.DataFrame  # índice (broker, date)
+    total: pd.DataFrame      # índice date
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.by_broker.memory_usage(deep=True).sum() + self.total.memory_usage(deep=True).sum())
+
+    def series(self, start, end, broker="All", freq: str | None = None) -> pd.DataFrame:
+        """
+        Séries de KPI por dia ("D") ou semana ("W", segunda-feira) no período:
+        buy/sell_volume, buy/sell_vwap (média, como em compute_metrics), start/end_balance e sir.
+        broker: "All", um nome ou vários (somados por dia).
+        """
+        names = selection_names(normalize_selection(broker))
+        known = self.by_broker.index.get_level_values("broker")
+        if names is None:
+            rollup = self.total
+        elif len(names) == 1 and names[0] in known:
+            rollup = self.by_broker.xs(names[0], level="broker")
+        elif any(n in known for n in names):
+            selected = self.by_broker[known.isin(names)]
+            rollup = selected.groupby(level="date").sum()
+        else:
+            return pd.DataFrame(columns=ADDITIVE + VWAPS + ["sir"])
+
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        rollup = rollup.loc[start:end]
+        if freq is None:
+            freq = default_freq(start, end)
+        if freq == "W" and not rollup.empty:
+            rollup = rollup.groupby(week_monday(rollup.index)).sum()
+            rollup.index.name = "date"
+
+        out = rollup[ADDITIVE].astype(float)
+        for col in VWAPS:
+            n = rollup[f"{col}_n"]
+            out[col] = (rollup[f"{col}_sum"] / n).where(n > 0)
+        out["sir"] = (out["short_interest"] / out["end_balance"]).where(out["end_balance"] != 0, 0.0)
+        return out
+
+
+def default_freq(start, end) -> str:
+    """Diário até ~2 meses; semanal para janelas maiores (3 e 12 meses)."""
+    return "D" if (pd.Timestamp(end) - pd.Timestamp(start)).days <= 62 else "W"
+
+
+def build_trend_rollup(df: pd.DataFrame) -> TrendRollup:
+    """Uma única agregação vetorizada sobre as linhas cruas, feita uma vez por versão dos dados."""
+    df = ensure_normalized(df)
+    cols = {c: (c, "sum") for c in ADDITIVE if c in df.columns}
+    for col in VWAPS:
+        if col in df.columns:
+            cols[f"{col}_sum"] = (col, "sum")
+            cols[f"{col}_n"] = (col, "count")
+
+    by_broker = df.groupby(["broker", "date"]).agg(**cols).sort_index()
+    for c in ADDITIVE + [f"{v}_{s}" for v in VWAPS for s in ("sum", "n")]:
+        if c not in by_broker.columns:
+            by_broker[c] = 0
+    total = by_broker.groupby(level="date").sum()
+    return TrendRollup(by_broker=by_broker, total=total)